@@ -4,15 +4,11 @@ Orchestrates existing services as tools for comprehensive risk analysis.
 """
 import os
 import json
-from langchain.agents import AgentType, initialize_agent
-from langchain_openai import ChatOpenAI
+import threading
 from langchain_core.tools import tool
 
-from app.services import scoring, semantics
-from app.services.rag_service import find_similar_events
+from app.agents import runtime
 from app.services.llm_service import generate_risk_summary
-from app.db.session import SessionLocal
-from app.db.models import EventORM
 
 # Tool 1: score_event
 @tool
@@ -22,14 +18,7 @@ def score_event(event_text: str) -> dict:
     Returns signal_strength, historical_rarity, trend_acceleration, 
     cross_source_presence, and uncertainty.
     """
-    score_matrix = scoring.calculate_scores(event_text)
-    return {
-        "signal_strength": score_matrix.signal_strength,
-        "historical_rarity": score_matrix.historical_rarity,
-        "trend_acceleration": score_matrix.trend_acceleration,
-        "cross_source_presence": score_matrix.cross_source_presence,
-        "uncertainty": score_matrix.uncertainty,
-    }
+    return runtime.score_event(event_text)
 
 # Tool 2: classify_risk
 @tool
@@ -38,11 +27,7 @@ def classify_risk(event_text: str) -> dict:
     Classify event into semantic risk categories using keyword anchors.
     Returns category scores and matched keywords.
     """
-    result = semantics.calculate_semantics(event_text)
-    return {
-        "category_scores": result["category_scores"],
-        "matched_keywords": result["matched_keywords"],
-    }
+    return runtime.classify_risk(event_text)
 
 # Tool 3: retrieve_similar
 @tool
@@ -50,14 +35,7 @@ def retrieve_similar(event_text: str) -> list:
     """
     Retrieve top 3 similar historical events using RAG-like retrieval.
     """
-    db = SessionLocal()
-    try:
-        events = db.query(EventORM).limit(100).all()
-        past_events = [{"id": e.id, "content": e.content} for e in events]
-    finally:
-        db.close()
-    
-    return find_similar_events(event_text, past_events)
+    return runtime.retrieve_similar(event_text)
 
 # Tool 4: summarize_risk
 @tool
@@ -70,26 +48,56 @@ def summarize_risk(event_text: str, scores: dict, semantics_result: dict) -> dic
 class RiskAnalysisAgent:
     """
     Agent class that orchestrates risk tools using LangChain.
+    Get the warm instance from `runtime.agent_runtime.get("langchain")`
+    instead of building one per request. The LangChain agent is only needed by
+    `analyze_autonomous` and is built on its first call.
     """
     def __init__(self, model_name: str = "gpt-4o-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
-            
-        self.llm = ChatOpenAI(model=model_name, temperature=0, api_key=api_key)
+
+        self.model_name = model_name
         self.tools = [score_event, classify_risk, retrieve_similar, summarize_risk]
-        
-        # Using initialize_agent with OPENAI_FUNCTIONS for reliable tool calling
-        self.agent = initialize_agent(
-            self.tools,
-            self.llm,
-            agent=AgentType.OPENAI_FUNCTIONS,
-            verbose=False
-        )
+        self._agent = None
+        self._agent_lock = threading.Lock()
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            with self._agent_lock:
+                if self._agent is None:
+                    from langchain.agents import AgentType, initialize_agent
+                    from langchain_openai import ChatOpenAI
+                    llm = ChatOpenAI(model=self.model_name, temperature=0, api_key=self.api_key)
+                    # Using initialize_agent with OPENAI_FUNCTIONS for reliable tool calling
+                    self._agent = initialize_agent(
+                        self.tools,
+                        llm,
+                        agent=AgentType.OPENAI_FUNCTIONS,
+                        verbose=False
+                    )
+        return self._agent
 
     def analyze(self, event_text: str) -> dict:
         """
-        Execute the agent to perform full analysis.
+        Full analysis with a fixed plan: the deterministic tools run directly
+        and in parallel, and the LLM is called once for the summary.
+        """
+        result = runtime.agent_runtime.run_tools(event_text)
+        llm_output = generate_risk_summary(event_text, result["scores"], result["classification"])
+        return {
+            "scores": result["scores"],
+            "semantics": result["classification"],
+            "similar_events": result["similar_events"],
+            "summary": llm_output["summary"],
+            "recommendation": llm_output["recommendation"],
+        }
+
+    def analyze_autonomous(self, event_text: str) -> dict:
+        """
+        Let the LLM choose and sequence the tools itself. Costs one LLM
+        round-trip per tool call plus the final answer.
         """
         prompt = f"""
 Analyze the following event and provide a structured risk assessment:
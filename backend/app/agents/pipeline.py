@@ -2,71 +2,70 @@ import uuid
 from app.models.event import Event, EventStatus
 from app.models.score import ScoreMatrix
 from app.models.risk_semantic import RiskSemantic
-from app.models.explainability import Explainability, generate_reasoning
-from app.services import scoring
-from app.services import semantics
-from app.services.rag_service import find_similar_events
-from app.services.llm_service import generate_risk_summary
-from app.db.session import SessionLocal
-from app.db.models import EventORM
+from app.models.explainability import Explainability
+from app.services import metrics
+from app.services import enrichment, retrieval
+from app.services.analysis_cache import analysis_cache
+from app.services.llm_service import fallback_summary, generate_risk_summary
 
 
-def _get_past_events() -> list[dict]:
-    """Fetch past events from database for similarity search."""
-    db = SessionLocal()
-    try:
-        events = db.query(EventORM).limit(100).all()
-        return [{"id": e.id, "content": e.content} for e in events]
-    finally:
-        db.close()
-
-
-def process_event(event: Event) -> tuple[ScoreMatrix, RiskSemantic, Explainability, list, dict]:
+def process_event(event: Event, enrich: bool = True) -> tuple[ScoreMatrix, RiskSemantic, Explainability, list, dict]:
     """
-    Process an event through the full analysis pipeline.
+    Process an event through the full analysis pipeline. With enrich=False
+    (shed by admission control) retrieval is skipped and the summary is the
+    deterministic one. With deferred enrichment the summary is the
+    deterministic one and llm_output["deferred"] is set; the write path then
+    queues the event for the LLM. Events that will alert are still
+    summarized inline, so the alert carries the LLM summary.
     
     Returns:
         (score_matrix, risk_semantics, explainability, similar_events, llm_output)
     """
-    # Generate ID if missing
-    if not event.id:
-        event.id = str(uuid.uuid4())
-    
-    # Set default status
-    event.status = EventStatus.NEW
-    
-    # Calculate scores
-    score_matrix = scoring.calculate_scores(event.content)
-    
-    # Calculate risk semantics
-    semantic_result = semantics.calculate_semantics(event.content)
-    category_scores = semantic_result["category_scores"]
-    matched_keywords = semantic_result["matched_keywords"]
-    
-    risk_semantic = RiskSemantic(**category_scores)
-    
-    # Generate explainability
-    reasoning = generate_reasoning(matched_keywords, category_scores)
-    explainability = Explainability(
-        matched_keywords=matched_keywords,
-        reasoning=reasoning
-    )
-    
-    # RAG: Find similar events
-    past_events = _get_past_events()
-    similar_events = find_similar_events(event.content, past_events)
-    
-    # LLM: Generate risk summary
-    scores_dict = {
-        "signal_strength": score_matrix.signal_strength,
-        "historical_rarity": score_matrix.historical_rarity,
-        "trend_acceleration": score_matrix.trend_acceleration,
-        "cross_source_presence": score_matrix.cross_source_presence,
-        "uncertainty": score_matrix.uncertainty,
-    }
-    llm_output = generate_risk_summary(event.content, scores_dict, semantic_result)
-    
-    # Update status
-    event.status = EventStatus.SCORED
-    
+    with metrics.stage("process_event"):
+        # Generate ID if missing
+        if not event.id:
+            event.id = str(uuid.uuid4())
+
+        # Set default status
+        event.status = EventStatus.NEW
+
+        # All stages of one event use the same generation, even if a newer one is published meanwhile
+        generation = retrieval.shared_generation()
+
+        # Scores, semantics and explainability, computed once per distinct content
+        if generation is not None:
+            analysis = analysis_cache.get(event.content, generation.anchors, generation.anchor_version)
+        else:
+            analysis = analysis_cache.get(event.content)
+        score_matrix = analysis.score_matrix()
+        semantic_result = analysis.semantics()
+        risk_semantic = analysis.risk_semantic()
+        explainability = analysis.explainability()
+
+        # RAG: Find similar events
+        similar_events = []
+        if enrich:
+            with metrics.stage("find_similar_events"):
+                similar_events = retrieval.find_similar(event.content, generation=generation)
+
+        # LLM: Generate risk summary
+        scores_dict = {
+            "signal_strength": score_matrix.signal_strength,
+            "historical_rarity": score_matrix.historical_rarity,
+            "trend_acceleration": score_matrix.trend_acceleration,
+            "cross_source_presence": score_matrix.cross_source_presence,
+            "uncertainty": score_matrix.uncertainty,
+        }
+        if not enrich:
+            llm_output = fallback_summary(event.content, scores_dict, semantic_result, reason="shed")
+        elif enrichment.deferred() and max(analysis.categories) < 0.6:
+            llm_output = fallback_summary(event.content, scores_dict, semantic_result, reason="deferred")
+            llm_output["deferred"] = True
+        else:
+            with metrics.stage("generate_risk_summary"):
+                llm_output = generate_risk_summary(event.content, scores_dict, semantic_result)
+
+        # Update status
+        event.status = EventStatus.SCORED
+
     return score_matrix, risk_semantic, explainability, similar_events, llm_output
@@ -4,7 +4,8 @@ LangChain-based Risk Analysis Agent.
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
-from app.agents.tools import RISK_TOOLS, score_event, classify_risk, find_similar_events, generate_recommendation
+from app.agents.tools import RISK_TOOLS
+from app.agents.runtime import agent_runtime
 
 
 SYSTEM_PROMPT = """You are a Risk Analysis Agent for an enterprise AI system.
@@ -57,26 +58,14 @@ class RiskAgent:
         Returns:
             dict with scores, classification, similar events, and recommendation
         """
-        # Step 1: Score the event
-        scores = score_event.invoke(event_text)
+        # Steps 1-4: scores, classification, similar events and recommendation, run in parallel
+        result = agent_runtime.run_tools(event_text)
+        scores = result["scores"]
+        classification = result["classification"]
+        similar = result["similar_events"]
+        recommendation = result["recommendation"]
         
-        # Step 2: Classify risks
-        classification = classify_risk.invoke(event_text)
-        
-        # Step 3: Find similar events
-        similar = find_similar_events.invoke(event_text)
-        
-        # Step 4: Generate recommendation
-        category_scores = classification["category_scores"]
-        recommendation = generate_recommendation.invoke({
-            "event_text": event_text,
-            "operational_risk": category_scores.get("operational_risk", 0),
-            "compliance_risk": category_scores.get("compliance_risk", 0),
-            "reputational_risk": category_scores.get("reputational_risk", 0),
-            "financial_risk": category_scores.get("financial_risk", 0),
-        })
-        
-        # Step 5: Generate final summary using LLM
+        # Step 5: Generate final summary using LLM (the only LLM round-trip)
         summary_prompt = f"""
 Summarize this risk analysis in 2-3 sentences:
 
@@ -120,24 +109,12 @@ class RiskAgentSimple:
         """
         Analyze an event using deterministic tools only.
         """
-        # Step 1: Score the event
-        scores = score_event.invoke(event_text)
-        
-        # Step 2: Classify risks
-        classification = classify_risk.invoke(event_text)
-        
-        # Step 3: Find similar events
-        similar = find_similar_events.invoke(event_text)
-        
-        # Step 4: Generate recommendation
+        result = agent_runtime.run_tools(event_text)
+        scores = result["scores"]
+        classification = result["classification"]
+        similar = result["similar_events"]
+        recommendation = result["recommendation"]
         category_scores = classification["category_scores"]
-        recommendation = generate_recommendation.invoke({
-            "event_text": event_text,
-            "operational_risk": category_scores.get("operational_risk", 0),
-            "compliance_risk": category_scores.get("compliance_risk", 0),
-            "reputational_risk": category_scores.get("reputational_risk", 0),
-            "financial_risk": category_scores.get("financial_risk", 0),
-        })
         
         # Generate deterministic summary
         max_risk_category = max(category_scores, key=category_scores.get)
@@ -0,0 +1,134 @@
+"""
+Agent runtime: warm agent instances and a fixed-plan analysis path.
+
+Scoring, classification and retrieval are deterministic, so letting the LLM
+pick their order only adds round-trips. The runtime runs them directly and in
+parallel, derives the recommendation locally, and calls the LLM once for the
+final summary. Agents are built once per process and reused through
+`agent_runtime.get(name)`, so callers never construct LangChain objects per
+request. Nothing here imports LangChain until a LangChain agent is requested.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services import metrics, retrieval
+from app.services.analysis_cache import analysis_cache
+from app.services.llm_service import generate_risk_summary
+
+AGENT_TOOL_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "4"))
+
+
+def score_event(event_text: str) -> dict:
+    return analysis_cache.get(event_text).score_matrix().model_dump()
+
+
+def classify_risk(event_text: str) -> dict:
+    return analysis_cache.get(event_text).semantics()
+
+
+def retrieve_similar(event_text: str) -> list:
+    return retrieval.find_similar(event_text)
+
+
+def recommend(category_scores: dict) -> str:
+    """Short actionable recommendation from the semantic category scores."""
+    risks = {
+        "operational": category_scores.get("operational_risk", 0),
+        "compliance": category_scores.get("compliance_risk", 0),
+        "reputational": category_scores.get("reputational_risk", 0),
+        "financial": category_scores.get("financial_risk", 0),
+    }
+    max_risk = max(risks.values())
+
+    if max_risk >= 0.6:
+        urgency = "URGENT"
+        action = "Immediate escalation required. Notify incident response team."
+    elif max_risk >= 0.3:
+        urgency = "MODERATE"
+        action = "Schedule review within 24 hours. Monitor for escalation."
+    else:
+        urgency = "LOW"
+        action = "Log for tracking. No immediate action needed."
+
+    primary_risk = max(risks, key=risks.get)
+    return f"[{urgency}] Primary risk: {primary_risk}. Recommended action: {action}"
+
+
+def _langchain_agent():
+    from app.agents.langchain_agent import RiskAnalysisAgent
+    return RiskAnalysisAgent()
+
+
+def _tool_calling_agent():
+    from app.agents.risk_agent import RiskAgent
+    return RiskAgent()
+
+
+def _simple_agent():
+    from app.agents.risk_agent import RiskAgentSimple
+    return RiskAgentSimple()
+
+
+class AgentRuntime:
+    """
+    Registry of warm agent instances plus the shared tool executor.
+    """
+
+    def __init__(self, tool_workers: int = AGENT_TOOL_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="agent-tool")
+        self._factories = {
+            "langchain": _langchain_agent,
+            "tool_calling": _tool_calling_agent,
+            "simple": _simple_agent,
+        }
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._agents.pop(name, None)
+
+    def get(self, name: str):
+        """The warm instance of agent `name`, built on first use."""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        with self._lock:
+            if name not in self._agents:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown agent: {name}")
+                self._agents[name] = self._factories[name]()
+            return self._agents[name]
+
+    def run_tools(self, event_text: str) -> dict:
+        """Run the deterministic tools concurrently; returns scores, classification, similar events and recommendation."""
+        with metrics.stage("agent_tools"):
+            scores = self.executor.submit(score_event, event_text)
+            classification = self.executor.submit(classify_risk, event_text)
+            similar = self.executor.submit(retrieve_similar, event_text)
+            classification = classification.result()
+            return {
+                "scores": scores.result(),
+                "classification": classification,
+                "similar_events": similar.result(),
+                "recommendation": recommend(classification["category_scores"]),
+            }
+
+    def analyze(self, event_text: str) -> dict:
+        """Full analysis with exactly one LLM round-trip (none without an API key)."""
+        result = self.run_tools(event_text)
+        with metrics.stage("agent_summary"):
+            llm_output = generate_risk_summary(event_text, result["scores"], result["classification"])
+        return {
+            "event_text": event_text,
+            **result,
+            "summary": llm_output["summary"],
+            "llm_recommendation": llm_output["recommendation"],
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+agent_runtime = AgentRuntime()
@@ -3,45 +3,95 @@ from abc import ABC, abstractmethod
 from pydantic import BaseModel
 from typing import Dict, Any
 
+from app.models.event import Event, EventStatus
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
 class IngestedEvent(BaseModel):
     source: str
     sender: str
     content: str
     timestamp: datetime
 
+class Message:
+    """
+    An inbound message decoded straight from a webhook body: only the fields
+    the pipeline needs, already type-checked, with no Pydantic validation.
+    """
+    __slots__ = ("source", "sender", "content", "timestamp")
+
+    def __init__(self, source: str, sender: str, content: str, timestamp: datetime):
+        self.source = source
+        self.sender = sender
+        self.content = content
+        self.timestamp = timestamp
+
+def _string(value, field: str) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+def _object(value, field: str) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"{field} must be an object")
+    return value
+
+def to_event(ingested) -> Event:
+    """Internal Event for an IngestedEvent or Message; both are validated already."""
+    return Event.model_construct(
+        id=None, status=EventStatus.NEW, content=ingested.content, source=ingested.source, timestamp=ingested.timestamp
+    )
+
 class BaseAdapter(ABC):
     @abstractmethod
-    def transform(self, payload: Dict[str, Any]) -> IngestedEvent:
+    def extract(self, payload: Dict[str, Any]) -> Message:
         pass
 
-class TelegramAdapter(BaseAdapter):
     def transform(self, payload: Dict[str, Any]) -> IngestedEvent:
-        # Expected Telegram payload structure
-        message = payload.get("message", {})
-        from_user = message.get("from", {})
+        message = self.extract(payload)
         return IngestedEvent(
+            source=message.source, sender=message.sender, content=message.content, timestamp=message.timestamp
+        )
+
+    def decode(self, body: bytes) -> Message:
+        """Fast path: raw request body to Message, without building a generic model first."""
+        return self.extract(_object(_loads(body), "payload"))
+
+class TelegramAdapter(BaseAdapter):
+    def extract(self, payload: Dict[str, Any]) -> Message:
+        # Expected Telegram payload structure
+        message = _object(payload.get("message", {}), "message")
+        from_user = _object(message.get("from", {}), "message.from")
+        date = message.get("date")
+        if date is not None and (not isinstance(date, (int, float)) or isinstance(date, bool)):
+            raise ValueError("message.date must be a Unix timestamp")
+        return Message(
             source="telegram",
             sender=str(from_user.get("id", "unknown")),
-            content=message.get("text", ""),
-            timestamp=datetime.fromtimestamp(message.get("date", datetime.now().timestamp()))
+            content=_string(message.get("text", ""), "message.text"),
+            timestamp=datetime.fromtimestamp(date) if date is not None else datetime.now()
         )
 
 class EmailAdapter(BaseAdapter):
-    def transform(self, payload: Dict[str, Any]) -> IngestedEvent:
+    def extract(self, payload: Dict[str, Any]) -> Message:
         # Expected Email payload structure
-        return IngestedEvent(
+        date = payload.get("date")
+        return Message(
             source="email",
-            sender=payload.get("from", "unknown"),
-            content=payload.get("body", ""),
-            timestamp=datetime.fromisoformat(payload.get("date", datetime.now().isoformat()))
+            sender=_string(payload.get("from", "unknown"), "from"),
+            content=_string(payload.get("body", ""), "body"),
+            timestamp=datetime.fromisoformat(_string(date, "date")) if date is not None else datetime.now()
         )
 
 class WhatsAppAdapter(BaseAdapter):
-    def transform(self, payload: Dict[str, Any]) -> IngestedEvent:
+    def extract(self, payload: Dict[str, Any]) -> Message:
         # Expected WhatsApp payload structure (Experimental)
-        return IngestedEvent(
+        return Message(
             source="whatsapp",
-            sender=payload.get("sender_number", "unknown"),
-            content=payload.get("message_text", ""),
+            sender=_string(payload.get("sender_number", "unknown"), "sender_number"),
+            content=_string(payload.get("message_text", ""), "message_text"),
             timestamp=datetime.now() # WhatsApp payloads often need custom timing
         )
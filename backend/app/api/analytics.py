@@ -0,0 +1,29 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.services import score_store
+
+router = APIRouter(tags=["analytics"])
+
+@router.get("/analytics/scores")
+def score_aggregates(
+    start: date,
+    end: date,
+    source: Optional[List[str]] = Query(None),
+    percentiles: str = "50,95",
+):
+    """
+    Per source per day count, mean and percentiles of every score and risk
+    category, computed over the columnar score store. Enable with SCORE_STORE_DIR.
+    """
+    if not score_store.enabled():
+        raise HTTPException(status_code=404, detail="Score store is disabled")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    try:
+        pcts = tuple(int(p) for p in percentiles.split(",") if p.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles must be comma-separated integers")
+    if any(p < 0 or p > 100 for p in pcts):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    return score_store.aggregate(start, end, sources=source, percentiles=pcts)
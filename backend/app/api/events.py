@@ -1,49 +1,66 @@
+import asyncio
 import uuid
-from fastapi import APIRouter, HTTPException
+import hashlib
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import defer, selectinload
 from datetime import datetime
 from app.agents import pipeline
-from app.db.models import EventORM, ScoreORM, ReviewORM
-from app.db.session import SessionLocal
+from app.db.models import EventORM, ReviewORM
+from app.db.session import SessionLocal, engine
+from app.db import repository, search
 from app.models.event import Event
 from app.models.score import ScoreMatrix
 from app.models.review import ReviewCreate, ReviewRead
-from app.models.risk_semantic import RiskSemantic
 from app.models.explainability import Explainability, generate_reasoning
-from app.services import semantics
+from app.services.analysis_cache import analysis_cache
+from app.services import enrichment, metrics
+from app.services import profiling
 
 router = APIRouter()
 
+
+def _data_etag(db, scope: str) -> str:
+    """
+    Cheap version tag for read endpoints. Events and reviews are append-only,
+    and rows that are rewritten later (scores by rescore, analyses by deferred
+    enrichment) get a new id, so the highest row ids change whenever data does.
+    """
+    row = db.execute(text(
+        "SELECT (SELECT MAX(rowid) FROM events), (SELECT MAX(rowid) FROM scores), (SELECT MAX(id) FROM reviews), "
+        "(SELECT MAX(id) FROM analyses)"
+    )).one()
+    digest = hashlib.sha1(f"{scope}:{':'.join(map(str, row))}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def _not_modified(request: Request, etag: str):
+    """Return a 304 response if the client already holds this version."""
+    hit = request.headers.get("if-none-match") == etag
+    metrics.record_cache("etag", hit)
+    if hit:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+
 @router.post("/events")
-def create_event(event: Event):
-    score_matrix, risk_semantic, explainability, similar_events, llm_output = pipeline.process_event(event)
+def create_event(event: Event, request: Request, response: Response):
+    with profiling.profile_request("POST /events", profiling.requested_modes(request)) as profile:
+        score_matrix, risk_semantic, explainability, similar_events, llm_output = pipeline.process_event(event)
+    if profile:
+        response.headers["X-Profile-Id"] = profile.id
 
-    event_id = str(uuid.uuid4())
+    event.id = str(uuid.uuid4())
 
     db = SessionLocal()
     try:
-        event_orm = EventORM(
-            id=event_id,
-            content=event.content,
-            source=event.source,
-            timestamp=event.timestamp,
-            status=event.status.value if hasattr(event.status, "value") else str(event.status),
-        )
-        score_orm = ScoreORM(
-            event_id=event_id,
-            signal_strength=score_matrix.signal_strength,
-            historical_rarity=score_matrix.historical_rarity,
-            trend_acceleration=score_matrix.trend_acceleration,
-            cross_source_presence=score_matrix.cross_source_presence,
-            uncertainty=score_matrix.uncertainty,
-        )
-        event_orm.score = score_orm
-        db.add(event_orm)
-        db.commit()
+        repository.save_analyzed_event(db, event, score_matrix, risk_semantic, llm_output)
     finally:
         db.close()
 
-    event.id = event_id
-    return {
+    result = {
         "event": event,
         "score_matrix": score_matrix,
         "risk_semantics": risk_semantic,
@@ -52,13 +69,33 @@ def create_event(event: Event):
         "risk_summary": llm_output.get("summary"),
         "recommendation": llm_output.get("recommendation")
     }
+    if llm_output.get("deferred"):
+        # Deterministic summary for now; the LLM one follows at GET /events/{id}/enrichment
+        result["enrichment"] = "pending"
+    return result
 
 
 @router.get("/events")
-def list_events(limit: int = 100):
+def list_events(request: Request, response: Response, limit: int = 100, include_content: bool = True):
+    """
+    Most recent events with their scores. `include_content=false` skips
+    loading bodies and returns each event's content_hash instead.
+    """
     db = SessionLocal()
     try:
-        events = db.query(EventORM).order_by(EventORM.timestamp.desc()).limit(limit).all()
+        etag = _data_etag(db, f"events:{limit}:{include_content}")
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+        query = db.query(EventORM).options(selectinload(EventORM.score))
+        if include_content:
+            query = query.options(selectinload(EventORM.body))
+        else:
+            query = query.options(defer(EventORM.content))
+        events = query.order_by(EventORM.timestamp.desc()).limit(limit).all()
         results = []
         for event_orm in events:
             score_orm = event_orm.score
@@ -71,23 +108,64 @@ def list_events(limit: int = 100):
                     cross_source_presence=score_orm.cross_source_presence,
                     uncertainty=score_orm.uncertainty,
                 )
-            event_model = Event(
-                id=event_orm.id,
-                content=event_orm.content,
-                source=event_orm.source,
-                timestamp=event_orm.timestamp,
-                status=event_orm.status,
-            )
+            if include_content:
+                event_model = Event(
+                    id=event_orm.id,
+                    content=event_orm.body_text,
+                    source=event_orm.source,
+                    timestamp=event_orm.timestamp,
+                    status=event_orm.status,
+                )
+            else:
+                event_model = {
+                    "id": event_orm.id,
+                    "content_hash": event_orm.content_hash,
+                    "source": event_orm.source,
+                    "timestamp": event_orm.timestamp,
+                    "status": event_orm.status,
+                }
             results.append({"event": event_model, "score_matrix": score_matrix})
         return results
     finally:
         db.close()
 
 
+@router.get("/events/search")
+def search_events(
+    q: str,
+    source: Optional[List[str]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """
+    Full-text search over event content, best BM25 match first, with
+    highlighted snippets. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    db = SessionLocal()
+    try:
+        if not search.search_ready(engine):
+            raise HTTPException(status_code=503, detail="Search index is not available")
+        try:
+            return search.search(db, q, sources=source, start=start, end=end, limit=limit, cursor=cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    finally:
+        db.close()
+
+
 @router.get("/stats")
-def get_stats():
+def get_stats(request: Request, response: Response):
     db = SessionLocal()
     try:
+        etag = _data_etag(db, "stats")
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
         total_events = db.query(EventORM).count()
         total_reviews = db.query(ReviewORM).count()
         
@@ -125,7 +203,7 @@ def get_event(event_id: str):
         
         event_model = Event(
             id=event_orm.id,
-            content=event_orm.content,
+            content=event_orm.body_text,
             source=event_orm.source,
             timestamp=event_orm.timestamp,
             status=event_orm.status,
@@ -140,8 +218,7 @@ def get_event(event_id: str):
         ]
         
         # Calculate risk semantics on-the-fly
-        semantic_scores = semantics.calculate_semantics(event_orm.content)
-        risk_semantic = RiskSemantic(**semantic_scores)
+        risk_semantic = analysis_cache.get(event_model.content).risk_semantic()
         
         return {
             "event": event_model,
@@ -153,6 +230,46 @@ def get_event(event_id: str):
         db.close()
 
 
+def _enrichment_state(event_id: str) -> Optional[dict]:
+    with engine.connect() as conn:
+        row = conn.execute(text("""
+            SELECT events.status, analyses.summary, analyses.recommendation, analyses.analyzed_at,
+                   enrichment_queue.attempts, enrichment_queue.last_error,
+                   enrichment_queue.event_id IS NOT NULL
+            FROM events
+            LEFT JOIN analyses ON analyses.event_id = events.id
+            LEFT JOIN enrichment_queue ON enrichment_queue.event_id = events.id
+            WHERE events.id = :event_id
+        """), {"event_id": event_id}).first()
+    if row is None:
+        return None
+    status, summary, recommendation, analyzed_at, attempts, last_error, queued = row
+    if queued:
+        state = "failed" if attempts >= enrichment.enrichment_worker.max_attempts else "pending"
+    else:
+        state = "done" if status == "PROCESSED" else "none"
+    return {"event_id": event_id, "status": status, "enrichment": state, "attempts": attempts or 0,
+            "last_error": last_error, "summary": summary, "recommendation": recommendation,
+            "analyzed_at": analyzed_at}
+
+
+@router.get("/events/{event_id}/enrichment")
+async def get_enrichment(event_id: str, wait: float = Query(0, ge=0, le=30)):
+    """
+    State of the deferred LLM summary of an event: pending, done, failed, or
+    none (never deferred). With `wait`, waits up to that many seconds for a
+    pending enrichment to finish.
+    """
+    deadline = asyncio.get_running_loop().time() + wait
+    while True:
+        state = await run_in_threadpool(_enrichment_state, event_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if state["enrichment"] != "pending" or asyncio.get_running_loop().time() >= deadline:
+            return state
+        await asyncio.sleep(0.25)
+
+
 @router.post("/events/{event_id}/review")
 def create_review(event_id: str, review: ReviewCreate):
     db = SessionLocal()
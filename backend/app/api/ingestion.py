@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from app.api.adapters import TelegramAdapter, EmailAdapter, WhatsAppAdapter, IngestedEvent
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.api.adapters import TelegramAdapter, EmailAdapter, WhatsAppAdapter, IngestedEvent, Message, to_event
 from app.agents import pipeline
-from app.db.models import EventORM, ScoreORM
 from app.db.session import SessionLocal
-from app.models.event import Event, EventStatus
-from typing import Dict, Any
+from app.db import repository
+from typing import List, Union
 
 from app.services.notification import notification_service
+from app.services.alerting import alert_suppressor
+from app.services import profiling
+from app.services.admission import admission_controller
 
 router = APIRouter(prefix="/ingest", tags=["ingestion"])
 
@@ -14,97 +17,159 @@ telegram_adapter = TelegramAdapter()
 email_adapter = EmailAdapter()
 whatsapp_adapter = WhatsAppAdapter()
 
-def process_ingested_event(ingested: IngestedEvent):
-    # Convert to internal Event model for pipeline
-    event_model = Event(
-        content=ingested.content,
-        source=ingested.source,
-        timestamp=ingested.timestamp,
-        status=EventStatus.NEW
-    )
-    
-    # Process through pipeline
-    score_matrix, risk_semantic, explainability, similar_events, llm_output = pipeline.process_event(event_model)
-    
-    # Persist to DB
-    db = SessionLocal()
-    try:
-        event_orm = EventORM(
-            id=event_model.id,
-            content=event_model.content,
-            source=event_model.source,
-            timestamp=event_model.timestamp,
-            status=event_model.status.value
-        )
-        score_orm = ScoreORM(
-            event_id=event_model.id,
-            signal_strength=score_matrix.signal_strength,
-            historical_rarity=score_matrix.historical_rarity,
-            trend_acceleration=score_matrix.trend_acceleration,
-            cross_source_presence=score_matrix.cross_source_presence,
-            uncertainty=score_matrix.uncertainty,
-        )
-        event_orm.score = score_orm
-        db.add(event_orm)
-        db.commit()
-    finally:
-        db.close()
+# Webhook endpoints read the raw body themselves; this keeps it documented as a JSON object
+RAW_JSON_BODY = {"requestBody": {"required": True, "content": {"application/json": {"schema": {"type": "object"}}}}}
 
-    # Check for high risk and send alert
-    max_risk = max(
+def _max_risk(risk_semantic) -> float:
+    return max(
         risk_semantic.operational_risk, 
         risk_semantic.compliance_risk, 
         risk_semantic.reputational_risk, 
         risk_semantic.financial_risk
     )
-    
-    if max_risk >= 0.6:
+
+def _alert(event_model, risk_semantic, explainability, llm_output, max_risk: float):
+    # Repeats of an already-alerted event are suppressed and rolled into digests
+    decision = alert_suppressor.evaluate(
+        source=event_model.source,
+        category_scores=risk_semantic.model_dump(),
+        matched_keywords=explainability.matched_keywords,
+        content=event_model.content,
+        event_id=event_model.id,
+        risk_score=max_risk
+    )
+    if decision.send:
         notification_service.send_risk_alert(
             event_id=event_model.id,
             content=event_model.content,
             source=event_model.source,
             risk_summary=llm_output.get("summary", "No summary available."),
             recommendation=llm_output.get("recommendation", "Review immediately."),
-            risk_score=max_risk
+            risk_score=max_risk,
+            occurrences=decision.occurrences
         )
-    
-    return {
+
+def _processed(event_model, risk_semantic, explainability, llm_output) -> dict:
+    """Alert if needed and build the per-event result; the event is already stored."""
+    max_risk = _max_risk(risk_semantic)
+    if max_risk >= 0.6:
+        _alert(event_model, risk_semantic, explainability, llm_output, max_risk)
+    result = {
         "event_id": event_model.id,
-        "source": ingested.source,
+        "source": event_model.source,
         "status": "processed",
         "risk_level": "high" if max_risk >= 0.6 else "normal"
     }
+    if llm_output.get("deferred"):
+        # The LLM summary follows at GET /events/{event_id}/enrichment
+        result["enrichment"] = "pending"
+    return result
+
+def process_ingested_event(ingested: Union[IngestedEvent, Message], profile_modes: tuple = ()):
+    # Convert to internal Event model for pipeline
+    event_model = to_event(ingested)
+    
+    # Process through pipeline; under overload, admission control may skip retrieval and the LLM
+    with admission_controller.admit(event_model.source, event_model.content) as admission, \
+            profiling.profile_request(f"ingest/{ingested.source}", profile_modes) as profile:
+        score_matrix, risk_semantic, explainability, similar_events, llm_output = pipeline.process_event(
+            event_model, enrich=admission.enrich)
+    
+    # Persist to DB
+    db = SessionLocal()
+    try:
+        repository.save_analyzed_event(db, event_model, score_matrix, risk_semantic, llm_output)
+    finally:
+        db.close()
+
+    # Check for high risk and send alert
+    result = _processed(event_model, risk_semantic, explainability, llm_output)
+    if admission.outcome != "disabled":
+        result["admission"] = admission.outcome
+    if profile:
+        result["profile_id"] = profile.id
+    return result
+
+def process_ingested_batch(items: List[Union[IngestedEvent, Message]]) -> List[dict]:
+    """
+    Analyze a micro-batch and store it with a single commit.
+    Returns one result per input, in order; failures are reported per item.
+    """
+    results = [None] * len(items)
+    analyzed = []
+    for i, ingested in enumerate(items):
+        try:
+            event_model = to_event(ingested)
+            with admission_controller.admit(event_model.source, event_model.content) as admission:
+                score_matrix, risk_semantic, explainability, _, llm_output = pipeline.process_event(
+                    event_model, enrich=admission.enrich)
+            analyzed.append((i, event_model, score_matrix, risk_semantic, explainability, llm_output))
+        except Exception as e:
+            results[i] = {"source": ingested.source, "status": "error", "detail": str(e)}
+
+    if analyzed:
+        db = SessionLocal()
+        try:
+            repository.save_analyzed_events(db, [
+                (event_model, score_matrix, risk_semantic, llm_output)
+                for _, event_model, score_matrix, risk_semantic, _, llm_output in analyzed
+            ])
+        except Exception as e:
+            db.rollback()
+            for i, event_model, *_ in analyzed:
+                results[i] = {"source": event_model.source, "status": "error", "detail": str(e)}
+            return results
+        finally:
+            db.close()
+
+    for i, event_model, _, risk_semantic, explainability, llm_output in analyzed:
+        results[i] = _processed(event_model, risk_semantic, explainability, llm_output)
+    return results
 
 @router.post("/message")
-async def ingest_message(event: IngestedEvent):
+async def ingest_message(event: IngestedEvent, request: Request):
     """
     Generic ingestion endpoint for standard normalized messages.
     """
     try:
-        return process_ingested_event(event)
+        return await run_in_threadpool(process_ingested_event, event, profiling.requested_modes(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/telegram")
-async def ingest_telegram(payload: Dict[str, Any]):
+@router.post("/batch")
+def ingest_batch(events: List[IngestedEvent]):
+    """
+    Bulk ingestion of normalized messages.
+    Returns one result per input, in order; failures are reported per item.
+    """
+    results = []
+    for event in events:
+        try:
+            results.append(process_ingested_event(event))
+        except Exception as e:
+            results.append({"source": event.source, "status": "error", "detail": str(e)})
+    return results
+
+@router.post("/telegram", openapi_extra=RAW_JSON_BODY)
+async def ingest_telegram(request: Request):
     try:
-        ingested = telegram_adapter.transform(payload)
-        return process_ingested_event(ingested)
+        message = telegram_adapter.decode(await request.body())
+        return await run_in_threadpool(process_ingested_event, message, profiling.requested_modes(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/email")
-async def ingest_email(payload: Dict[str, Any]):
+@router.post("/email", openapi_extra=RAW_JSON_BODY)
+async def ingest_email(request: Request):
     try:
-        ingested = email_adapter.transform(payload)
-        return process_ingested_event(ingested)
+        message = email_adapter.decode(await request.body())
+        return await run_in_threadpool(process_ingested_event, message, profiling.requested_modes(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/whatsapp")
-async def ingest_whatsapp(payload: Dict[str, Any]):
+@router.post("/whatsapp", openapi_extra=RAW_JSON_BODY)
+async def ingest_whatsapp(request: Request):
     try:
-        ingested = whatsapp_adapter.transform(payload)
-        return process_ingested_event(ingested)
+        message = whatsapp_adapter.decode(await request.body())
+        return await run_in_threadpool(process_ingested_event, message, profiling.requested_modes(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
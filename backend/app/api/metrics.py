@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.services import metrics
+from app.services.circuit import openai_breaker
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus text exposition of this worker's metrics.
+    Enable with METRICS_ENABLED=1.
+    """
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/circuit-breakers")
+def get_circuit_breakers():
+    """State of the circuit breakers around external APIs."""
+    return {"openai": openai_breaker.snapshot()}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+import os
+from app.services import profiling
+
+router = APIRouter(prefix="/profiles", tags=["profiling"])
+
+@router.get("")
+def list_profiles(limit: int = 50):
+    """
+    Recently captured request profiles, newest first.
+    """
+    return profiling.list_profiles(limit)
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str):
+    """
+    Span tree, top cumulative-time functions and allocation sites of one profile.
+    """
+    record = profiling.load_profile(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
+
+@router.get("/{profile_id}/pstats")
+def download_pstats(profile_id: str):
+    """
+    Raw cProfile dump, for `python -m pstats` or snakeviz.
+    """
+    path = profiling.profile_path(profile_id, ".prof")
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="CPU profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -0,0 +1,201 @@
+"""
+Long-lived streaming ingestion.
+
+Producers keep one connection open and send IngestedEvent records as
+newline-delimited JSON instead of one POST per message:
+
+    WS   /ingest/stream   text frames, each holding one or more NDJSON records
+    POST /ingest/stream   a (chunked) application/x-ndjson request body; the
+                          acks stream back in the response while it uploads
+
+Every record gets one ack line, in input order:
+
+    {"seq": 0, "event_id": "...", "source": "email", "status": "processed", "risk_level": "normal"}
+    {"seq": 1, "status": "error", "detail": "..."}
+
+Records wait in a bounded per-connection queue (STREAM_QUEUE_SIZE). When it is
+full the connection is not read any further, so backpressure reaches the
+producer through TCP instead of memory growing; a consumer that stops reading
+its acks stalls the same way. A worker takes up to STREAM_BATCH_SIZE records,
+waiting at most STREAM_BATCH_WAIT_MS for a batch to fill, and runs each batch
+through the pipeline in the threadpool with a single commit.
+"""
+import asyncio
+import json
+import os
+import weakref
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from app.api.adapters import IngestedEvent
+from app.api.ingestion import process_ingested_batch
+from app.services import metrics
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "32"))
+STREAM_BATCH_WAIT_MS = int(os.getenv("STREAM_BATCH_WAIT_MS", "20"))
+STREAM_MAX_RECORD_BYTES = int(os.getenv("STREAM_MAX_RECORD_BYTES", str(1024 * 1024)))
+
+router = APIRouter(prefix="/ingest", tags=["ingestion"])
+
+NDJSON_BODY = {"requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string"}}}}}
+
+_END = object()
+_streams = weakref.WeakSet()
+metrics.QUEUE_DEPTH.set_function(lambda: sum(s.queue.qsize() for s in list(_streams)), queue="ingest_stream")
+
+
+def _parse(line: bytes):
+    """An IngestedEvent, or the error message for an invalid record."""
+    try:
+        return IngestedEvent.model_validate_json(line)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'record'}: {err['msg']}" for err in e.errors())
+
+
+class IngestStream:
+    """Splits incoming bytes into records, queues them, and yields acks batch by batch."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        self._seq = 0
+        self._partial = b""
+        self._oversized = False
+        self._ended = False
+        _streams.add(self)
+
+    async def _put(self, record):
+        await self.queue.put((self._seq, record))
+        self._seq += 1
+
+    async def feed(self, data: bytes):
+        """Queue every complete line in `data`; waits while the queue is full."""
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if self._oversized:
+                # Tail of a record already rejected for its size
+                self._oversized = False
+                continue
+            if line.strip():
+                await self._put(_parse(line) if len(line) <= STREAM_MAX_RECORD_BYTES else
+                                f"record exceeds {STREAM_MAX_RECORD_BYTES} bytes")
+        if len(self._partial) > STREAM_MAX_RECORD_BYTES:
+            if not self._oversized:
+                await self._put(f"record exceeds {STREAM_MAX_RECORD_BYTES} bytes")
+                self._oversized = True
+            self._partial = b""
+
+    async def close(self):
+        """End of input: queue a final unterminated record, then the end marker."""
+        if self._partial.strip() and not self._oversized:
+            await self._put(_parse(self._partial))
+        self._partial = b""
+        await self.queue.put(_END)
+
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        item = await self.queue.get()
+        if item is _END:
+            self._ended = True
+            return []
+        batch = [item]
+        deadline = loop.time() + STREAM_BATCH_WAIT_MS / 1000
+        while len(batch) < STREAM_BATCH_SIZE:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _END:
+                self._ended = True
+                break
+            batch.append(item)
+        return batch
+
+    async def acks(self):
+        """Ack dicts in input order until the input ends."""
+        while not self._ended:
+            batch = await self._next_batch()
+            valid = [(seq, record) for seq, record in batch if isinstance(record, IngestedEvent)]
+            results = {}
+            if valid:
+                processed = await run_in_threadpool(process_ingested_batch, [record for _, record in valid])
+                results = dict(zip((seq for seq, _ in valid), processed))
+            for seq, record in batch:
+                yield {"seq": seq, **results.get(seq, {"status": "error", "detail": record})}
+
+
+class _DuplexResponse(StreamingResponse):
+    """
+    Streams while the request body is still being read. StreamingResponse
+    normally also waits on receive() for a disconnect, which would swallow
+    body chunks the reader task needs.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@router.websocket("/stream")
+async def ingest_stream_ws(websocket: WebSocket):
+    await websocket.accept()
+    stream = IngestStream()
+
+    async def read():
+        try:
+            # A frame always ends a record, newline or not
+            async for frame in websocket.iter_text():
+                await stream.feed(frame.encode() + b"\n")
+        finally:
+            await stream.close()
+
+    reader = asyncio.create_task(read())
+    connected = True
+    try:
+        async for ack in stream.acks():
+            # After a disconnect, records already received are still stored
+            if connected:
+                try:
+                    await websocket.send_text(json.dumps(ack))
+                except (WebSocketDisconnect, RuntimeError):
+                    connected = False
+    finally:
+        reader.cancel()
+
+
+@router.post("/stream", openapi_extra=NDJSON_BODY)
+async def ingest_stream_ndjson(request: Request):
+    """
+    Upload IngestedEvent records as NDJSON; acks are streamed back as NDJSON
+    while the upload is in progress.
+    """
+    stream = IngestStream()
+
+    async def read():
+        try:
+            async for chunk in request.stream():
+                await stream.feed(chunk)
+        except ClientDisconnect:
+            pass
+        finally:
+            await stream.close()
+
+    async def acks():
+        reader = asyncio.create_task(read())
+        try:
+            async for ack in stream.acks():
+                yield json.dumps(ack) + "\n"
+        finally:
+            reader.cancel()
+
+    return _DuplexResponse(acks(), media_type="application/x-ndjson")
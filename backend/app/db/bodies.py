@@ -0,0 +1,85 @@
+"""
+Content-addressed storage of event bodies.
+
+Bodies of at least BODY_DEDUP_MIN_BYTES are stored once in the `bodies`
+table, zlib-compressed and keyed by a hash of the text, and events reference
+them through `events.content_hash` with `events.content` left NULL. Shorter
+bodies stay inline, where they cost less than the reference would. Raw SQL
+readers get the text of either form with EVENT_TEXT / BODY_JOIN, backed by
+an `inflate()` SQL function registered on every SQLite connection.
+"""
+import os
+import hashlib
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import event, inspect, text
+
+BODY_DEDUP_MIN_BYTES = int(os.getenv("BODY_DEDUP_MIN_BYTES", "48"))
+
+# Use inside raw SQL over `events`: SELECT ..., {EVENT_TEXT} FROM events {BODY_JOIN}
+EVENT_TEXT = "COALESCE(events.content, inflate(bodies.data))"
+BODY_JOIN = "LEFT JOIN bodies ON bodies.hash = events.content_hash"
+
+INSERT_BODY = text(
+    "INSERT OR IGNORE INTO bodies (hash, data, size, created_at) VALUES (:hash, :data, :size, :created_at)"
+)
+
+
+def content_hash(content: str) -> str:
+    # 128 bits of SHA-256 is plenty to address bodies and keeps the reference short
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def compress(content: str) -> bytes:
+    return zlib.compress(content.encode("utf-8"), 6)
+
+
+@lru_cache(maxsize=2048)
+def inflate(data: bytes) -> str:
+    """Decompress a stored body; repeated bodies are decoded once."""
+    return zlib.decompress(data).decode("utf-8") if data is not None else None
+
+
+def register(engine):
+    """Make `inflate(blob)` available to SQL on every connection of `engine`."""
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("inflate", 1, inflate, deterministic=True)
+
+
+def should_dedup(content: str) -> bool:
+    return len(content) >= BODY_DEDUP_MIN_BYTES
+
+
+def store(db, content: str) -> str:
+    """Store `content` once (inside the caller's transaction) and return its hash."""
+    digest = content_hash(content)
+    encoded = compress(content)
+    db.execute(INSERT_BODY, {"hash": digest, "data": encoded, "size": len(content), "created_at": datetime.utcnow()})
+    return digest
+
+
+def insert_params(content: str, created_at: datetime) -> dict:
+    """Parameters for INSERT_BODY, for bulk inserts."""
+    return {"hash": content_hash(content), "data": compress(content), "size": len(content), "created_at": created_at}
+
+
+def ensure_schema(engine):
+    """
+    Add `events.content_hash` to databases created before bodies existed.
+    Events keep their inline content until `app.jobs.migrate_bodies` runs.
+    """
+    columns = {c["name"]: c for c in inspect(engine).get_columns("events")}
+    if "content_hash" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE events ADD COLUMN content_hash VARCHAR(32) REFERENCES bodies(hash)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_content_hash ON events (content_hash)"))
+    dedup_ready.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def dedup_ready(engine) -> bool:
+    """Legacy tables have content NOT NULL; those keep storing bodies inline until migrated."""
+    columns = {c["name"]: c for c in inspect(engine).get_columns("events")}
+    return "content_hash" in columns and columns["content"]["nullable"]
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, LargeBinary, String, Text
 from sqlalchemy.orm import relationship
 
+from app.db import bodies
 from app.db.session import Base
 
 
@@ -8,11 +9,15 @@ class EventORM(Base):
     __tablename__ = "events"
 
     id = Column(String, primary_key=True, index=True)
-    content = Column(Text, nullable=False)
+    # Inline text for short bodies; longer ones live in `bodies` under content_hash
+    content = Column(Text, nullable=True)
+    content_hash = Column(String(32), ForeignKey("bodies.hash"), nullable=True, index=True)
     source = Column(String, nullable=False)
     timestamp = Column(DateTime, nullable=False)
     status = Column(String, nullable=False)
 
+    body = relationship("BodyORM")
+
     score = relationship(
         "ScoreORM",
         back_populates="event",
@@ -20,6 +25,44 @@ class EventORM(Base):
         cascade="all, delete-orphan",
     )
     reviews = relationship("ReviewORM", back_populates="event", cascade="all, delete-orphan")
+    enrichment = relationship("EnrichmentORM", uselist=False, cascade="all, delete-orphan")
+    analysis = relationship(
+        "AnalysisORM",
+        back_populates="event",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def body_text(self) -> str:
+        if self.content is not None:
+            return self.content
+        return self.body.text if self.body is not None else ""
+
+
+class BodyORM(Base):
+    __tablename__ = "bodies"
+
+    hash = Column(String(32), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    @property
+    def text(self) -> str:
+        return bodies.inflate(self.data)
+
+
+class EmbeddingORM(Base):
+    __tablename__ = "embeddings"
+
+    # content_hash of the embedded text, so repeated bodies are embedded once
+    hash = Column(String(32), primary_key=True)
+    model = Column(String, primary_key=True)
+    dims = Column(Integer, nullable=False)
+    # Little-endian float32
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False)
 
 
 class ScoreORM(Base):
@@ -36,6 +79,35 @@ class ScoreORM(Base):
     event = relationship("EventORM", back_populates="score")
 
 
+class AnalysisORM(Base):
+    __tablename__ = "analyses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, ForeignKey("events.id"), nullable=False, unique=True)
+    operational_risk = Column(Float, nullable=False)
+    compliance_risk = Column(Float, nullable=False)
+    reputational_risk = Column(Float, nullable=False)
+    financial_risk = Column(Float, nullable=False)
+    anchor_version = Column(String, nullable=False)
+    summary = Column(Text, nullable=True)
+    recommendation = Column(Text, nullable=True)
+    analyzed_at = Column(DateTime, nullable=False)
+
+    event = relationship("EventORM", back_populates="analysis")
+
+
+class EnrichmentORM(Base):
+    __tablename__ = "enrichment_queue"
+
+    # Events stored with the deterministic summary, waiting for the LLM one
+    event_id = Column(String, ForeignKey("events.id"), primary_key=True)
+    enqueued_at = Column(DateTime, nullable=False)
+    # Due time; a worker that claims the row pushes it out by its lease
+    not_before = Column(DateTime, nullable=False, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+
 class ReviewORM(Base):
     __tablename__ = "reviews"
 
@@ -0,0 +1,83 @@
+"""
+Write path shared by every endpoint that persists an analyzed event.
+"""
+from datetime import datetime
+from app.db import bodies, search
+from app.db.models import AnalysisORM, EnrichmentORM, EventORM, ScoreORM
+from app.models.event import Event
+from app.models.risk_semantic import RiskSemantic
+from app.models.score import ScoreMatrix
+from app.services import enrichment, metrics, retrieval, score_store, semantics
+
+
+def _event_orm(db, event: Event, score_matrix: ScoreMatrix, risk_semantic: RiskSemantic,
+               llm_output: dict) -> EventORM:
+    event_orm = EventORM(
+        id=event.id,
+        source=event.source,
+        timestamp=event.timestamp,
+        status=event.status.value if hasattr(event.status, "value") else str(event.status),
+    )
+    if bodies.should_dedup(event.content) and bodies.dedup_ready(db.get_bind()):
+        event_orm.content_hash = bodies.store(db, event.content)
+    else:
+        event_orm.content = event.content
+    event_orm.score = ScoreORM(
+        event_id=event.id,
+        signal_strength=score_matrix.signal_strength,
+        historical_rarity=score_matrix.historical_rarity,
+        trend_acceleration=score_matrix.trend_acceleration,
+        cross_source_presence=score_matrix.cross_source_presence,
+        uncertainty=score_matrix.uncertainty,
+    )
+    event_orm.analysis = AnalysisORM(
+        event_id=event.id,
+        operational_risk=risk_semantic.operational_risk,
+        compliance_risk=risk_semantic.compliance_risk,
+        reputational_risk=risk_semantic.reputational_risk,
+        financial_risk=risk_semantic.financial_risk,
+        anchor_version=semantics.ANCHOR_VERSION,
+        summary=llm_output.get("summary"),
+        recommendation=llm_output.get("recommendation"),
+        analyzed_at=datetime.utcnow(),
+    )
+    if llm_output.get("deferred"):
+        now = datetime.utcnow()
+        event_orm.enrichment = EnrichmentORM(event_id=event.id, enqueued_at=now, not_before=now, attempts=0)
+    return event_orm
+
+
+def save_analyzed_events(db, rows: list) -> list[EventORM]:
+    """
+    Persist (event, score_matrix, risk_semantic, llm_output) rows in one
+    transaction and commit once. Every `event.id` must already be set.
+    """
+    orms = [_event_orm(db, *row) for row in rows]
+    db.add_all(orms)
+    with metrics.stage("db_commit"):
+        db.flush()
+        for event, *_ in rows:
+            search.index_event(db, event.id, event.content)
+        db.commit()
+    # Best-effort hooks: the rows are committed, so a failure here must not fail the write
+    for event, score_matrix, risk_semantic, _ in rows:
+        try:
+            retrieval.index_event(event.id, event.content)
+        except Exception as e:
+            print(f"Error indexing event {event.id} for retrieval: {e}")
+        try:
+            score_store.append(event.timestamp, event.source, score_matrix.model_dump(), risk_semantic.model_dump())
+        except Exception as e:
+            print(f"Error appending event {event.id} to score store: {e}")
+    if any(llm_output.get("deferred") for *_, llm_output in rows):
+        enrichment.enrichment_worker.notify()
+    return orms
+
+
+def save_analyzed_event(db, event: Event, score_matrix: ScoreMatrix, risk_semantic: RiskSemantic,
+                        llm_output: dict) -> EventORM:
+    """
+    Persist an event with its score matrix and semantic analysis and commit.
+    `event.id` must already be set.
+    """
+    return save_analyzed_events(db, [(event, score_matrix, risk_semantic, llm_output)])[0]
@@ -0,0 +1,139 @@
+"""
+Full-text search over event bodies with SQLite FTS5.
+
+`events_fts` is an external-content FTS5 table: it stores only the index and
+reads text back through the `events_text` view, so bodies are not duplicated
+(deduplicated bodies are inflated on demand for snippets). The write path
+indexes each new event inside its own transaction; `ensure_schema` creates
+the table and catches up on events written by other means (seeding, older
+versions) at startup.
+"""
+import base64
+from functools import lru_cache
+from sqlalchemy import inspect, text
+from app.db import bodies
+
+# Longer queries (whole event bodies used for similarity) keep their first terms only
+MAX_QUERY_TERMS = 32
+
+INDEX_EVENT = text(
+    "INSERT INTO events_fts (rowid, content) SELECT rowid, :content FROM events WHERE id = :id"
+)
+
+
+def ensure_schema(engine):
+    """Create the FTS5 index if missing and index every event it hasn't seen yet."""
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE VIEW IF NOT EXISTS events_text AS
+            SELECT events.rowid AS event_rowid, {bodies.EVENT_TEXT} AS content FROM events {bodies.BODY_JOIN}
+        """))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+            "content, content='events_text', content_rowid='event_rowid', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        # The docsize shadow table holds one row per indexed document
+        conn.execute(text(f"""
+            INSERT INTO events_fts (rowid, content)
+            SELECT events.rowid, {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN}
+            WHERE events.rowid > (SELECT COALESCE(MAX(id), 0) FROM events_fts_docsize)
+            ORDER BY events.rowid
+        """))
+    search_ready.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def search_ready(engine) -> bool:
+    return "events_fts" in inspect(engine).get_table_names()
+
+
+def index_event(db, event_id: str, content: str):
+    """Write-path hook: index a flushed event inside the caller's transaction."""
+    if search_ready(db.get_bind()):
+        db.execute(INDEX_EVENT, {"id": event_id, "content": content})
+
+
+def match_query(query: str, any_term: bool = False) -> str:
+    """
+    Turn free text into an FTS5 query: every whitespace-separated term is
+    quoted, so punctuation and operators in user input can't cause syntax
+    errors. Terms are ANDed, or ORed with `any_term`.
+    """
+    terms = []
+    for term in query.split():
+        quoted = '"' + term.replace('"', '""') + '"'
+        if quoted not in terms:
+            terms.append(quoted)
+    terms = terms[:MAX_QUERY_TERMS]
+    return (" OR " if any_term else " ").join(terms)
+
+
+def encode_cursor(rank: float, rowid: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}:{rowid}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Raises ValueError for a malformed cursor."""
+    rank, rowid = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    return float(rank), int(rowid)
+
+
+def search(db, query: str, sources: list = None, start=None, end=None, limit: int = 20,
+           cursor: str = None, any_term: bool = False) -> dict:
+    """
+    Events matching `query`, best BM25 match first, with highlighted snippets.
+    Returns {"results": [...], "next_cursor": str or None}; pass next_cursor
+    back to continue after the last result.
+    """
+    match = match_query(query, any_term)
+    if not match:
+        return {"results": [], "next_cursor": None}
+    conditions = ["events_fts MATCH :match"]
+    params = {"match": match, "limit": limit + 1}
+    if sources:
+        names = {f"source_{i}": source for i, source in enumerate(sources)}
+        conditions.append(f"events.source IN ({', '.join(':' + name for name in names)})")
+        params.update(names)
+    if start is not None:
+        conditions.append("events.timestamp >= :start")
+        params["start"] = start.isoformat(sep=" ")
+    if end is not None:
+        conditions.append("events.timestamp < :end")
+        params["end"] = end.isoformat(sep=" ")
+    if cursor:
+        # (rank, rowid) keyset: strictly after the last result of the previous page
+        params["after_rank"], params["after_rowid"] = decode_cursor(cursor)
+        conditions.append("(events_fts.rank > :after_rank OR (events_fts.rank = :after_rank AND events.rowid > :after_rowid))")
+
+    rows = db.execute(text(f"""
+        SELECT events.rowid, events.id, events.source, events.timestamp, events.status, events_fts.rank,
+               snippet(events_fts, 0, '<mark>', '</mark>', '…', 12)
+        FROM events_fts JOIN events ON events.rowid = events_fts.rowid
+        WHERE {' AND '.join(conditions)}
+        ORDER BY events_fts.rank, events.rowid
+        LIMIT :limit
+    """), params).all()
+
+    page = rows[:limit]
+    results = [
+        {"id": event_id, "source": source, "timestamp": timestamp, "status": status,
+         "score": round(-rank, 4), "snippet": snippet}
+        for _, event_id, source, timestamp, status, rank, snippet in page
+    ]
+    next_cursor = encode_cursor(page[-1][5], page[-1][0]) if len(rows) > limit else None
+    return {"results": results, "next_cursor": next_cursor}
+
+
+def candidates(db, query: str, limit: int) -> list[dict]:
+    """
+    Up to `limit` events sharing any term with `query`, best BM25 match
+    first, as {"id", "content"} dicts for a re-ranker.
+    """
+    match = match_query(query, any_term=True)
+    if not match:
+        return []
+    rows = db.execute(text("""
+        SELECT events.id, events_fts.content FROM events_fts JOIN events ON events.rowid = events_fts.rowid
+        WHERE events_fts MATCH :match ORDER BY events_fts.rank LIMIT :limit
+    """), {"match": match, "limit": limit}).all()
+    return [{"id": event_id, "content": content} for event_id, content in rows]
@@ -0,0 +1,59 @@
+"""
+Builder process for the shared similarity index.
+
+Owns the TF-IDF index and the risk anchor set and republishes them as a new
+generation under SHARED_INDEX_DIR (or --dir) every --interval seconds. Run
+one builder next to any number of API workers started with the same
+SHARED_INDEX_DIR:
+
+    python -m app.jobs.build_index --dir ./shared_index --interval 60
+    SHARED_INDEX_DIR=./shared_index python -m uvicorn app.main:app --workers 8
+"""
+import argparse
+import time
+from sqlalchemy import text
+
+from app.db import bodies
+from app.db.models import Base
+from app.db.session import engine
+from app.services import semantics, shared_index
+
+
+def iter_documents(chunk_size: int = 5000):
+    """Stream (event_id, content) for every stored event."""
+    query = text(f"""
+        SELECT events.rowid, events.id, {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN}
+        WHERE events.rowid > :after ORDER BY events.rowid LIMIT :limit
+    """)
+    after = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(query, {"after": after, "limit": chunk_size}).all()
+        if not rows:
+            return
+        for _, event_id, content in rows:
+            yield event_id, content
+        after = rows[-1][0]
+
+
+def build_once(directory: str) -> int:
+    started = time.perf_counter()
+    # Re-read the YAML so anchor edits reach the workers without a restart
+    anchors, anchor_version = semantics.load_anchors()
+    number = shared_index.build_generation(directory, iter_documents(), anchors, anchor_version)
+    print(f"Published generation {number} in {time.perf_counter() - started:.1f}s")
+    return number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and publish the shared similarity index")
+    parser.add_argument("--dir", default=shared_index.SHARED_INDEX_DIR or "./shared_index")
+    parser.add_argument("--interval", type=float, default=0, help="Rebuild every N seconds (0 = build once)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+    build_once(args.dir)
+    while args.interval > 0:
+        time.sleep(args.interval)
+        build_once(args.dir)
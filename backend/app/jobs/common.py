@@ -0,0 +1,68 @@
+"""
+Helpers shared by the offline jobs: resumable checkpoints and progress reporting.
+"""
+import json
+import os
+import sys
+import time
+
+
+class Checkpoint:
+    """
+    JSON checkpoint written atomically after each committed chunk, so an
+    interrupted job resumes from the last durable position.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **values):
+        self.state.update(values)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.state = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Progress:
+    """Prints processed counts and throughput at most every `interval` seconds."""
+
+    def __init__(self, total: int = None, interval: float = 2.0, unit: str = "events"):
+        self.total = total
+        self.interval = interval
+        self.unit = unit
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def advance(self, count: int):
+        self.done += count
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._print()
+
+    def finish(self):
+        self._print()
+        print(file=sys.stderr)
+
+    def _print(self):
+        total = f"/{self.total}" if self.total is not None else ""
+        print(f"\r{self.done}{total} {self.unit}  {self.rate:,.0f} {self.unit}/s", end="", file=sys.stderr, flush=True)
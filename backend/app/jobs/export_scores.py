@@ -0,0 +1,76 @@
+"""
+Export stored scores into the columnar score store.
+
+Backfills SCORE_STORE_DIR (or --dir) from the SQL tables, e.g. when the store
+is first enabled or after `app.jobs.rescore` rewrote the scores. With
+--replace the existing partitions are removed first; run it while the API is
+not writing, or new rows may be counted twice.
+
+    python -m app.jobs.export_scores --dir ./score_store --replace
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import text
+
+from app.db import bodies
+from app.db.models import Base
+from app.db.session import engine
+from app.jobs.common import Progress
+from app.services import score_store
+
+EXPORT_QUERY = text("""
+    SELECT e.rowid, e.timestamp, e.source,
+           s.signal_strength, s.historical_rarity, s.trend_acceleration, s.cross_source_presence, s.uncertainty,
+           a.operational_risk, a.compliance_risk, a.reputational_risk, a.financial_risk
+    FROM events e
+    JOIN scores s ON s.event_id = e.id
+    LEFT JOIN analyses a ON a.event_id = e.id
+    WHERE e.rowid > :after
+    ORDER BY e.rowid
+    LIMIT :limit
+""")
+
+
+def _parse_timestamp(value):
+    # SQLite hands raw text back for textual SQL
+    return value if hasattr(value, "strftime") else datetime.fromisoformat(value)
+
+
+def export(directory: str, chunk_size: int = 20000, replace: bool = False) -> int:
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+    if replace:
+        score_store.clear(directory)
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT COUNT(*) FROM scores")).scalar()
+
+    store = score_store.ScoreStore(directory, segment="export")
+    progress = Progress(total=total)
+    after = 0
+    try:
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(EXPORT_QUERY, {"after": after, "limit": chunk_size}).all()
+            if not rows:
+                break
+            store.append_many(
+                (_parse_timestamp(row[1]), row[2], dict(zip(score_store.COLUMNS, (v or 0.0 for v in row[3:]))))
+                for row in rows
+            )
+            after = rows[-1][0]
+            progress.advance(len(rows))
+    finally:
+        store.close()
+    progress.finish()
+    print(f"Exported {progress.done} events at {progress.rate:,.0f} events/s")
+    return progress.done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export scores into the columnar score store")
+    parser.add_argument("--dir", default=score_store.SCORE_STORE_DIR or "./score_store")
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--replace", action="store_true", help="Remove existing partitions first")
+    args = parser.parse_args()
+
+    export(args.dir, args.chunk_size, args.replace)
@@ -0,0 +1,448 @@
+"""
+Bulk import of chat and mail history from export files.
+
+    python -m app.jobs.import_history telegram result.json --workers 8
+    python -m app.jobs.import_history mbox archive.mbox
+    python -m app.jobs.import_history whatsapp "WhatsApp Chat.txt" --month-first
+
+Supported files:
+
+    telegram  Telegram Desktop JSON export (result.json of one chat or of a
+              whole account)
+    mbox      mbox mail archive
+    whatsapp  WhatsApp "Export chat" text file (Android or iOS)
+
+Files are parsed incrementally: a reader yields one record at a time along
+with the byte offset where the next record starts, so memory stays flat on
+multi-GB exports. Records go through the same adapters as the webhooks, the
+deterministic analysis runs on a process pool (no LLM summaries), and each
+chunk of events, bodies, scores, analyses and full-text entries is written
+in one transaction. The offset after the last committed chunk is
+checkpointed, so an interrupted import resumes where it stopped. Event ids
+are derived from the message itself, and from its position among identical
+messages (same sender, time and text), so importing the same records twice
+does not create duplicates and distinct messages are never merged.
+
+Imported events are stored as SCORED and never alert. The in-memory
+similarity index of a running API picks them up on its next restart.
+"""
+import argparse
+import codecs
+import json
+import os
+import re
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from email import message_from_bytes, policy
+from email.utils import parsedate_to_datetime
+from functools import partial
+from sqlalchemy import text
+
+from app.api.adapters import EmailAdapter, TelegramAdapter, WhatsAppAdapter
+from app.db import bodies, search
+from app.db.models import Base
+from app.db.session import engine
+from app.jobs.common import Checkpoint, Progress
+from app.jobs.rescore import ANALYSES_UPSERT, SCORES_UPSERT, analyze_rows
+from app.models.event import EventStatus
+from app.services import score_store
+
+# Bytes read from the export at a time
+READ_CHUNK = 1 << 20
+
+EVENT_INSERT = text("""
+    INSERT OR IGNORE INTO events (id, content, content_hash, source, timestamp, status)
+    VALUES (:id, :content, :content_hash, :source, :timestamp, :status)
+""")
+MAX_ROWID = text("SELECT COALESCE(MAX(rowid), 0) FROM events")
+INDEX_NEW_EVENTS = text(f"""
+    INSERT INTO events_fts (rowid, content)
+    SELECT events.rowid, {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN}
+    WHERE events.rowid > :after ORDER BY events.rowid
+""")
+NEW_EVENT_IDS = text("SELECT id FROM events WHERE rowid > :after")
+
+_EVENT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "urn:risk-events:import")
+
+telegram_adapter = TelegramAdapter()
+email_adapter = EmailAdapter()
+whatsapp_adapter = WhatsAppAdapter()
+
+
+# --- Telegram -------------------------------------------------------------
+
+_MESSAGES_ARRAY = re.compile(r'"messages"\s*:\s*\[')
+
+
+class _JsonArrays:
+    """
+    Walks the elements of every "messages" array in a JSON document held in
+    a file, decoding one element at a time. `offset` is the byte offset of
+    the current position, valid for resuming inside an array.
+    """
+
+    def __init__(self, f, offset: int, in_array: bool):
+        self.f = f
+        self.offset = offset
+        self.in_array = in_array
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+
+    def _advance(self, end: int):
+        self.offset += len(self.buffer[self.pos:end].encode("utf-8"))
+        self.pos = end
+
+    def _fill(self) -> bool:
+        data = self.f.read(READ_CHUNK)
+        self.buffer = self.buffer[self.pos:] + self._decoder.decode(data, final=not data)
+        self.pos = 0
+        self.eof = not data
+        return bool(data)
+
+    def __iter__(self):
+        while True:
+            if not self.in_array:
+                match = _MESSAGES_ARRAY.search(self.buffer, self.pos)
+                if match:
+                    self._advance(match.end())
+                    self.in_array = True
+                    continue
+                # Keep a tail in case the key is split across reads
+                self._advance(max(self.pos, len(self.buffer) - 32))
+                if not self._fill():
+                    return
+                continue
+
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n,":
+                self.pos += 1
+                self.offset += 1
+            if self.pos >= len(self.buffer):
+                if not self._fill():
+                    raise ValueError("Export ends inside a messages array")
+                continue
+            if self.buffer[self.pos] == "]":
+                self._advance(self.pos + 1)
+                self.in_array = False
+                continue
+            try:
+                element, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Element continues past the buffer
+                if self._fill():
+                    continue
+                raise
+            self._advance(end)
+            yield self.offset, element
+
+
+def read_telegram(path: str, start: int = 0):
+    """(offset after the record, message dict) for each entry of the export's messages arrays."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        yield from _JsonArrays(f, start, in_array=start > 0)
+
+
+def _telegram_text(value) -> str:
+    # Formatted messages are a list of plain strings and {"type": ..., "text": ...} entities
+    if isinstance(value, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in value)
+    return value or ""
+
+
+def telegram_message(record: dict):
+    if record.get("type") != "message":
+        return None
+    date = record.get("date_unixtime")
+    date = int(date) if date is not None else int(datetime.fromisoformat(record["date"]).timestamp())
+    return telegram_adapter.extract({"message": {
+        "date": date,
+        "text": _telegram_text(record.get("text")),
+        "from": {"id": record.get("from_id", "unknown")},
+    }})
+
+
+# --- mbox -----------------------------------------------------------------
+
+_ESCAPED_FROM = re.compile(rb"^>(>*From )")
+_TAG = re.compile(r"<[^>]+>")
+
+
+def read_mbox(path: str, start: int = 0):
+    """(offset of the next "From " line, raw message bytes) for each message."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        lines = []
+        for line in f:
+            if line.startswith(b"From "):
+                if lines:
+                    yield offset, b"".join(lines)
+                lines = []
+            elif line.startswith(b">"):
+                lines.append(_ESCAPED_FROM.sub(rb"\1", line))
+            else:
+                lines.append(line)
+            offset += len(line)
+        if lines:
+            yield offset, b"".join(lines)
+
+
+def _local_naive(moment: datetime) -> datetime:
+    # Stored like the webhook timestamps: naive local time
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def email_message(raw: bytes):
+    message = message_from_bytes(raw, policy=policy.default)
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return None
+    try:
+        body = part.get_content()
+    except LookupError:
+        # Unknown charset
+        body = part.get_payload(decode=True).decode("utf-8", errors="replace")
+    if part.get_content_subtype() == "html":
+        body = _TAG.sub(" ", body)
+    payload = {"from": str(message.get("From", "unknown")), "body": body.strip()}
+    if message.get("Date"):
+        payload["date"] = _local_naive(parsedate_to_datetime(str(message["Date"]))).isoformat()
+    return email_adapter.extract(payload)
+
+
+# --- WhatsApp -------------------------------------------------------------
+
+# "31/12/2023, 21:15 - Name: text" (Android) or "[31/12/23, 9:15:42 PM] Name: text" (iOS)
+_WHATSAPP_HEADER = re.compile(
+    r"^\[?(\d{1,4})[./-](\d{1,2})[./-](\d{1,4}),?\s+(\d{1,2})[:.](\d{2})(?:[:.](\d{2}))?"
+    r"(?:\s*([AaPp])\.?\s?[Mm]\.?)?\]?\s*(?:-\s+)?(.*)$"
+)
+# Direction marks and narrow no-break spaces that iOS exports insert
+_WHATSAPP_NOISE = str.maketrans({"\u200e": None, "\u200f": None, "\ufeff": None, "\u202f": " ", "\u00a0": " "})
+
+
+def read_whatsapp(path: str, start: int = 0):
+    """(offset of the next message header, (date and time fields, text)) for each message."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        header, lines = None, []
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace").translate(_WHATSAPP_NOISE).rstrip("\r\n")
+            match = _WHATSAPP_HEADER.match(line)
+            if match:
+                if header:
+                    yield offset, (header, "\n".join(lines))
+                header, lines = match.groups()[:7], [match.group(8)]
+            elif header:
+                # Continuation of a multi-line message
+                lines.append(line)
+            offset += len(raw)
+        if header:
+            yield offset, (header, "\n".join(lines))
+
+
+def whatsapp_message(record: tuple, day_first: bool = True):
+    header, body = record
+    # System lines ("Messages and calls are end-to-end encrypted") have no sender
+    sender, separator, content = body.partition(": ")
+    if not separator:
+        return None
+    a, b, c, hour, minute, second, meridiem = header
+    if len(a) == 4:
+        year, month, day = a, b, c
+    elif day_first:
+        day, month, year = a, b, c
+    else:
+        month, day, year = a, b, c
+    year, hour = int(year), int(hour)
+    if year < 100:
+        year += 2000
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem in "Pp" else 0)
+    message = whatsapp_adapter.extract({"sender_number": sender, "message_text": content})
+    # The webhook payload carries no time; the export does
+    message.timestamp = datetime(year, int(month), int(day), hour, int(minute), int(second or 0))
+    return message
+
+
+FORMATS = {
+    "telegram": (read_telegram, telegram_message),
+    "mbox": (read_mbox, email_message),
+    "whatsapp": (read_whatsapp, whatsapp_message),
+}
+
+
+# --- Import ---------------------------------------------------------------
+
+def event_id(message, occurrence: int = 0) -> str:
+    """
+    Stable id from the message itself, so re-imported records are recognized.
+    `occurrence` numbers messages that are otherwise identical.
+    """
+    key = "\0".join((message.source, message.sender, message.timestamp.isoformat(), message.content))
+    if occurrence:
+        key += f"\0{occurrence}"
+    return str(uuid.uuid5(_EVENT_NAMESPACE, key))
+
+
+class Occurrences:
+    """
+    Numbers repeats of an identical message ("ok" twice from one sender in
+    the same minute). Exports are chronological, so only the messages at the
+    current timestamp are tracked; `state()` goes into the checkpoint so a
+    resumed import keeps numbering where it stopped.
+    """
+
+    def __init__(self, state: list = None):
+        self.timestamp, self.counts = state or (None, {})
+
+    def number(self, message) -> int:
+        timestamp = message.timestamp.isoformat()
+        if timestamp != self.timestamp:
+            self.timestamp, self.counts = timestamp, {}
+        key = event_id(message)
+        occurrence = self.counts.get(key, 0)
+        self.counts[key] = occurrence + 1
+        return occurrence
+
+    def state(self) -> list:
+        return [self.timestamp, dict(self.counts)]
+
+
+def iter_chunks(reader, convert, path: str, start: int, chunk_size: int, skipped: list):
+    """Yield (offset after the chunk, messages); unusable records are counted in skipped[0]."""
+    chunk, offset = [], start
+    for offset, record in reader(path, start):
+        try:
+            message = convert(record)
+        except (ValueError, TypeError, KeyError, LookupError) as e:
+            print(f"Skipping record before byte {offset}: {e}")
+            message = None
+        if message is None or not message.content.strip():
+            skipped[0] += 1
+            continue
+        chunk.append(message)
+        if len(chunk) >= chunk_size:
+            yield offset, chunk
+            chunk = []
+    if chunk or offset != start:
+        yield offset, chunk
+
+
+def write_chunk(messages: list, ids: list, results: list) -> int:
+    """Store one chunk of analyzed messages in a single transaction; returns the number of new events."""
+    now = datetime.utcnow()
+    dedup = bodies.dedup_ready(engine)
+    body_params, events = {}, []
+    for message, event_id in zip(messages, ids):
+        row = {"id": event_id, "content": message.content, "content_hash": None, "source": message.source,
+               "timestamp": message.timestamp, "status": EventStatus.SCORED.value}
+        if dedup and bodies.should_dedup(message.content):
+            if message.content not in body_params:
+                body_params[message.content] = bodies.insert_params(message.content, now)
+            row["content"], row["content_hash"] = None, body_params[message.content]["hash"]
+        events.append(row)
+
+    with engine.begin() as conn:
+        after = conn.execute(MAX_ROWID).scalar()
+        if body_params:
+            conn.execute(bodies.INSERT_BODY, list(body_params.values()))
+        conn.execute(EVENT_INSERT, events)
+        new_ids = {row[0] for row in conn.execute(NEW_EVENT_IDS, {"after": after})}
+        # Events imported before keep their scores; re-importing must not re-roll them
+        new_results = [r for r in results if r["event_id"] in new_ids]
+        if new_results:
+            conn.execute(SCORES_UPSERT, [{k: r[k] for k in (
+                "event_id", "signal_strength", "historical_rarity", "trend_acceleration",
+                "cross_source_presence", "uncertainty",
+            )} for r in new_results])
+            conn.execute(ANALYSES_UPSERT, [{k: r[k] for k in (
+                "event_id", "operational_risk", "compliance_risk", "reputational_risk", "financial_risk",
+                "anchor_version", "summary", "recommendation", "analyzed_at",
+            )} for r in new_results])
+        if search.search_ready(engine):
+            conn.execute(INDEX_NEW_EVENTS, {"after": after})
+
+    if new_ids and score_store.enabled():
+        store = score_store.ScoreStore(score_store.SCORE_STORE_DIR, segment=f"import{os.getpid()}")
+        store.append_many(
+            (message.timestamp, message.source, {c: result[c] for c in score_store.COLUMNS})
+            for message, result in zip(messages, results) if result["event_id"] in new_ids
+        )
+        store.close()
+    return len(new_ids)
+
+
+def run(fmt: str, path: str, workers: int, chunk_size: int, checkpoint_path: str, reset: bool,
+        day_first: bool = True) -> int:
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+    search.ensure_schema(engine)
+
+    reader, convert = FORMATS[fmt]
+    if fmt == "whatsapp":
+        convert = partial(convert, day_first=day_first)
+    source_file = os.path.abspath(path)
+    checkpoint = Checkpoint(checkpoint_path)
+    if reset:
+        checkpoint.clear()
+    elif checkpoint.get("file") not in (None, source_file) or checkpoint.get("format") not in (None, fmt):
+        print(f"Checkpoint belongs to {checkpoint.get('file')}; starting over.")
+        checkpoint.clear()
+
+    start = checkpoint.get("offset", 0)
+    imported = checkpoint.get("imported", 0)
+    occurrences = Occurrences(checkpoint.get("occurrences"))
+    if start:
+        print(f"Resuming at byte {start} of {os.path.getsize(path)} ({imported} events already imported)")
+
+    progress = Progress(unit="messages")
+    skipped = [0]
+    max_in_flight = workers * 2
+    pending = deque()
+
+    def drain_one():
+        nonlocal imported
+        offset, messages, ids, repeats, future = pending.popleft()
+        imported += write_chunk(messages, ids, future.result()) if messages else 0
+        checkpoint.save(file=source_file, format=fmt, offset=offset, imported=imported, occurrences=repeats)
+        progress.advance(len(messages))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for offset, messages in iter_chunks(reader, convert, path, start, chunk_size, skipped):
+            ids = [event_id(message, occurrences.number(message)) for message in messages]
+            rows = [(None, i, message.content) for i, message in zip(ids, messages)]
+            pending.append((offset, messages, ids, occurrences.state(), pool.submit(analyze_rows, rows)))
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+
+    progress.finish()
+    # Messages already in the database are analyzed again but not counted as imported
+    print(f"Imported {imported} new events from {path} ({progress.done} messages, {skipped[0]} records skipped) "
+          f"at {progress.rate:,.0f} messages/s")
+    checkpoint.clear()
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import messages from Telegram, mbox or WhatsApp exports")
+    parser.add_argument("format", choices=sorted(FORMATS))
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--checkpoint", default="./import.checkpoint.json")
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint")
+    parser.add_argument("--month-first", action="store_true",
+                        help="WhatsApp dates are month/day/year (US exports) instead of day/month/year")
+    args = parser.parse_args()
+
+    run(args.format, args.path, args.workers, args.chunk_size, args.checkpoint, args.reset,
+        day_first=not args.month_first)
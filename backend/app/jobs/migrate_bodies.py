@@ -0,0 +1,114 @@
+"""
+Move inline event bodies into content-addressed storage.
+
+Databases created before the `bodies` table have `events.content NOT NULL`.
+This job first rebuilds the events table so content may be NULL (rowids are
+preserved), then streams events in rowid order and replaces every inline
+body of at least BODY_DEDUP_MIN_BYTES with a reference into `bodies`.
+Progress is checkpointed per chunk, so it can be interrupted and re-run.
+
+    python -m app.jobs.migrate_bodies --chunk-size 5000 --vacuum
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+from app.db import bodies
+from app.db.models import Base
+from app.db.session import engine
+from app.jobs.common import Checkpoint, Progress
+
+
+def rebuild_events_table():
+    """Recreate `events` from the current model (content nullable), keeping rowids."""
+    columns = {c["name"]: c for c in inspect(engine).get_columns("events")}
+    if columns["content"]["nullable"]:
+        return False
+    print("Rebuilding the events table so bodies can be stored by reference...")
+    with engine.begin() as conn:
+        # Otherwise SQLite rewrites the foreign keys of scores/reviews/analyses to point at events_legacy
+        conn.execute(text("PRAGMA legacy_alter_table = ON"))
+        conn.execute(text("ALTER TABLE events RENAME TO events_legacy"))
+        for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'events_legacy' AND sql IS NOT NULL"
+        )).all():
+            conn.execute(text(f'DROP INDEX "{name}"'))
+        Base.metadata.tables["events"].create(bind=conn)
+        conn.execute(text("""
+            INSERT INTO events (rowid, id, content, content_hash, source, timestamp, status)
+            SELECT rowid, id, content, content_hash, source, timestamp, status FROM events_legacy
+        """))
+        conn.execute(text("DROP TABLE events_legacy"))
+        conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+    bodies.dedup_ready.cache_clear()
+    return True
+
+
+def migrate(chunk_size: int, checkpoint_path: str, min_bytes: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+    rebuild_events_table()
+
+    checkpoint = Checkpoint(checkpoint_path)
+    after = checkpoint.get("last_rowid", 0)
+    with engine.connect() as conn:
+        remaining = conn.execute(text(
+            "SELECT COUNT(*) FROM events WHERE rowid > :after AND content IS NOT NULL AND length(content) >= :min"
+        ), {"after": after, "min": min_bytes}).scalar()
+    progress = Progress(total=remaining)
+    select = text("""
+        SELECT rowid, content FROM events
+        WHERE rowid > :after AND content IS NOT NULL AND length(content) >= :min
+        ORDER BY rowid LIMIT :limit
+    """)
+    update = text("UPDATE events SET content = NULL, content_hash = :hash WHERE rowid = :rowid")
+
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(select, {"after": after, "min": min_bytes, "limit": chunk_size}).all()
+        if not rows:
+            break
+        now = datetime.utcnow()
+        # Identical bodies within a chunk are compressed once
+        params = {}
+        for _, content in rows:
+            if content not in params:
+                params[content] = bodies.insert_params(content, now)
+        with engine.begin() as conn:
+            conn.execute(bodies.INSERT_BODY, list(params.values()))
+            conn.execute(update, [{"hash": params[content]["hash"], "rowid": rowid} for rowid, content in rows])
+        after = rows[-1][0]
+        checkpoint.save(last_rowid=after)
+        progress.advance(len(rows))
+
+    progress.finish()
+    checkpoint.clear()
+    return progress.done
+
+
+def report():
+    with engine.connect() as conn:
+        events, inline, referenced = conn.execute(text(
+            "SELECT COUNT(*), COUNT(content), COUNT(content_hash) FROM events"
+        )).one()
+        count, raw, stored = conn.execute(text(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length(data)), 0) FROM bodies"
+        )).one()
+    print(f"{events} events: {inline} inline, {referenced} referencing {count} distinct bodies")
+    print(f"Distinct bodies: {raw:,} bytes of text stored in {stored:,} compressed bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate and compress stored event bodies")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--checkpoint", default="./migrate_bodies.checkpoint.json")
+    parser.add_argument("--min-bytes", type=int, default=bodies.BODY_DEDUP_MIN_BYTES)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return the freed pages")
+    args = parser.parse_args()
+
+    migrated = migrate(args.chunk_size, args.checkpoint, args.min_bytes)
+    print(f"Moved {migrated} bodies into content-addressed storage")
+    report()
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
@@ -0,0 +1,168 @@
+"""
+Offline re-scoring of the stored event history.
+
+Streams events from the database in rowid order, re-runs scoring and
+semantics on a process pool, and writes the results back in bulk. Progress
+is checkpointed after every committed chunk, so an interrupted run resumes
+where it stopped. The LLM summary is only regenerated with --llm.
+
+    python -m app.jobs.rescore --workers 8 --chunk-size 2000
+    python -m app.jobs.rescore --llm
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import text
+
+from app.db import bodies
+from app.db.models import Base
+from app.db.session import engine
+from app.jobs.common import Checkpoint, Progress
+from app.services import semantics
+from app.services.analysis_cache import analysis_cache
+from app.services.llm_service import generate_risk_summary
+
+# REPLACE gives rewritten rows a new rowid, which also moves the read endpoints' ETag
+SCORES_UPSERT = text("""
+    INSERT OR REPLACE INTO scores (event_id, signal_strength, historical_rarity, trend_acceleration,
+                                   cross_source_presence, uncertainty)
+    VALUES (:event_id, :signal_strength, :historical_rarity, :trend_acceleration,
+            :cross_source_presence, :uncertainty)
+""")
+
+# Without --llm the summary is NULL here and the stored one is kept
+ANALYSES_UPSERT = text("""
+    INSERT INTO analyses (event_id, operational_risk, compliance_risk, reputational_risk, financial_risk,
+                          anchor_version, summary, recommendation, analyzed_at)
+    VALUES (:event_id, :operational_risk, :compliance_risk, :reputational_risk, :financial_risk,
+            :anchor_version, :summary, :recommendation, :analyzed_at)
+    ON CONFLICT(event_id) DO UPDATE SET
+        operational_risk = excluded.operational_risk,
+        compliance_risk = excluded.compliance_risk,
+        reputational_risk = excluded.reputational_risk,
+        financial_risk = excluded.financial_risk,
+        anchor_version = excluded.anchor_version,
+        summary = COALESCE(excluded.summary, analyses.summary),
+        recommendation = COALESCE(excluded.recommendation, analyses.recommendation),
+        analyzed_at = excluded.analyzed_at
+""")
+
+
+def analyze_rows(rows: list[tuple], use_llm: bool = False) -> list[dict]:
+    """
+    Re-run the deterministic analysis stages for (rowid, id, content) rows.
+    Runs inside a pool process; returns one result dict per row.
+    """
+    analyzed_at = datetime.utcnow()
+    results = []
+    for _, event_id, content in rows:
+        # Repeated bodies are analyzed once per worker process
+        analysis = analysis_cache.get(content)
+        score_matrix = analysis.score_matrix()
+        semantic_result = analysis.semantics()
+        category_scores = semantic_result["category_scores"]
+
+        llm_output = {}
+        if use_llm:
+            llm_output = generate_risk_summary(content, score_matrix.model_dump(), semantic_result)
+
+        results.append({
+            "event_id": event_id,
+            **score_matrix.model_dump(),
+            **category_scores,
+            "anchor_version": semantics.ANCHOR_VERSION,
+            "summary": llm_output.get("summary"),
+            "recommendation": llm_output.get("recommendation"),
+            "analyzed_at": analyzed_at,
+        })
+    return results
+
+
+def iter_event_chunks(after_rowid: int, chunk_size: int):
+    """Yield lists of (rowid, id, content) using keyset pagination on rowid."""
+    query = text(f"""
+        SELECT events.rowid, events.id, {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN}
+        WHERE events.rowid > :after ORDER BY events.rowid LIMIT :limit
+    """)
+    while True:
+        with engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(query, {"after": after_rowid, "limit": chunk_size})]
+        if not rows:
+            return
+        yield rows
+        after_rowid = rows[-1][0]
+
+
+def write_results(results: list[dict]):
+    """Bulk upsert one chunk of results in a single transaction."""
+    scores = [{k: r[k] for k in (
+        "event_id", "signal_strength", "historical_rarity", "trend_acceleration",
+        "cross_source_presence", "uncertainty",
+    )} for r in results]
+    analyses = [{k: r[k] for k in (
+        "event_id", "operational_risk", "compliance_risk", "reputational_risk", "financial_risk",
+        "anchor_version", "summary", "recommendation", "analyzed_at",
+    )} for r in results]
+    with engine.begin() as conn:
+        conn.execute(SCORES_UPSERT, scores)
+        conn.execute(ANALYSES_UPSERT, analyses)
+
+
+def run(workers: int, chunk_size: int, use_llm: bool, checkpoint_path: str, reset: bool) -> int:
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+
+    checkpoint = Checkpoint(checkpoint_path)
+    if reset:
+        checkpoint.clear()
+    elif checkpoint.get("anchor_version") not in (None, semantics.ANCHOR_VERSION):
+        print("Risk anchors changed since the checkpoint was written; starting over.")
+        checkpoint.clear()
+
+    after_rowid = checkpoint.get("last_rowid", 0)
+    processed = checkpoint.get("processed", 0)
+    with engine.connect() as conn:
+        remaining = conn.execute(text("SELECT COUNT(*) FROM events WHERE rowid > :after"), {"after": after_rowid}).scalar()
+    if after_rowid:
+        print(f"Resuming after rowid {after_rowid} ({processed} events already done)")
+
+    progress = Progress(total=remaining)
+    # Keep a few chunks in flight per worker so the pool never waits on reads or writes
+    max_in_flight = workers * 2
+    pending = deque()
+
+    def drain_one():
+        nonlocal processed
+        last_rowid, future = pending.popleft()
+        results = future.result()
+        write_results(results)
+        processed += len(results)
+        checkpoint.save(last_rowid=last_rowid, processed=processed, anchor_version=semantics.ANCHOR_VERSION)
+        progress.advance(len(results))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows in iter_event_chunks(after_rowid, chunk_size):
+            pending.append((rows[-1][0], pool.submit(analyze_rows, rows, use_llm)))
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+
+    progress.finish()
+    print(f"Re-scored {progress.done} events at {progress.rate:,.0f} events/s")
+    checkpoint.clear()
+    return progress.done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score every stored event")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--llm", action="store_true", help="Also regenerate LLM summaries (slow, uses the API)")
+    parser.add_argument("--checkpoint", default="./rescore.checkpoint.json")
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    run(args.workers, args.chunk_size, args.llm, args.checkpoint, args.reset)
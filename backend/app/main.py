@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import events, ingestion
+from app.api import analytics, events, ingestion, metrics, profiles, stream
+from app.db import bodies, search
 from app.db.models import Base
 from app.db.session import engine
+from app.services import enrichment
+from app.services.notification import notification_service
+from app.services.retrieval import retrieval_index
 
 app = FastAPI(title="AI Event Scoring & Traceability System")
 
@@ -16,8 +20,26 @@ app.add_middleware(
 
 app.include_router(events.router, tags=["events"])
 app.include_router(ingestion.router)
+app.include_router(stream.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
+app.include_router(analytics.router)
 
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+def startup():
+    Base.metadata.create_all(bind=engine)
+    bodies.ensure_schema(engine)
+    search.ensure_schema(engine)
+    # Build the similarity index in the background so the first analyses don't pay for it
+    retrieval_index.warm_async()
+    if enrichment.deferred():
+        enrichment.enrichment_worker.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    # Deliver or spool any alerts still queued in the dispatcher
+    notification_service.close()
+    enrichment.enrichment_worker.stop()
 
 @app.get("/")
 async def root():
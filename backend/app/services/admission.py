@@ -0,0 +1,228 @@
+"""
+Admission control for ingestion under overload.
+
+With ADMISSION_CONTROL enabled, every ingested event is first pre-screened
+with the cached keyword analysis (no retrieval, no LLM) and gets a priority:
+
+    high     max category risk >= 0.6 (would alert)
+    normal   >= 0.3
+    low      below that
+
+The expensive stages (similarity retrieval and the LLM summary) then run in
+at most ADMISSION_CONCURRENCY slots, granted highest priority first and
+first-come within a priority. An event is stored with the deterministic
+summary and without similar events ("shed") instead of waiting for a slot
+when:
+
+    - its source is over its rate (ADMISSION_SOURCE_RATES, e.g.
+      "telegram=20,email=5" events/s, bursts of ADMISSION_BURST_SECONDS of
+      traffic; ADMISSION_DEFAULT_RATE for other sources, 0 = unlimited), or
+    - it is low priority and the oldest waiter has been queued longer than
+      ADMISSION_TARGET_MS, or it has itself waited that long, or
+    - it is normal priority and has waited ADMISSION_NORMAL_DEADLINE_MS
+      (default four times the target), or
+    - it is not high priority and ADMISSION_MAX_WAITING such events are
+      already queued.
+
+Waiters block the request's worker thread, so the last two keep a backlog of
+normal events from holding every thread the high-risk ones need. High-risk
+events are never shed, so alerts never lose their summary.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from app.services import metrics
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "").lower() in ("1", "true", "yes")
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "8"))
+ADMISSION_TARGET_MS = float(os.getenv("ADMISSION_TARGET_MS", "500"))
+ADMISSION_DEFAULT_RATE = float(os.getenv("ADMISSION_DEFAULT_RATE", "0"))
+ADMISSION_BURST_SECONDS = float(os.getenv("ADMISSION_BURST_SECONDS", "2"))
+ADMISSION_NORMAL_DEADLINE_MS = float(os.getenv("ADMISSION_NORMAL_DEADLINE_MS", str(4 * ADMISSION_TARGET_MS)))
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", str(2 * ADMISSION_CONCURRENCY)))
+
+HIGH, NORMAL, LOW = 0, 1, 2
+PRIORITY_NAMES = ("high", "normal", "low")
+
+
+def _parse_rates(value: str) -> dict:
+    """Parse 'telegram=20,email=5' into a dict of events per second."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        source, _, rate = item.partition("=")
+        rates[source.strip()] = float(rate)
+    return rates
+
+
+ADMISSION_SOURCE_RATES = _parse_rates(os.getenv("ADMISSION_SOURCE_RATES", ""))
+
+
+def priority(max_risk: float) -> int:
+    if max_risk >= 0.6:
+        return HIGH
+    return NORMAL if max_risk >= 0.3 else LOW
+
+
+def prescreen(content: str) -> float:
+    """Highest category risk from the keyword analysis, shared with the pipeline through the cache."""
+    from app.services import retrieval
+    from app.services.analysis_cache import analysis_cache
+    generation = retrieval.shared_generation()
+    if generation is not None:
+        analysis = analysis_cache.get(content, generation.anchors, generation.anchor_version)
+    else:
+        analysis = analysis_cache.get(content)
+    return max(analysis.categories)
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        """Caller holds the controller's lock."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+@dataclass
+class Admission:
+    enrich: bool
+    priority: str
+    outcome: str  # admitted | rate_limited | overload | disabled
+    waited_ms: float = 0.0
+
+
+_DISABLED = Admission(enrich=True, priority="normal", outcome="disabled")
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "queued_at", "granted", "cancelled")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.queued_at = time.monotonic()
+        self.granted = threading.Event()
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    def __init__(self, concurrency: int = ADMISSION_CONCURRENCY, target_ms: float = ADMISSION_TARGET_MS,
+                 rates: dict = None, default_rate: float = ADMISSION_DEFAULT_RATE,
+                 burst_seconds: float = ADMISSION_BURST_SECONDS, enabled: bool = ADMISSION_CONTROL,
+                 normal_deadline_ms: float = ADMISSION_NORMAL_DEADLINE_MS, max_waiting: int = ADMISSION_MAX_WAITING):
+        self.enabled = enabled
+        self.concurrency = concurrency
+        self.target = target_ms / 1000
+        self.normal_deadline = normal_deadline_ms / 1000
+        self.max_waiting = max_waiting
+        self.rates = ADMISSION_SOURCE_RATES if rates is None else rates
+        self.default_rate = default_rate
+        self.burst_seconds = burst_seconds
+        self.active = 0
+        self._waiting = []
+        self._buckets = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def queued(self) -> int:
+        with self._lock:
+            return sum(1 for ticket in self._waiting if not ticket.cancelled)
+
+    def _within_rate(self, source: str) -> bool:
+        bucket = self._buckets.get(source)
+        if bucket is None:
+            rate = self.rates.get(source, self.default_rate)
+            if rate <= 0:
+                return True
+            bucket = self._buckets[source] = TokenBucket(rate, max(1.0, rate * self.burst_seconds))
+        return bucket.take()
+
+    def _oldest_wait(self, now: float) -> float:
+        return max((now - t.queued_at for t in self._waiting if not t.cancelled), default=0.0)
+
+    def _queued_below_high(self) -> int:
+        return sum(1 for t in self._waiting if t.priority != HIGH and not t.cancelled)
+
+    def _acquire(self, source: str, level: int):
+        """(granted, outcome, waited seconds)."""
+        with self._lock:
+            if level != HIGH and not self._within_rate(source):
+                return False, "rate_limited", 0.0
+            while self._waiting and self._waiting[0].cancelled:
+                heapq.heappop(self._waiting)
+            if self.active < self.concurrency and not self._waiting:
+                self.active += 1
+                return True, "admitted", 0.0
+            if level == LOW and self._oldest_wait(time.monotonic()) > self.target:
+                return False, "overload", 0.0
+            if level != HIGH and self._queued_below_high() >= self.max_waiting:
+                return False, "overload", 0.0
+            ticket = _Ticket(level, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+
+        timeout = {LOW: self.target, NORMAL: self.normal_deadline}.get(level)
+        with metrics.stage("admission_wait"):
+            granted = ticket.granted.wait(timeout)
+        waited = time.monotonic() - ticket.queued_at
+        if not granted:
+            with self._lock:
+                # The slot may have been handed over just as the wait timed out
+                if not ticket.granted.is_set():
+                    ticket.cancelled = True
+                    return False, "overload", waited
+        return True, "admitted", waited
+
+    def _release(self):
+        with self._lock:
+            while self._waiting:
+                ticket = heapq.heappop(self._waiting)
+                if not ticket.cancelled:
+                    # The slot passes straight to the next waiter
+                    ticket.granted.set()
+                    return
+            self.active -= 1
+
+    @contextmanager
+    def admit(self, source: str, content: str):
+        """
+        Wrap the expensive stages of one event. The yielded Admission says
+        whether to run them (`enrich`) or fall back to the cheap path.
+        """
+        if not self.enabled:
+            yield _DISABLED
+            return
+        level = priority(prescreen(content))
+        granted, outcome, waited = self._acquire(source, level)
+        metrics.ADMISSIONS.inc(priority=PRIORITY_NAMES[level], outcome=outcome)
+        admission = Admission(enrich=granted, priority=PRIORITY_NAMES[level], outcome=outcome,
+                              waited_ms=round(waited * 1000, 1))
+        if not granted:
+            yield admission
+            return
+        try:
+            yield admission
+        finally:
+            self._release()
+
+
+admission_controller = AdmissionController()
+metrics.QUEUE_DEPTH.set_function(admission_controller.queued, queue="admission")
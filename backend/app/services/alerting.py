@@ -0,0 +1,179 @@
+"""
+Alert deduplication and suppression.
+Repeated high-risk events with the same source, dominant category and
+fingerprint only alert once per suppression window. Repeats inside the window
+are counted, re-alerted when the count crosses an escalation threshold, and
+summarized in periodic digest messages.
+"""
+import os
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from app.services.notification import notification_service
+from app.services import metrics, tokenizer
+
+
+def _parse_windows(value: str) -> dict:
+    """Parse 'operational_risk=300,financial_risk=900' into a dict of seconds."""
+    windows = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        category, _, seconds = item.partition("=")
+        windows[category.strip()] = float(seconds)
+    return windows
+
+
+def fingerprint(matched_keywords: dict, content: str) -> str:
+    """
+    Fingerprint an alert by its matched keyword set, or by its normalized
+    content when no keywords matched. Digits are dropped so timestamps and
+    counters inside otherwise identical messages do not defeat deduplication.
+    """
+    keywords = sorted({kw for kws in matched_keywords.values() for kw in kws})
+    if keywords:
+        return "kw:" + "|".join(keywords)
+    normalized = re.sub(r"\d+", "#", " ".join(tokenizer.tokens(content)))
+    return "content:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class AlertDecision:
+    send: bool
+    occurrences: int = 1
+    escalated: bool = False
+
+
+@dataclass
+class _AlertState:
+    window_start: float
+    window: float
+    count: int = 1
+    suppressed: int = 0
+    escalation_level: int = 0
+    max_risk: float = 0.0
+    last_event_id: str = ""
+    sample: str = ""
+
+
+@dataclass
+class DigestEntry:
+    source: str
+    category: str
+    fingerprint: str
+    suppressed: int
+    count: int
+    max_risk: float
+    last_event_id: str
+    sample: str = field(repr=False, default="")
+
+
+class AlertSuppressor:
+    """
+    Decides whether a high-risk event should produce a webhook alert.
+    """
+    def __init__(self, window: float = None, windows: dict = None, escalation_thresholds: list = None,
+                 digest_interval: float = None, max_keys: int = None, clock=time.monotonic):
+        self.window = window if window is not None else float(os.getenv("ALERT_SUPPRESSION_WINDOW", "600"))
+        self.windows = windows if windows is not None else _parse_windows(os.getenv("ALERT_SUPPRESSION_WINDOWS", ""))
+        self.escalation_thresholds = sorted(escalation_thresholds if escalation_thresholds is not None else [
+            int(t) for t in os.getenv("ALERT_ESCALATION_THRESHOLDS", "10,50,200").split(",") if t.strip()
+        ])
+        self.digest_interval = digest_interval if digest_interval is not None else float(os.getenv("ALERT_DIGEST_INTERVAL", "300"))
+        self.max_keys = max_keys or int(os.getenv("ALERT_MAX_KEYS", "10000"))
+        self.clock = clock
+
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._digest_thread = None
+
+    def evaluate(self, source: str, category_scores: dict, matched_keywords: dict, content: str,
+                 event_id: str = "", risk_score: float = 0.0) -> AlertDecision:
+        """Record one high-risk event and decide whether it should alert now."""
+        category = max(category_scores, key=category_scores.get) if category_scores else "unknown"
+        key = (source, category, fingerprint(matched_keywords, content))
+        now = self.clock()
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or now - state.window_start >= state.window:
+                pending = state.suppressed if state else 0
+                self._states[key] = _AlertState(
+                    window_start=now,
+                    window=self.windows.get(category, self.window),
+                    max_risk=risk_score,
+                    last_event_id=event_id,
+                    sample=content[:200],
+                    # Repeats from the expired window still belong in the next digest
+                    suppressed=pending,
+                )
+                self._states.move_to_end(key)
+                self._evict(now)
+                return AlertDecision(send=True)
+
+            state.count += 1
+            state.max_risk = max(state.max_risk, risk_score)
+            state.last_event_id = event_id
+
+            level = sum(1 for t in self.escalation_thresholds if state.count >= t)
+            if level > state.escalation_level:
+                state.escalation_level = level
+                return AlertDecision(send=True, occurrences=state.count, escalated=True)
+
+            state.suppressed += 1
+            metrics.NOTIFICATIONS.inc(outcome="suppressed")
+
+        self._ensure_digest_thread()
+        return AlertDecision(send=False, occurrences=state.count)
+
+    def collect_digest(self) -> list[DigestEntry]:
+        """Return and reset the suppressed counts accumulated since the last digest."""
+        entries = []
+        with self._lock:
+            for (source, category, fp), state in self._states.items():
+                if state.suppressed:
+                    entries.append(DigestEntry(
+                        source=source,
+                        category=category,
+                        fingerprint=fp,
+                        suppressed=state.suppressed,
+                        count=state.count,
+                        max_risk=state.max_risk,
+                        last_event_id=state.last_event_id,
+                        sample=state.sample,
+                    ))
+                    state.suppressed = 0
+        entries.sort(key=lambda e: e.suppressed, reverse=True)
+        return entries
+
+    def _evict(self, now: float):
+        """Once over the cap, drop expired keys with nothing pending, then the oldest keys."""
+        if len(self._states) <= self.max_keys:
+            return
+        for key in list(self._states):
+            state = self._states[key]
+            if now - state.window_start >= state.window and not state.suppressed:
+                del self._states[key]
+        while len(self._states) > self.max_keys:
+            self._states.popitem(last=False)
+
+    def _ensure_digest_thread(self):
+        if self._digest_thread or self.digest_interval <= 0:
+            return
+        with self._lock:
+            if self._digest_thread:
+                return
+            self._digest_thread = threading.Thread(target=self._digest_loop, name="alert-digest", daemon=True)
+            self._digest_thread.start()
+
+    def _digest_loop(self):
+        while True:
+            time.sleep(self.digest_interval)
+            entries = self.collect_digest()
+            if entries:
+                notification_service.send_digest(entries, self.digest_interval)
+
+
+# Singleton instance
+alert_suppressor = AlertSuppressor()
@@ -0,0 +1,126 @@
+"""
+Memoized deterministic analysis per content.
+
+Scoring, semantics and explainability depend only on the text and the risk
+anchor set, so results are cached under (content hash, anchor version) and
+shared by the pipeline, the agent tools and the read endpoints. Entries are
+compact slotted tuples rather than pydantic models or dicts, and the cache
+evicts least-recently-used entries once their estimated size passes
+ANALYSIS_CACHE_MAX_BYTES. Lookups are counted as cache="analysis" in the
+cache hit/miss metric.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from app.db.bodies import content_hash
+from app.models.explainability import Explainability, generate_reasoning
+from app.models.risk_semantic import RiskSemantic
+from app.models.score import ScoreMatrix
+from app.services import metrics, scoring, semantics
+
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+SCORE_FIELDS = tuple(ScoreMatrix.model_fields)
+CATEGORY_FIELDS = tuple(RiskSemantic.model_fields)
+
+
+class Analysis:
+    """One cached analysis. Accessors build fresh models, so callers may mutate them."""
+    __slots__ = ("scores", "categories", "keywords", "reasoning", "size")
+
+    def __init__(self, scores: tuple, categories: tuple, keywords: tuple, reasoning: str):
+        self.scores = scores
+        self.categories = categories
+        self.keywords = keywords
+        self.reasoning = reasoning
+        # Rough footprint: the object, its tuples and the strings they hold
+        self.size = (
+            sys.getsizeof(self) + sys.getsizeof(scores) + sys.getsizeof(categories) + 24 * (len(scores) + len(categories))
+            + sys.getsizeof(keywords) + sum(sys.getsizeof(k) + sum(sys.getsizeof(w) for w in kws) for k, kws in keywords)
+            + sys.getsizeof(reasoning)
+        )
+
+    def score_matrix(self) -> ScoreMatrix:
+        return ScoreMatrix(**dict(zip(SCORE_FIELDS, self.scores)))
+
+    def category_scores(self) -> dict:
+        return dict(zip(CATEGORY_FIELDS, self.categories))
+
+    def matched_keywords(self) -> dict:
+        return {category: list(words) for category, words in self.keywords}
+
+    def semantics(self) -> dict:
+        """Same shape as semantics.calculate_semantics()."""
+        return {"category_scores": self.category_scores(), "matched_keywords": self.matched_keywords()}
+
+    def risk_semantic(self) -> RiskSemantic:
+        return RiskSemantic(**self.category_scores())
+
+    def explainability(self) -> Explainability:
+        return Explainability(matched_keywords=self.matched_keywords(), reasoning=self.reasoning)
+
+
+def compute(text: str, anchors: dict = None) -> Analysis:
+    with metrics.stage("calculate_scores"):
+        score_matrix = scoring.calculate_scores(text)
+    with metrics.stage("calculate_semantics"):
+        result = semantics.calculate_semantics(text, anchors)
+    category_scores = result["category_scores"]
+    matched_keywords = result["matched_keywords"]
+    with metrics.stage("explainability"):
+        reasoning = generate_reasoning(matched_keywords, category_scores)
+    return Analysis(
+        tuple(getattr(score_matrix, f) for f in SCORE_FIELDS),
+        tuple(category_scores.get(f, 0.0) for f in CATEGORY_FIELDS),
+        tuple((category, tuple(words)) for category, words in matched_keywords.items()),
+        reasoning,
+    )
+
+
+class AnalysisCache:
+    """Bounded LRU of Analysis entries keyed by (content hash, anchor version)."""
+
+    def __init__(self, max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text: str, anchors: dict = None, anchor_version: str = None) -> Analysis:
+        """Cached analysis of `text`; pass a generation's anchors together with their version."""
+        key = (content_hash(text), anchor_version or semantics.ANCHOR_VERSION)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache("analysis", entry is not None)
+        if entry is not None:
+            return entry
+
+        entry = compute(text, anchors)
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+analysis_cache = AnalysisCache()
+metrics.CACHE_BYTES.set_function(lambda: analysis_cache.bytes, cache="analysis")
+metrics.CACHE_ENTRIES.set_function(lambda: len(analysis_cache), cache="analysis")
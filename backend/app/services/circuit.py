@@ -0,0 +1,145 @@
+"""
+Circuit breaker and latency budget for OpenAI calls.
+
+Chat completions and embeddings share one breaker, since they fail together
+when the API is slow or down. Every call gets a deadline
+(OPENAI_CHAT_TIMEOUT / OPENAI_EMBEDDING_TIMEOUT seconds) instead of the
+client's 10-minute default, and the client no longer retries on its own
+(OPENAI_MAX_RETRIES, default 0), so a failing call costs at most its
+deadline.
+
+The breaker tracks the outcomes of the last OPENAI_BREAKER_WINDOW calls.
+Once at least OPENAI_BREAKER_MIN_CALLS of them are recorded and the failure
+rate reaches OPENAI_BREAKER_FAILURE_RATE, it opens: calls fail immediately
+with CircuitOpenError and callers take their deterministic / TF-IDF fallback
+without waiting. After OPENAI_BREAKER_OPEN_SECONDS it lets a single probe
+call through (half-open); success closes it, failure opens it again.
+GET /circuit-breakers shows the state.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.services import metrics
+
+OPENAI_CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "15"))
+OPENAI_EMBEDDING_TIMEOUT = float(os.getenv("OPENAI_EMBEDDING_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+OPENAI_BREAKER_WINDOW = int(os.getenv("OPENAI_BREAKER_WINDOW", "20"))
+OPENAI_BREAKER_MIN_CALLS = int(os.getenv("OPENAI_BREAKER_MIN_CALLS", "5"))
+OPENAI_BREAKER_FAILURE_RATE = float(os.getenv("OPENAI_BREAKER_FAILURE_RATE", "0.5"))
+OPENAI_BREAKER_OPEN_SECONDS = float(os.getenv("OPENAI_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: int = OPENAI_BREAKER_WINDOW, min_calls: int = OPENAI_BREAKER_MIN_CALLS,
+                 failure_rate: float = OPENAI_BREAKER_FAILURE_RATE, open_seconds: float = OPENAI_BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._outcomes = deque(maxlen=self.window)
+            self._opened_at = 0.0
+            self._probing = False
+            self._rejected = 0
+
+    def _current(self, now: float) -> str:
+        """State, moving open -> half-open once the open period is over. Caller holds the lock."""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current(time.monotonic())
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._probing = False
+        print(f"Circuit {self.name} opened")
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise CircuitOpenError. Returns True when the call is
+        the half-open probe.
+        """
+        with self._lock:
+            state = self._current(time.monotonic())
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+        raise CircuitOpenError(f"{self.name} circuit is {state}")
+
+    def record(self, ok: bool, probe: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                if ok:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    print(f"Circuit {self.name} closed")
+                else:
+                    self._open(now)
+                return
+            if self._state != CLOSED:
+                # A call admitted before the circuit opened
+                return
+            self._outcomes.append(ok)
+            failures = len(self._outcomes) - sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    @contextmanager
+    def guard(self):
+        """Run the wrapped call through the breaker; exceptions count as failures and propagate."""
+        probe = self.before_call()
+        try:
+            yield
+        except BaseException:
+            self.record(False, probe)
+            raise
+        self.record(True, probe)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current(now)
+            outcomes = len(self._outcomes)
+            failures = outcomes - sum(self._outcomes)
+            return {
+                "state": state,
+                "recent_calls": outcomes,
+                "recent_failure_rate": round(failures / outcomes, 3) if outcomes else 0.0,
+                "rejected_calls": self._rejected,
+                "retry_in_seconds": round(max(0.0, self.open_seconds - (now - self._opened_at)), 1)
+                if state == OPEN else None,
+                "window": self.window,
+                "min_calls": self.min_calls,
+                "failure_rate_threshold": self.failure_rate,
+                "open_seconds": self.open_seconds,
+            }
+
+
+openai_breaker = CircuitBreaker("openai")
+metrics.CIRCUIT_STATE.set_function(lambda: STATE_VALUES[openai_breaker.state], circuit="openai")
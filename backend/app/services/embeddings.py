@@ -0,0 +1,144 @@
+"""
+Cached text embeddings.
+
+Vectors are keyed by the content hash of the text and the model. A lookup
+checks a bounded in-process LRU, then the `embeddings` table, and sends only
+the remaining texts to the API in one batch; new vectors are written back to
+both. Repeated bodies and re-ranked candidates are therefore embedded once
+per model, not once per query. Vectors are float32 `array('f')`s, so no
+numpy is needed. Lookups are counted as cache="embedding".
+"""
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import bindparam, text
+from app.db.bodies import content_hash
+from app.services import metrics
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "20000"))
+
+SELECT_VECTORS = text(
+    "SELECT hash, vector FROM embeddings WHERE model = :model AND hash IN :hashes"
+).bindparams(bindparam("hashes", expanding=True))
+INSERT_VECTOR = text(
+    "INSERT OR IGNORE INTO embeddings (hash, model, dims, vector, created_at) "
+    "VALUES (:hash, :model, :dims, :vector, :created_at)"
+)
+
+
+def to_bytes(vector: array) -> bytes:
+    return vector.tobytes()
+
+
+def from_bytes(data: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector
+
+
+class EmbeddingCache:
+    """LRU of hash -> vector for one model, backed by the embeddings table."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, max_entries: int = EMBEDDING_CACHE_SIZE):
+        self.model = model
+        self.max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def _remember(self, digest: str, vector: array):
+        with self._lock:
+            self._vectors[digest] = vector
+            self._vectors.move_to_end(digest)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+    def _load(self, hashes: list) -> dict:
+        from app.db.session import engine
+        rows = []
+        try:
+            with engine.connect() as conn:
+                # Batched to stay under SQLite's bound parameter limit
+                for i in range(0, len(hashes), 500):
+                    rows += conn.execute(SELECT_VECTORS, {"model": self.model, "hashes": hashes[i:i + 500]}).all()
+        except Exception as e:
+            print(f"Error reading cached embeddings: {e}")
+            return {}
+        return {digest: from_bytes(data) for digest, data in rows}
+
+    def _save(self, vectors: dict):
+        from app.db.session import engine
+        now = datetime.utcnow()
+        try:
+            with engine.begin() as conn:
+                conn.execute(INSERT_VECTOR, [
+                    {"hash": digest, "model": self.model, "dims": len(vector), "vector": to_bytes(vector),
+                     "created_at": now}
+                    for digest, vector in vectors.items()
+                ])
+        except Exception as e:
+            print(f"Error storing embeddings: {e}")
+
+    def _request(self, texts: list, api_key: str) -> list:
+        from app.services.circuit import OPENAI_EMBEDDING_TIMEOUT, CircuitOpenError, openai_breaker
+        from app.services.llm_service import _client
+        try:
+            with openai_breaker.guard(), metrics.stage("embedding_request"):
+                response = _client(api_key).embeddings.create(model=self.model, input=texts,
+                                                              timeout=OPENAI_EMBEDDING_TIMEOUT)
+        except CircuitOpenError:
+            raise
+        except Exception:
+            metrics.LLM_CALLS.inc(kind="embedding", outcome="error")
+            raise
+        metrics.LLM_CALLS.inc(kind="embedding", outcome="ok")
+        metrics.record_usage("embedding", getattr(response, "usage", None))
+        return [array("f", item.embedding) for item in response.data]
+
+    def lookup(self, hashes: list, count: bool = False) -> dict:
+        """Cached vectors of `hashes` (memory, then the table); never calls the API."""
+        found = {}
+        with self._lock:
+            for digest in hashes:
+                vector = self._vectors.get(digest)
+                if vector is not None:
+                    self._vectors.move_to_end(digest)
+                    found[digest] = vector
+
+        missing = [digest for digest in dict.fromkeys(hashes) if digest not in found]
+        if missing:
+            for digest, vector in self._load(missing).items():
+                found[digest] = vector
+                self._remember(digest, vector)
+        if count:
+            for digest in hashes:
+                metrics.record_cache("embedding", digest in found)
+        return found
+
+    def cached(self, text: str):
+        """The in-memory vector of `text`, or None."""
+        with self._lock:
+            return self._vectors.get(content_hash(text))
+
+    def embed(self, texts: list[str], api_key: str) -> list[array]:
+        """One vector per text, in order. API errors propagate to the caller."""
+        hashes = [content_hash(t) for t in texts]
+        found = self.lookup(hashes, count=True)
+
+        pending = {digest: t for digest, t in zip(hashes, texts) if digest not in found}
+        if pending:
+            vectors = dict(zip(pending, self._request(list(pending.values()), api_key)))
+            self._save(vectors)
+            for digest, vector in vectors.items():
+                found[digest] = vector
+                self._remember(digest, vector)
+        return [found[digest] for digest in hashes]
+
+
+embedding_cache = EmbeddingCache()
+metrics.CACHE_ENTRIES.set_function(lambda: len(embedding_cache), cache="embedding")
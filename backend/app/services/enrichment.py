@@ -0,0 +1,194 @@
+"""
+Deferred LLM enrichment.
+
+With LLM_ENRICHMENT=deferred the pipeline does not wait for the LLM: events
+are stored and returned with the deterministic summary, and a row in
+`enrichment_queue` is written in the same transaction. Events above the alert
+threshold are the exception: the alert goes out at ingest, so the pipeline
+still summarizes them inline. A background worker
+then generates the LLM summary, updates the stored analysis, sets the event
+to PROCESSED and removes the row, so ingest latency no longer depends on
+OpenAI latency.
+
+The queue lives in the database, so pending events survive restarts and
+every API process can run a worker: a worker claims a row by pushing its
+`not_before` out by ENRICHMENT_LEASE_SECONDS, so two workers never enrich the
+same event at once. Failed attempts are retried with exponential backoff up
+to ENRICHMENT_MAX_ATTEMPTS; after that the row stays with its last error and
+the event keeps its deterministic summary. While the OpenAI circuit is open
+the worker stays idle and rows are not charged an attempt. GET /events/{id}/enrichment
+reports the state and returns the enriched summary.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from sqlalchemy import text
+
+from app.db import bodies
+from app.services import metrics
+from app.services.circuit import OPEN, CircuitOpenError, openai_breaker
+
+LLM_ENRICHMENT = os.getenv("LLM_ENRICHMENT", "inline")
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "16"))
+ENRICHMENT_POLL_SECONDS = float(os.getenv("ENRICHMENT_POLL_SECONDS", "5"))
+ENRICHMENT_LEASE_SECONDS = float(os.getenv("ENRICHMENT_LEASE_SECONDS", "120"))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "5"))
+ENRICHMENT_MAX_BACKOFF = 600
+
+DUE = text("""
+    SELECT event_id FROM enrichment_queue
+    WHERE not_before <= :now AND attempts < :max_attempts
+    ORDER BY not_before LIMIT :limit
+""")
+CLAIM = text("""
+    UPDATE enrichment_queue SET not_before = :lease
+    WHERE event_id = :event_id AND not_before <= :now AND attempts < :max_attempts
+""")
+EVENT = text(f"SELECT {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN} WHERE events.id = :event_id")
+# Moving the row to a new id is what tells the read endpoints' ETag that the data changed
+UPDATE_ANALYSIS = text("""
+    UPDATE analyses SET id = (SELECT MAX(id) FROM analyses) + 1,
+        summary = :summary, recommendation = :recommendation, analyzed_at = :analyzed_at
+    WHERE event_id = :event_id
+""")
+MARK_PROCESSED = text("UPDATE events SET status = 'PROCESSED' WHERE id = :event_id")
+DEQUEUE = text("DELETE FROM enrichment_queue WHERE event_id = :event_id")
+RETRY = text("""
+    UPDATE enrichment_queue SET attempts = attempts + 1, not_before = :not_before, last_error = :error
+    WHERE event_id = :event_id
+""")
+RELEASE = text("UPDATE enrichment_queue SET not_before = :not_before WHERE event_id = :event_id")
+PENDING = text("SELECT COUNT(*) FROM enrichment_queue WHERE attempts < :max_attempts")
+
+
+def deferred() -> bool:
+    return LLM_ENRICHMENT == "deferred"
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number `attempts` (1-based)."""
+    return min(ENRICHMENT_MAX_BACKOFF, 2.0 ** attempts)
+
+
+class EnrichmentWorker:
+    """Background thread draining `enrichment_queue`; `notify()` wakes it early."""
+
+    def __init__(self, batch_size: int = ENRICHMENT_BATCH_SIZE, poll_seconds: float = ENRICHMENT_POLL_SECONDS,
+                 max_attempts: int = ENRICHMENT_MAX_ATTEMPTS, lease_seconds: float = ENRICHMENT_LEASE_SECONDS,
+                 engine=None):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._engine = engine
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="llm-enrichment", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.db.session import engine
+            self._engine = engine
+        return self._engine
+
+    def pending(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(PENDING, {"max_attempts": self.max_attempts}).scalar()
+
+    def _claim(self) -> list:
+        now = datetime.utcnow()
+        params = {"now": now, "max_attempts": self.max_attempts}
+        claimed = []
+        with self.engine.begin() as conn:
+            for (event_id,) in conn.execute(DUE, {**params, "limit": self.batch_size}).all():
+                lease = now + timedelta(seconds=self.lease_seconds)
+                if conn.execute(CLAIM, {**params, "event_id": event_id, "lease": lease}).rowcount:
+                    claimed.append(event_id)
+        return claimed
+
+    def enrich(self, event_id: str, summarize) -> bool:
+        """
+        Store the summary `summarize(content, scores, semantics)` returns for
+        one claimed event; False if it raised and the event is to be retried.
+        """
+        from app.services.analysis_cache import analysis_cache
+
+        engine = self.engine
+        with engine.connect() as conn:
+            content = conn.execute(EVENT, {"event_id": event_id}).scalar()
+        if content is None:
+            # Event deleted meanwhile
+            with engine.begin() as conn:
+                conn.execute(DEQUEUE, {"event_id": event_id})
+            return True
+
+        analysis = analysis_cache.get(content)
+        try:
+            with metrics.stage("deferred_enrichment"):
+                llm_output = summarize(content, analysis.score_matrix().model_dump(), analysis.semantics())
+        except CircuitOpenError:
+            # Not the event's fault: retry once the circuit may let calls through, without using up an attempt
+            with engine.begin() as conn:
+                conn.execute(RELEASE, {"event_id": event_id, "not_before": datetime.utcnow() + timedelta(
+                    seconds=openai_breaker.open_seconds)})
+            return False
+        except Exception as e:
+            with engine.begin() as conn:
+                attempts = conn.execute(
+                    text("SELECT attempts FROM enrichment_queue WHERE event_id = :event_id"), {"event_id": event_id}
+                ).scalar() or 0
+                conn.execute(RETRY, {"event_id": event_id, "error": str(e)[:500],
+                                     "not_before": datetime.utcnow() + timedelta(seconds=backoff(attempts + 1))})
+            if attempts + 1 >= self.max_attempts:
+                print(f"Giving up on LLM enrichment of {event_id} after {attempts + 1} attempts: {e}")
+            return False
+
+        with engine.begin() as conn:
+            conn.execute(UPDATE_ANALYSIS, {"event_id": event_id, "summary": llm_output["summary"],
+                                           "recommendation": llm_output["recommendation"],
+                                           "analyzed_at": datetime.utcnow()})
+            conn.execute(MARK_PROCESSED, {"event_id": event_id})
+            conn.execute(DEQUEUE, {"event_id": event_id})
+        return True
+
+    def run_once(self) -> int:
+        """Enrich one batch of due events; returns how many were enriched."""
+        from app.services.llm_service import request_risk_summary
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or openai_breaker.state == OPEN:
+            return 0
+        summarize = partial(request_risk_summary, api_key=api_key)
+        return sum(self.enrich(event_id, summarize) for event_id in self._claim())
+
+    def _run(self):
+        if not os.getenv("OPENAI_API_KEY"):
+            print("Warning: OPENAI_API_KEY not set. Deferred enrichment stays pending.")
+        while not self._stopping.is_set():
+            try:
+                enriched = self.run_once()
+            except Exception as e:
+                print(f"Error in enrichment worker: {e}")
+                enriched = 0
+            if not enriched:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+enrichment_worker = EnrichmentWorker()
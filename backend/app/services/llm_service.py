@@ -1,10 +1,15 @@
 """
 LLM-based risk summarization service.
 Uses OpenAI API for generating risk summaries and recommendations.
-Falls back to deterministic output if API key is missing.
+Falls back to deterministic output if API key is missing, the call fails or
+the OpenAI circuit is open.
 """
 import os
-from openai import OpenAI
+from functools import lru_cache
+from app.services import metrics
+from app.services.circuit import (
+    OPENAI_CHAT_TIMEOUT, OPENAI_MAX_RETRIES, CircuitOpenError, openai_breaker,
+)
 
 
 SYSTEM_PROMPT = """You are an enterprise risk analyst.
@@ -16,23 +21,20 @@ SUMMARY: [2-3 sentences summarizing the risk]
 RECOMMENDATION: [1 sentence with actionable recommendation]"""
 
 
-def generate_risk_summary(event_text: str, scores: dict, semantics: dict) -> dict:
-    """
-    Generate an LLM-based risk summary and recommendation.
-    
-    Args:
-        event_text: The event content
-        scores: Score matrix dict
-        semantics: Risk semantics dict with category_scores and matched_keywords
-        
-    Returns:
-        dict with 'summary' and 'recommendation' keys
-    """
-    # Build the prompt
+@lru_cache(maxsize=4)
+def _client(api_key: str):
+    # Imported here so the SDK only loads once an API key is actually used;
+    # reusing the client keeps its HTTP connection pool warm between calls.
+    # Retries are left to the circuit breaker and the callers' fallbacks.
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, max_retries=OPENAI_MAX_RETRIES)
+
+
+def _user_prompt(event_text: str, scores: dict, semantics: dict) -> str:
     category_scores = semantics.get("category_scores", {})
     matched_keywords = semantics.get("matched_keywords", {})
     
-    user_prompt = f"""
+    return f"""
 Event: {event_text}
 
 Risk Scores:
@@ -53,30 +55,66 @@ Matched Keywords: {', '.join([kw for kws in matched_keywords.values() for kw in
 Provide a professional risk summary and recommendation.
 """
 
-    # Try OpenAI API
-    api_key = os.getenv("OPENAI_API_KEY")
-    
-    if api_key:
-        try:
-            client = OpenAI(api_key=api_key)
+
+def request_risk_summary(event_text: str, scores: dict, semantics: dict, api_key: str) -> dict:
+    """
+    One chat completion for the summary; API errors and CircuitOpenError
+    propagate to the caller.
+    """
+    try:
+        client = _client(api_key)
+        with openai_breaker.guard(), metrics.stage("chat_completion_request"):
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
+                    {"role": "user", "content": _user_prompt(event_text, scores, semantics)},
                 ],
                 temperature=0.3,
                 max_tokens=300,
+                timeout=OPENAI_CHAT_TIMEOUT,
             )
-            
-            output = response.choices[0].message.content
-            return _parse_llm_output(output)
+    except CircuitOpenError:
+        raise
+    except Exception:
+        metrics.LLM_CALLS.inc(kind="chat", outcome="error")
+        raise
+    metrics.LLM_CALLS.inc(kind="chat", outcome="ok")
+    metrics.record_usage("chat", getattr(response, "usage", None))
+    return _parse_llm_output(response.choices[0].message.content)
+
+
+def generate_risk_summary(event_text: str, scores: dict, semantics: dict) -> dict:
+    """
+    Generate an LLM-based risk summary and recommendation.
+    
+    Args:
+        event_text: The event content
+        scores: Score matrix dict
+        semantics: Risk semantics dict with category_scores and matched_keywords
         
+    Returns:
+        dict with 'summary' and 'recommendation' keys
+    """
+    # Try OpenAI API
+    api_key = os.getenv("OPENAI_API_KEY")
+    
+    if api_key:
+        try:
+            return request_risk_summary(event_text, scores, semantics, api_key)
+        except CircuitOpenError:
+            return fallback_summary(event_text, scores, semantics, reason="circuit_open")
         except Exception as e:
             # Fall back to deterministic
-            return _generate_deterministic_summary(event_text, scores, semantics)
+            return fallback_summary(event_text, scores, semantics, reason="error")
     
     # No API key - use deterministic fallback
+    return fallback_summary(event_text, scores, semantics, reason="no_api_key")
+
+
+def fallback_summary(event_text: str, scores: dict, semantics: dict, reason: str) -> dict:
+    """The deterministic summary, counted as a fallback for `reason`."""
+    metrics.FALLBACKS.inc(kind="deterministic_summary", reason=reason)
     return _generate_deterministic_summary(event_text, scores, semantics)
 
 
@@ -0,0 +1,255 @@
+"""
+In-process metrics with Prometheus text exposition.
+Disabled unless METRICS_ENABLED is set; when disabled every recording call
+returns immediately and `stage()` hands back a shared no-op context manager.
+Metrics are per process: with several uvicorn workers, scrape each worker.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+# Set by app.services.profiling while a profiled request is running
+SPAN_RECORDER = ContextVar("span_recorder", default=None)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[_label_key(self.labelnames, labels)] = value
+
+    def set_function(self, fn, **labels):
+        """Sample `fn()` at scrape time instead of on every change."""
+        with self._lock:
+            self._functions[_label_key(self.labelnames, labels)] = fn
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        items.extend((key, fn()) for key, fn in functions)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "risk_stage_duration_seconds", "Time spent in each analysis stage.", ("stage",)))
+LLM_CALLS = REGISTRY.register(Counter(
+    "risk_openai_calls_total", "OpenAI API calls by kind and outcome.", ("kind", "outcome")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "risk_openai_tokens_total", "OpenAI tokens used by kind and token type.", ("kind", "type")))
+FALLBACKS = REGISTRY.register(Counter(
+    "risk_fallbacks_total", "Deterministic fallbacks taken instead of OpenAI.", ("kind", "reason")))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "risk_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")))
+CACHE_BYTES = REGISTRY.register(Gauge(
+    "risk_cache_bytes", "Estimated memory held by in-process caches.", ("cache",)))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "risk_cache_entries", "Entries held by in-process caches.", ("cache",)))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "risk_queue_depth", "Items waiting in background queues.", ("queue",)))
+ADMISSIONS = REGISTRY.register(Counter(
+    "risk_admissions_total", "Ingested events by pre-screen priority and admission outcome.", ("priority", "outcome")))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "risk_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ("circuit",)))
+NOTIFICATIONS = REGISTRY.register(Counter(
+    "risk_notifications_total", "Webhook messages by outcome.", ("outcome",)))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "risk_db_query_duration_seconds", "SQL statement execution time.", ("statement",)))
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("name", "started", "spans")
+
+    def __init__(self, name: str, spans):
+        self.name = name
+        self.spans = spans
+
+    def __enter__(self):
+        if self.spans:
+            self.spans.enter(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.name)
+        if self.spans:
+            self.spans.exit()
+        return False
+
+
+def stage(name: str):
+    """
+    Time a block into the per-stage histogram: `with metrics.stage("scoring"): ...`.
+    Also records a span when the current request is being profiled.
+    """
+    spans = SPAN_RECORDER.get()
+    if not METRICS_ENABLED and spans is None:
+        return _NOOP_STAGE
+    return _Stage(name, spans)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_usage(kind: str, usage):
+    """Count tokens from an OpenAI response `usage` object, if present."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    if prompt:
+        LLM_TOKENS.inc(prompt, kind=kind, type="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, kind=kind, type="completion")
+
+
+def instrument_engine(engine):
+    """Time every SQL statement executed through `engine`."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        verb = statement.lstrip().split(" ", 1)[0].upper()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement=verb)
+
+
+def render() -> str:
+    return REGISTRY.render()
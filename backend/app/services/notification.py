@@ -1,18 +1,49 @@
+"""
+Webhook notification service.
+Alerts are queued in memory and delivered by a background dispatcher thread,
+so the ingest path never blocks on the webhook. The dispatcher coalesces
+queued alerts into multi-embed messages, honours Discord rate limits and
+spools undeliverable messages to disk for later replay.
+"""
 import os
-import requests
 import json
+import queue
+import threading
+import time
 from datetime import datetime
+from app.services import metrics
+
+# Discord accepts at most 10 embeds per webhook message
+MAX_EMBEDS_PER_MESSAGE = 10
+
 
 class NotificationService:
     """
     Service for sending high-risk alerts to external platforms via Webhooks.
     """
-    def __init__(self):
-        self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
+    def __init__(self, webhook_url: str = None, queue_size: int = None, spool_path: str = None,
+                 batch_window: float = None, max_retries: int = 3):
+        self.webhook_url = webhook_url or os.getenv("DISCORD_WEBHOOK_URL")
+        self.spool_path = spool_path or os.getenv("NOTIFICATION_SPOOL_PATH", "./notification_spool.jsonl")
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("NOTIFICATION_BATCH_WINDOW", "0.5"))
+        self.max_retries = max_retries
+        self.queue = queue.Queue(maxsize=queue_size or int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1000")))
+
+        self._session = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._rate_limited_until = 0.0
+        self._next_spool_replay = 0.0
+        metrics.QUEUE_DEPTH.set_function(self.queue.qsize, queue="notifications")
 
-    def send_risk_alert(self, event_id: str, content: str, source: str, risk_summary: str, recommendation: str, risk_score: float):
+    def send_risk_alert(self, event_id: str, content: str, source: str, risk_summary: str, recommendation: str, risk_score: float,
+                        occurrences: int = 1):
         """
-        Send a formatted Discord Embed alert for high-risk events.
+        Queue a formatted Discord Embed alert for high-risk events.
+        Returns immediately; delivery happens on the dispatcher thread.
+        `occurrences` > 1 marks an escalation of a repeatedly suppressed alert.
         """
         if not self.webhook_url:
             print("Warning: DISCORD_WEBHOOK_URL not set. Skipping alert.")
@@ -21,29 +52,261 @@ class NotificationService:
         # Determine color based on score (High: Red, Moderate: Orange)
         color = 0xff0000 if risk_score >= 0.6 else 0xffa500
 
-        payload = {
-            "embeds": [
-                {
-                    "title": "🚨 High Risk Event Detected",
-                    "description": risk_summary,
-                    "color": color,
-                    "fields": [
-                        {"name": "Event ID", "value": f"`{event_id}`", "inline": True},
-                        {"name": "Source", "value": source.capitalize(), "inline": True},
-                        {"name": "Risk Score", "value": f"{risk_score:.2f}", "inline": True},
-                        {"name": "Actionable Recommendation", "value": recommendation}
-                    ],
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "footer": {"text": "AI Risk Scoring System"}
-                }
-            ]
+        embed = {
+            "title": "🚨 High Risk Event Detected",
+            "description": risk_summary,
+            "color": color,
+            "fields": [
+                {"name": "Event ID", "value": f"`{event_id}`", "inline": True},
+                {"name": "Source", "value": source.capitalize(), "inline": True},
+                {"name": "Risk Score", "value": f"{risk_score:.2f}", "inline": True},
+                {"name": "Actionable Recommendation", "value": recommendation}
+            ],
+            "timestamp": datetime.utcnow().isoformat(),
+            "footer": {"text": "AI Risk Scoring System"}
         }
+        if occurrences > 1:
+            embed["title"] = f"🚨 Recurring High Risk Event ({occurrences} occurrences)"
+            embed["fields"].insert(3, {"name": "Occurrences", "value": str(occurrences), "inline": True})
+        self.enqueue(embed)
+
+    def send_digest(self, entries: list, interval: float):
+        """
+        Queue a digest embed summarizing alerts suppressed as duplicates.
+        `entries` are alerting.DigestEntry records, most suppressed first.
+        """
+        if not self.webhook_url or not entries:
+            return
+
+        lines = []
+        for entry in entries[:15]:
+            category = entry.category.replace("_", " ").title()
+            lines.append(
+                f"• **{entry.suppressed}× suppressed** {entry.source.capitalize()} / {category} "
+                f"(max risk {entry.max_risk:.2f}, last `{entry.last_event_id}`)"
+            )
+        if len(entries) > 15:
+            lines.append(f"…and {len(entries) - 15} more alert groups.")
+
+        total = sum(entry.suppressed for entry in entries)
+        self.enqueue({
+            "title": f"📋 Suppressed Alert Digest ({total} alerts)",
+            "description": "\n".join(lines),
+            "color": 0xffa500,
+            "fields": [
+                {"name": "Window", "value": f"Last {interval / 60:.0f} minutes", "inline": True},
+                {"name": "Alert Groups", "value": str(len(entries)), "inline": True},
+            ],
+            "timestamp": datetime.utcnow().isoformat(),
+            "footer": {"text": "AI Risk Scoring System"}
+        })
+
+    def enqueue(self, embed: dict):
+        """Queue a single embed for delivery, spooling it if the queue is full."""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(embed)
+        except queue.Full:
+            print("Warning: notification queue full. Spooling alert to disk.")
+            self._spool([embed])
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued alert has been delivered or spooled."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Stop the dispatcher, spooling anything it could not deliver in time."""
+        self.flush(timeout)
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+        leftover = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+                self.queue.task_done()
+            except queue.Empty:
+                break
+        for i in range(0, len(leftover), MAX_EMBEDS_PER_MESSAGE):
+            self._spool(leftover[i:i + MAX_EMBEDS_PER_MESSAGE])
+        if self._session is not None:
+            self._session.close()
+
+    @property
+    def session(self):
+        """One pooled session reused for every delivery, created on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            self._session = session
+        return self._session
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                try:
+                    self._replay_spool()
+                except Exception as e:
+                    print(f"Error replaying spooled Discord alerts: {e}")
+                continue
 
+            # Coalesce whatever else arrives within the batch window
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < MAX_EMBEDS_PER_MESSAGE:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                if not self._deliver({"embeds": batch}):
+                    self._spool(batch)
+            except Exception as e:
+                print(f"Error sending Discord alert: {e}")
+                self._spool(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _deliver(self, payload: dict) -> bool:
+        """
+        POST one webhook message, retrying on rate limits and transient errors.
+        Returns False if the webhook stayed unreachable.
+        """
+        import requests
+        failures = 0
+        rate_limited = 0
+        while not self._stopping.is_set():
+            wait = self._rate_limited_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                with metrics.stage("webhook_delivery"):
+                    response = self.session.post(self.webhook_url, json=payload, timeout=5)
+            except requests.RequestException as e:
+                print(f"Error sending Discord alert: {e}")
+                response = None
+
+            if response is not None:
+                self._track_rate_limit(response)
+                if response.status_code == 429:
+                    metrics.NOTIFICATIONS.inc(outcome="rate_limited")
+                    self._rate_limited_until = time.monotonic() + _retry_after(response)
+                    rate_limited += 1
+                    if rate_limited > 5 * (self.max_retries + 1):
+                        return False
+                    continue
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        # Client errors will not succeed on retry
+                        print(f"Error sending Discord alert: HTTP {response.status_code}")
+                        metrics.NOTIFICATIONS.inc(outcome="rejected")
+                    else:
+                        metrics.NOTIFICATIONS.inc(outcome="delivered")
+                    return True
+
+            failures += 1
+            if failures > self.max_retries:
+                return False
+            time.sleep(min(0.5 * 2 ** (failures - 1), 8.0))
+        return False
+
+    def _track_rate_limit(self, response):
+        """Pause before the bucket is exhausted rather than waiting for a 429."""
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(response.headers.get("X-RateLimit-Reset-After", "0"))
+            except ValueError:
+                reset_after = 0.0
+            self._rate_limited_until = max(self._rate_limited_until, time.monotonic() + reset_after)
+
+    def _spool(self, embeds: list):
+        """Append an undeliverable message to the on-disk spool."""
+        metrics.NOTIFICATIONS.inc(outcome="spooled")
+        with self._spool_lock:
+            try:
+                with open(self.spool_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"embeds": embeds}) + "\n")
+            except OSError as e:
+                print(f"Error spooling Discord alert: {e}")
+        self._next_spool_replay = time.monotonic() + 30.0
+
+    def _replay_spool(self):
+        """
+        Retry spooled messages once the dispatcher is idle. The replay file is
+        only removed once each of its messages was delivered or spooled again,
+        so a crash mid-replay leaves it to be picked up next time.
+        """
+        replay_path = self.spool_path + ".replay"
+        if time.monotonic() < self._next_spool_replay:
+            return
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spool_path):
+                return
+            with self._spool_lock:
+                try:
+                    os.replace(self.spool_path, replay_path)
+                except OSError:
+                    return
+
+        payloads = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    payloads.append(json.loads(line)["embeds"])
+                except (ValueError, KeyError, TypeError) as e:
+                    # A line torn by a crash while spooling
+                    print(f"Skipping unreadable spooled alert at line {number}: {e}")
+
+        for i, embeds in enumerate(payloads):
+            if not self._deliver({"embeds": embeds}):
+                # Still unreachable: put this and the rest back
+                for rest in payloads[i:]:
+                    self._spool(rest)
+                break
+        os.remove(replay_path)
+
+
+def _retry_after(response) -> float:
+    """Read the rate-limit delay in seconds from headers or the JSON body."""
+    header = response.headers.get("Retry-After")
+    if header:
         try:
-            response = requests.post(self.webhook_url, json=payload, timeout=5)
-            response.raise_for_status()
-        except Exception as e:
-            print(f"Error sending Discord alert: {e}")
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        return float(response.json().get("retry_after", 1.0))
+    except Exception:
+        return 1.0
+
 
 # Singleton instance
 notification_service = NotificationService()
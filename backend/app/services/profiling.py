@@ -0,0 +1,194 @@
+"""
+Request-scoped profiling for the analysis pipeline.
+A request opts in with an `X-Profile` header or `?profile=` query flag
+(`cpu`, `memory`, `spans`, comma-separated, or `1` for all), or is sampled
+at PROFILE_SAMPLE_RATE. The captured span tree, cProfile statistics and
+tracemalloc allocation sites are stored under PROFILE_DIR.
+"""
+import os
+import cProfile
+import io
+import json
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from app.services import metrics
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_MODES = os.getenv("PROFILE_SAMPLE_MODES", "spans")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+ALL_MODES = ("spans", "cpu", "memory")
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# tracemalloc is process-wide, so only one request may trace allocations at a time
+_memory_lock = threading.Lock()
+
+
+def parse_modes(value: str) -> tuple:
+    """Turn a header/query value into a tuple of profiling modes."""
+    if not value:
+        return ()
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "all"):
+        return ALL_MODES
+    return tuple(m for m in (part.strip() for part in value.split(",")) if m in ALL_MODES)
+
+
+def requested_modes(request) -> tuple:
+    """Profiling modes requested by a FastAPI request, or chosen by sampling."""
+    modes = parse_modes(request.headers.get("x-profile") or request.query_params.get("profile", ""))
+    if not modes and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        modes = parse_modes(PROFILE_SAMPLE_MODES)
+    return modes
+
+
+class SpanRecorder:
+    """Builds a span tree from nested `metrics.stage()` blocks."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.root = {"name": "request", "start_ms": 0.0, "duration_ms": 0.0, "children": []}
+        self._stack = [self.root]
+
+    def enter(self, name: str):
+        span = {"name": name, "start_ms": self._ms(time.perf_counter()), "duration_ms": 0.0, "children": []}
+        self._stack[-1]["children"].append(span)
+        self._stack.append(span)
+
+    def exit(self):
+        span = self._stack.pop()
+        span["duration_ms"] = round(self._ms(time.perf_counter()) - span["start_ms"], 3)
+
+    def finish(self):
+        self.root["duration_ms"] = round(self._ms(time.perf_counter()), 3)
+
+    def _ms(self, now: float) -> float:
+        return round((now - self.origin) * 1000.0, 3)
+
+
+class Profile:
+    """Handle for the profile captured by one request."""
+
+    def __init__(self, label: str, modes: tuple):
+        self.id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.modes = modes
+
+
+@contextmanager
+def profile_request(label: str, modes: tuple):
+    """
+    Profile the enclosed block if any modes were requested; otherwise a no-op.
+    Yields the Profile (or None) so callers can return its id.
+    """
+    if not modes:
+        yield None
+        return
+
+    profile = Profile(label, modes)
+    spans = SpanRecorder() if "spans" in modes else None
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    tracing = "memory" in modes and not tracemalloc.is_tracing() and _memory_lock.acquire(blocking=False)
+
+    token = metrics.SPAN_RECORDER.set(spans) if spans else None
+    before = None
+    if tracing:
+        tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+    if profiler:
+        profiler.enable()
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        duration = time.perf_counter() - started
+        if profiler:
+            profiler.disable()
+        after = None
+        if tracing:
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            _memory_lock.release()
+        if token is not None:
+            metrics.SPAN_RECORDER.reset(token)
+            spans.finish()
+        try:
+            _store(profile, duration, spans, profiler, before, after)
+        except OSError as e:
+            print(f"Error storing profile {profile.id}: {e}")
+
+
+def _store(profile: Profile, duration: float, spans, profiler, before, after):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    record = {
+        "id": profile.id,
+        "label": profile.label,
+        "modes": list(profile.modes),
+        "created_at": datetime.utcnow().isoformat(),
+        "duration_ms": round(duration * 1000.0, 3),
+    }
+    if spans:
+        record["spans"] = spans.root
+    if profiler:
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile.id}.prof"))
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+        record["cpu_top"] = out.getvalue()
+    if after is not None:
+        stats = after.compare_to(before, "lineno")[:30]
+        record["memory_top"] = [
+            {"site": str(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in stats
+        ]
+    elif "memory" in profile.modes:
+        record["memory_skipped"] = "another request was tracing allocations"
+
+    with open(os.path.join(PROFILE_DIR, f"{profile.id}.json"), "w") as f:
+        json.dump(record, f)
+    _prune()
+
+
+def _prune():
+    """Keep at most PROFILE_MAX_FILES profiles, oldest removed first."""
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for profile_id in ids[:-PROFILE_MAX_FILES]:
+        for ext in (".json", ".prof"):
+            path = os.path.join(PROFILE_DIR, profile_id + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(limit: int = 50) -> list[dict]:
+    """Summaries of the most recent stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    ids = sorted((name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    summaries = []
+    for profile_id in ids[:limit]:
+        record = load_profile(profile_id)
+        if record:
+            summaries.append({k: record[k] for k in ("id", "label", "modes", "created_at", "duration_ms")})
+    return summaries
+
+
+def load_profile(profile_id: str) -> dict:
+    path = profile_path(profile_id, ".json")
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def profile_path(profile_id: str, ext: str) -> str:
+    """Path of a stored profile file, or None for ids that are not ours."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, profile_id + ext)
@@ -5,7 +5,8 @@ Uses embeddings for similarity search with TF-IDF fallback.
 import os
 import math
 from collections import Counter
-from openai import OpenAI
+from app.services import metrics, tokenizer
+from app.services.circuit import CircuitOpenError
 
 
 def find_similar_events(event_text: str, past_events: list[dict], top_k: int = 3) -> list[dict]:
@@ -29,28 +30,28 @@ def find_similar_events(event_text: str, past_events: list[dict], top_k: int = 3
     if api_key:
         try:
             return _find_similar_with_embeddings(event_text, past_events, top_k, api_key)
+        except CircuitOpenError:
+            metrics.FALLBACKS.inc(kind="tfidf", reason="circuit_open")
         except Exception:
-            pass
+            metrics.FALLBACKS.inc(kind="tfidf", reason="error")
+    else:
+        metrics.FALLBACKS.inc(kind="tfidf", reason="no_api_key")
     
     # Fallback to TF-IDF
-    return _find_similar_with_tfidf(event_text, past_events, top_k)
+    with metrics.stage("tfidf_similarity"):
+        return _find_similar_with_tfidf(event_text, past_events, top_k)
 
 
 def _find_similar_with_embeddings(event_text: str, past_events: list[dict], 
                                    top_k: int, api_key: str) -> list[dict]:
-    """Use OpenAI embeddings for similarity search."""
-    client = OpenAI(api_key=api_key)
-    
+    """Use OpenAI embeddings for similarity search; only uncached texts are sent."""
+    from app.services.embeddings import embedding_cache
+
     # Get all texts
     texts = [event_text] + [e["content"] for e in past_events]
     
     # Get embeddings
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=texts
-    )
-    
-    embeddings = [item.embedding for item in response.data]
+    embeddings = embedding_cache.embed(texts, api_key)
     query_embedding = embeddings[0]
     event_embeddings = embeddings[1:]
     
@@ -74,20 +75,23 @@ def _find_similar_with_tfidf(event_text: str, past_events: list[dict],
     """Use TF-IDF for similarity search (fallback)."""
     # Tokenize all documents
     all_docs = [event_text] + [e["content"] for e in past_events]
-    tokenized = [_tokenize(doc) for doc in all_docs]
+    # Plain tokens: these texts are compared once, they don't belong in an index vocabulary
+    tokenized = [tokenizer.tokens(doc) for doc in all_docs]
     
-    # Build vocabulary
-    vocab = set()
+    # Build vocabulary and document frequencies
+    df = Counter()
     for tokens in tokenized:
-        vocab.update(tokens)
-    vocab = sorted(vocab)
+        df.update(set(tokens))
+    vocab = sorted(df)
     
     # Calculate IDF
     idf = {}
     n_docs = len(tokenized)
     for term in vocab:
-        doc_freq = sum(1 for tokens in tokenized if term in tokens)
-        idf[term] = math.log(n_docs / (1 + doc_freq))
+        doc_freq = df[term]
+        # Smoothed like the retrieval index; the unsmoothed form zeroes out terms
+        # shared by most documents, which is every term of a lexical candidate set
+        idf[term] = math.log((1 + n_docs) / (1 + doc_freq)) + 1.0
     
     # Calculate TF-IDF vectors
     vectors = []
@@ -114,11 +118,6 @@ def _find_similar_with_tfidf(event_text: str, past_events: list[dict],
     return similarities[:top_k]
 
 
-def _tokenize(text: str) -> list[str]:
-    """Simple tokenization."""
-    return text.lower().split()
-
-
 def _cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
     """Calculate cosine similarity between two vectors."""
     if len(vec1) != len(vec2):
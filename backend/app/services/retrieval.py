@@ -0,0 +1,307 @@
+"""
+Similarity retrieval shared by the analysis pipeline and both agent tool sets.
+
+Keeps a warm in-process TF-IDF inverted index over the most recent
+RETRIEVAL_INDEX_SIZE events. It is built once from the database (in the
+background at startup, or on first use) and then kept current by the write
+path, so a lookup only touches the postings of the query's terms instead of
+reloading and re-vectorizing past events per call. In shared-index mode
+(SHARED_INDEX_DIR) lookups go to the published generation instead.
+
+RETRIEVAL_CANDIDATES=fts retrieves in two stages instead: the full-text index
+picks the RETRIEVAL_RERANK_TOP_N best BM25 matches over the whole history,
+and rag_service re-ranks only those, with cached embeddings when an API key
+is configured. RETRIEVAL_CANDIDATES=vectors embeds the query and searches the
+quantized vector index over every embedded event (app.services.vector_index).
+"""
+import os
+import heapq
+import math
+import threading
+from array import array
+from collections import Counter, deque
+from sqlalchemy import text
+from app.services import metrics, tokenizer
+
+RETRIEVAL_INDEX_SIZE = int(os.getenv("RETRIEVAL_INDEX_SIZE", "50000"))
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR")
+RETRIEVAL_CANDIDATES = os.getenv("RETRIEVAL_CANDIDATES", "index")
+RETRIEVAL_RERANK_TOP_N = int(os.getenv("RETRIEVAL_RERANK_TOP_N", "20"))
+
+# Token ids of evicted events are not reused; past this many unused ids the index is rebuilt
+VOCABULARY_SLACK = 4096
+
+
+class RetrievalIndex:
+    """
+    Bounded inverted index: token id -> {event_id: weight}. Weights are
+    L2-normalized tf-idf using the (smoothed) document frequencies at the
+    time the event was added; `build()` recomputes them all. Token ids come
+    from the index's own vocabulary, which `build()` starts afresh.
+    """
+
+    def __init__(self, max_docs: int = RETRIEVAL_INDEX_SIZE):
+        self.max_docs = max_docs
+        self._postings = {}
+        self._contents = {}
+        self._order = deque()
+        self._vocabulary = tokenizer.Vocabulary()
+        self._lock = threading.RLock()
+        self._built = False
+        self._build_lock = threading.Lock()
+        # Events added while ensure_built() loads from the database, replayed by build()
+        self._pending = None
+
+    def __len__(self):
+        return len(self._contents)
+
+    def _idf(self, term: str) -> float:
+        n_docs = len(self._contents)
+        return math.log((1 + n_docs) / (1 + len(self._postings.get(term, ())))) + 1.0
+
+    def _insert(self, event_id: str, content: str, tf: Counter):
+        weights = {term: count * self._idf(term) for term, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[event_id] = weight / norm
+        self._contents[event_id] = content
+        self._order.append((event_id, array("I", tf)))
+
+    def _evict(self):
+        while len(self._order) > self.max_docs:
+            event_id, terms = self._order.popleft()
+            self._contents.pop(event_id, None)
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(event_id, None)
+                    if not posting:
+                        del self._postings[term]
+        if len(self._vocabulary) > 2 * len(self._postings) + VOCABULARY_SLACK:
+            # Caller holds the lock, so nothing changes while the index is rebuilt
+            self.build([(event_id, self._contents[event_id]) for event_id, _ in self._order])
+
+    def build(self, rows):
+        """Replace the index with (event_id, content) rows, oldest first."""
+        rows = list(rows)[-self.max_docs:]
+        vocabulary = tokenizer.Vocabulary()
+        tokenized = [(event_id, content, Counter(tokenizer.encode(content, vocabulary)))
+                     for event_id, content in rows]
+        df = Counter()
+        for _, _, tf in tokenized:
+            df.update(tf.keys())
+
+        n_docs = len(tokenized)
+        idf = {term: math.log((1 + n_docs) / (1 + count)) + 1.0 for term, count in df.items()}
+        postings, contents, order = {}, {}, deque()
+        # Repeated bodies share one string
+        canonical = {}
+        for event_id, content, tf in tokenized:
+            content = canonical.setdefault(content, content)
+            weights = {term: count * idf[term] for term, count in tf.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                postings.setdefault(term, {})[event_id] = weight / norm
+            contents[event_id] = content
+            order.append((event_id, array("I", tf)))
+
+        with self._lock:
+            self._postings, self._contents, self._order = postings, contents, order
+            self._vocabulary = vocabulary
+            self._built = True
+            pending, self._pending = self._pending or (), None
+            for event_id, content in pending:
+                if event_id not in self._contents:
+                    self._insert(event_id, content, Counter(tokenizer.encode(content, vocabulary)))
+            self._evict()
+
+    def ensure_built(self):
+        """Load the most recent events from the database the first time the index is needed."""
+        if self._built:
+            return
+        with self._build_lock:
+            if self._built:
+                return
+            from app.db import bodies
+            from app.db.session import engine
+            query = text(
+                f"SELECT events.id, {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN} "
+                "ORDER BY events.rowid DESC LIMIT :limit"
+            )
+            with self._lock:
+                # Events committed after the query's snapshot still reach add(); record them
+                self._pending = []
+            try:
+                with metrics.stage("retrieval_index_build"):
+                    with engine.connect() as conn:
+                        rows = conn.execute(query, {"limit": self.max_docs}).all()
+                    self.build(reversed([tuple(row) for row in rows]))
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+
+    def add(self, event_id: str, content: str):
+        """
+        Index a newly stored event. No-op until the index is being built;
+        events added during the build are indexed once it is published.
+        """
+        if not self._built and self._pending is None:
+            return
+        vocabulary = self._vocabulary
+        tf = Counter(tokenizer.encode(content, vocabulary))
+        with self._lock:
+            if not self._built:
+                if self._pending is not None:
+                    self._pending.append((event_id, content))
+                return
+            if event_id in self._contents:
+                return
+            if self._vocabulary is not vocabulary:
+                # Rebuilt meanwhile
+                tf = Counter(tokenizer.encode(content, self._vocabulary))
+            self._insert(event_id, content, tf)
+            self._evict()
+
+    def search(self, query: str, top_k: int = 3) -> list[dict]:
+        self.ensure_built()
+        scores = {}
+        with self._lock:
+            # Tokens no indexed event contains can't contribute
+            tf = Counter(tokenizer.encode(query, self._vocabulary, add=False))
+            weights = {term: count * self._idf(term) for term, count in tf.items() if term in self._postings}
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            if not weights or norm == 0:
+                return []
+            for term, weight in weights.items():
+                factor = weight / norm
+                for event_id, doc_weight in self._postings[term].items():
+                    scores[event_id] = scores.get(event_id, 0.0) + doc_weight * factor
+            top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {"id": event_id, "content": self._contents[event_id], "similarity": round(score, 4)}
+                for event_id, score in top
+            ]
+
+    def warm_async(self):
+        if RETRIEVAL_CANDIDATES == "fts":
+            return
+        if RETRIEVAL_CANDIDATES == "vectors":
+            from app.services.vector_index import event_vectors
+            event_vectors.warm_async()
+        threading.Thread(target=self.ensure_built, name="retrieval-warmup", daemon=True).start()
+
+
+retrieval_index = RetrievalIndex()
+
+
+def _with_contents(hits: list) -> list[dict]:
+    """Attach stored contents to (event_id, similarity) hits, keeping their order."""
+    from sqlalchemy.orm import selectinload
+    from app.db.session import SessionLocal
+    from app.db.models import EventORM
+
+    if not hits:
+        return []
+    db = SessionLocal()
+    try:
+        ids = [event_id for event_id, _ in hits]
+        events = db.query(EventORM).options(selectinload(EventORM.body)).filter(EventORM.id.in_(ids)).all()
+        contents = {e.id: e.body_text for e in events}
+    finally:
+        db.close()
+    return [
+        {"id": event_id, "content": contents[event_id], "similarity": similarity}
+        for event_id, similarity in hits
+        if event_id in contents
+    ]
+
+
+def _search_shared(generation, query: str, top_k: int) -> list[dict]:
+    """Similarity search against a shared index generation; contents come from the database."""
+    return _with_contents(generation.search(query, top_k))
+
+
+def _search_vectors(query: str, top_k: int) -> list[dict]:
+    """
+    Embed `query` and search the quantized event vectors; TF-IDF without an
+    API key, or when the embedding call fails or its circuit is open.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        metrics.FALLBACKS.inc(kind="tfidf", reason="no_api_key")
+        return retrieval_index.search(query, top_k)
+    from app.services.circuit import CircuitOpenError
+    from app.services.embeddings import embedding_cache
+    from app.services.vector_index import event_vectors
+    try:
+        query_vector = embedding_cache.embed([query], api_key)[0]
+    except CircuitOpenError:
+        metrics.FALLBACKS.inc(kind="tfidf", reason="circuit_open")
+        return retrieval_index.search(query, top_k)
+    except Exception as e:
+        print(f"Error embedding query: {e}")
+        metrics.FALLBACKS.inc(kind="tfidf", reason="error")
+        return retrieval_index.search(query, top_k)
+    with metrics.stage("vector_search"):
+        hits = event_vectors.search(query_vector, top_k)
+    return _with_contents(hits)
+
+
+def _search_fts(query: str, top_k: int, top_n: int = None) -> list[dict]:
+    """Re-rank the `top_n` best full-text matches for `query` with rag_service."""
+    from app.db import search
+    from app.db.session import SessionLocal
+    from app.services import rag_service
+
+    db = SessionLocal()
+    try:
+        with metrics.stage("fts_candidates"):
+            candidates = search.candidates(db, query, max(top_n or RETRIEVAL_RERANK_TOP_N, top_k))
+    finally:
+        db.close()
+    with metrics.stage("rerank"):
+        return rag_service.find_similar_events(query, candidates, top_k)
+
+
+def shared_generation():
+    """
+    The published shared index generation when running in shared-index mode,
+    else None. Imported lazily so numpy is only needed in that mode.
+    """
+    if not SHARED_INDEX_DIR:
+        return None
+    from app.services import shared_index
+    return shared_index.current()
+
+
+def find_similar(query: str, top_k: int = 3, generation=None) -> list[dict]:
+    """
+    Top `top_k` stored events most similar to `query`, as dicts with
+    'id', 'content' and 'similarity'. Pass `generation` to pin a shared
+    index generation for the whole analysis.
+    """
+    generation = generation or shared_generation()
+    with metrics.stage("retrieval_search"):
+        if generation is not None:
+            return _search_shared(generation, query, top_k)
+        if RETRIEVAL_CANDIDATES == "fts":
+            return _search_fts(query, top_k)
+        if RETRIEVAL_CANDIDATES == "vectors":
+            return _search_vectors(query, top_k)
+        return retrieval_index.search(query, top_k)
+
+
+def index_event(event_id: str, content: str):
+    """Write-path hook: make a stored event retrievable immediately."""
+    if SHARED_INDEX_DIR:
+        return
+    if RETRIEVAL_CANDIDATES == "vectors":
+        from app.services.embeddings import embedding_cache
+        from app.services.vector_index import event_vectors
+        # find_similar embedded this content moments ago, so no API call here
+        vector = embedding_cache.cached(content)
+        if vector is not None:
+            event_vectors.add(event_id, content, vector)
+    if RETRIEVAL_CANDIDATES != "fts":
+        retrieval_index.add(event_id, content)
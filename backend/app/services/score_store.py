@@ -0,0 +1,259 @@
+"""
+Append-only columnar store for event scores, partitioned by day.
+
+Enabled with SCORE_STORE_DIR. Every stored event appends one value to each
+column file of its day, next to the SQL rows, and range aggregations
+(count/mean/percentiles per source per day) run vectorized over the columns
+with numpy instead of through SQLAlchemy.
+
+Layout:
+    <SCORE_STORE_DIR>/<YYYY-MM-DD>/<segment>/
+        timestamp.f64      event time, seconds since the epoch
+        source.u16         index into sources.txt
+        sources.txt        source names of this segment, one per line
+        <column>.f32       one file per score / category column
+
+Each writing process appends to its own segment, named after its pid and
+start time, so columns stay aligned without cross-process locking. Readers
+trust only the shortest column of a segment, which hides a row that is half
+written; a writer that reopens a segment, or fails halfway through a row,
+first truncates every column to the complete rows.
+"""
+import os
+import shutil
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+SCORE_STORE_DIR = os.getenv("SCORE_STORE_DIR")
+
+SCORE_COLUMNS = (
+    "signal_strength", "historical_rarity", "trend_acceleration", "cross_source_presence", "uncertainty",
+)
+CATEGORY_COLUMNS = ("operational_risk", "compliance_risk", "reputational_risk", "financial_risk")
+COLUMNS = SCORE_COLUMNS + CATEGORY_COLUMNS
+
+# Bytes per row of each column file
+_WIDTHS = {"timestamp.f64": 8, "source.u16": 2, **{f"{c}.f32": 4 for c in COLUMNS}}
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Day segments a writer keeps open; live traffic only touches today's
+MAX_OPEN_SEGMENTS = 8
+
+
+def enabled() -> bool:
+    return bool(SCORE_STORE_DIR)
+
+
+def _utc(timestamp: datetime) -> datetime:
+    """Naive UTC; naive timestamps are taken to be UTC already."""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class _Segment:
+    """Open append handles for one (day, segment) directory."""
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        self.fds = {name: os.open(os.path.join(path, name), flags, 0o644) for name in _WIDTHS}
+        self.sources = _read_sources(path)
+        self._drop_torn_row()
+
+    def _drop_torn_row(self):
+        """Cut every column back to the rows all of them hold, so later appends stay aligned."""
+        rows = min(os.fstat(fd).st_size // _WIDTHS[name] for name, fd in self.fds.items())
+        for name, fd in self.fds.items():
+            if os.fstat(fd).st_size != rows * _WIDTHS[name]:
+                os.truncate(fd, rows * _WIDTHS[name])
+
+    def source_code(self, source: str) -> int:
+        code = self.sources.get(source)
+        if code is None:
+            code = self.sources[source] = len(self.sources)
+            # Written before any row uses the code
+            with open(os.path.join(self.path, "sources.txt"), "a") as f:
+                f.write(source.replace("\n", " ") + "\n")
+        return code
+
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+
+
+def _read_sources(path: str) -> dict:
+    try:
+        with open(os.path.join(path, "sources.txt")) as f:
+            return {line.rstrip("\n"): i for i, line in enumerate(f)}
+    except FileNotFoundError:
+        return {}
+
+
+class ScoreStore:
+    """Writer for one process; `append` is thread-safe."""
+
+    def __init__(self, directory: str, segment: str = None):
+        self.directory = directory
+        # A restarted process may get the same pid (always 1 in a container)
+        self.segment = segment or f"w{os.getpid()}-{int(time.time() * 1000)}"
+        self._segments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _segment_for(self, day: str) -> _Segment:
+        segment = self._segments.get(day)
+        if segment is None:
+            segment = self._segments[day] = _Segment(os.path.join(self.directory, day, self.segment))
+            while len(self._segments) > MAX_OPEN_SEGMENTS:
+                self._segments.popitem(last=False)[1].close()
+        else:
+            self._segments.move_to_end(day)
+        return segment
+
+    def append(self, timestamp: datetime, source: str, scores: dict, categories: dict):
+        values = {**scores, **categories}
+        timestamp = _utc(timestamp)
+        day = timestamp.strftime("%Y-%m-%d")
+        with self._lock:
+            segment = self._segment_for(day)
+            try:
+                os.write(segment.fds["timestamp.f64"], struct.pack("<d", (timestamp - _EPOCH).total_seconds()))
+                os.write(segment.fds["source.u16"], struct.pack("<H", segment.source_code(source)))
+                for column in COLUMNS:
+                    os.write(segment.fds[f"{column}.f32"], struct.pack("<f", float(values.get(column, 0.0))))
+            except BaseException:
+                self._abandon(day)
+                raise
+
+    def append_many(self, rows):
+        """Bulk append of (timestamp, source, values) rows; one write per column and day."""
+        by_day = {}
+        for timestamp, source, values in rows:
+            timestamp = _utc(timestamp)
+            by_day.setdefault(timestamp.strftime("%Y-%m-%d"), []).append((timestamp, source, values))
+        with self._lock:
+            for day, day_rows in by_day.items():
+                segment = self._segment_for(day)
+                n = len(day_rows)
+                try:
+                    codes = [segment.source_code(source) for _, source, _ in day_rows]
+                    os.write(segment.fds["timestamp.f64"], struct.pack(
+                        f"<{n}d", *((timestamp - _EPOCH).total_seconds() for timestamp, _, _ in day_rows)))
+                    os.write(segment.fds["source.u16"], struct.pack(f"<{n}H", *codes))
+                    for column in COLUMNS:
+                        os.write(segment.fds[f"{column}.f32"], struct.pack(
+                            f"<{n}f", *(float(values.get(column, 0.0)) for _, _, values in day_rows)))
+                except BaseException:
+                    self._abandon(day)
+                    raise
+
+    def _abandon(self, day: str):
+        """After a failed write: reopen the segment next time, which drops the partial row."""
+        segment = self._segments.pop(day, None)
+        if segment is not None:
+            segment.close()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def append(timestamp: datetime, source: str, scores: dict, categories: dict):
+    """Write-path hook; a no-op unless SCORE_STORE_DIR is set."""
+    global _store
+    if not SCORE_STORE_DIR:
+        return
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ScoreStore(SCORE_STORE_DIR)
+    try:
+        _store.append(timestamp, source, scores, categories)
+    except Exception as e:
+        # Best effort: the event is already stored in SQL
+        print(f"Error appending to score store: {e}")
+
+
+def _load_segment(path: str, columns: tuple):
+    """(values[rows, len(columns)], source codes[rows], source names) of one segment."""
+    import numpy as np
+    codes = np.fromfile(os.path.join(path, "source.u16"), dtype="<u2")
+    arrays = [np.fromfile(os.path.join(path, "timestamp.f64"), dtype="<f8")]
+    arrays += [np.fromfile(os.path.join(path, f"{column}.f32"), dtype="<f4") for column in columns]
+    rows = min(len(codes), *(len(a) for a in arrays))
+    names = list(_read_sources(path))
+    # A code without a name can only come from a torn write; stop before it
+    invalid = np.flatnonzero(codes[:rows] >= len(names))
+    if len(invalid):
+        rows = int(invalid[0])
+    values = np.empty((rows, len(columns)), dtype=np.float32)
+    for i, array in enumerate(arrays[1:]):
+        values[:, i] = array[:rows]
+    return values, codes[:rows], names
+
+
+def aggregate(start: date, end: date, sources: list = None, columns: tuple = COLUMNS,
+              percentiles: tuple = (50, 95), directory: str = None) -> list[dict]:
+    """
+    Per source per day statistics for days in [start, end]:
+    [{"day", "source", "count", "mean": {col: v}, "p50": {col: v}, ...}].
+    """
+    import numpy as np
+    directory = directory or SCORE_STORE_DIR
+    results = []
+    for offset in range((end - start).days + 1):
+        day = (start + timedelta(days=offset)).isoformat()
+        day_path = os.path.join(directory, day)
+        if not os.path.isdir(day_path):
+            continue
+
+        # Translate each segment's local source codes into one code space for the day
+        index, blocks, codes = {}, [], []
+        for segment in sorted(os.listdir(day_path)):
+            values, local_codes, local_names = _load_segment(os.path.join(day_path, segment), columns)
+            if not len(values):
+                continue
+            mapping = np.array([index.setdefault(n, len(index)) for n in local_names], dtype=np.int64)
+            blocks.append(values)
+            codes.append(mapping[local_codes])
+        if not blocks:
+            continue
+        names = list(index)
+        values = np.concatenate(blocks)
+        codes = np.concatenate(codes)
+
+        # Sort once by source, then aggregate each contiguous group over all columns at once
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(names))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        for code in np.argsort(names):
+            source = names[code]
+            if counts[code] == 0 or (sources and source not in sources):
+                continue
+            group = values[order[offsets[code]:offsets[code + 1]]]
+            entry = {"day": day, "source": source, "count": int(counts[code])}
+            entry["mean"] = dict(zip(columns, np.round(group.mean(axis=0, dtype=np.float64), 4).tolist()))
+            if percentiles:
+                stats = np.percentile(group, percentiles, axis=0)
+                for pct, row in zip(percentiles, stats):
+                    entry[f"p{pct}"] = dict(zip(columns, np.round(row.astype(np.float64), 4).tolist()))
+            results.append(entry)
+    return results
+
+
+def clear(directory: str):
+    """Remove every day partition under `directory`."""
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
@@ -1,25 +1,70 @@
 import os
-import yaml
+import hashlib
+from functools import lru_cache
+from app.services import tokenizer
 
-# Load anchors from YAML file
 _anchors_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "risk_anchors.yaml")
-with open(_anchors_path, "r") as f:
-    RISK_ANCHORS = yaml.safe_load(f)
 
+# Bump whenever calculate_semantics or the tokenizer changes which keywords
+# match, so analyses stored under the old matcher are rescored.
+# 1: substring matching; 2: token-start matching over tokenizer.tokens
+MATCHER_VERSION = 2
 
-def calculate_semantics(text: str) -> dict:
+
+def load_anchors() -> tuple[dict, str]:
+    """Read the anchor YAML; returns (anchors, version)."""
+    import yaml
+    with open(_anchors_path, "rb") as f:
+        raw = f.read()
+    # The version identifies the anchor set and matcher a stored analysis was computed with
+    digest = hashlib.sha1(raw)
+    digest.update(f"matcher:{MATCHER_VERSION}".encode())
+    return yaml.safe_load(raw), digest.hexdigest()[:12]
+
+
+@lru_cache(maxsize=1)
+def _default_anchors() -> tuple[dict, str]:
+    return load_anchors()
+
+
+def __getattr__(name: str):
+    # RISK_ANCHORS and ANCHOR_VERSION are loaded on first access, not at import
+    if name == "RISK_ANCHORS":
+        return _default_anchors()[0]
+    if name == "ANCHOR_VERSION":
+        return _default_anchors()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _compile(anchors: dict) -> list[tuple[str, list[tuple[str, str]]]]:
+    """[(category, [(keyword, " " + normalized keyword)])] for word-start matching."""
+    return [
+        (category, [(kw, " " + " ".join(tokenizer.tokens(kw))) for kw in keywords])
+        for category, keywords in anchors.items()
+    ]
+
+
+@lru_cache(maxsize=1)
+def _default_compiled() -> list:
+    return _compile(_default_anchors()[0])
+
+
+def calculate_semantics(text: str, anchors: dict = None) -> dict:
     """
-    Calculate semantic risk scores based on keyword anchors.
+    Calculate semantic risk scores based on keyword anchors
+    (RISK_ANCHORS unless another anchor set is given).
+    A keyword matches where its tokens start a run of the text's tokens, so
+    "outage" matches "Outages," but "loss" no longer matches "glossary".
     Returns a dict with:
       - category_scores: scores normalized to 0-1 for each category
       - matched_keywords: dict of category -> list of matched keywords
     """
-    text_lower = text.lower()
+    padded = " " + " ".join(tokenizer.tokens(text))
     category_scores = {}
     matched_keywords = {}
 
-    for category, keywords in RISK_ANCHORS.items():
-        matches = [kw for kw in keywords if kw in text_lower]
+    for category, keywords in (_compile(anchors) if anchors else _default_compiled()):
+        matches = [kw for kw, phrase in keywords if phrase in padded]
         total = len(keywords)
         score = len(matches) / total if total > 0 else 0.0
         category_scores[category] = round(score, 4)
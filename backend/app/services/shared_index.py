@@ -0,0 +1,251 @@
+"""
+Shared, memory-mapped similarity index for multi-worker deployments.
+
+One builder process (`python -m app.jobs.build_index`) owns the TF-IDF index
+and the risk anchor set and publishes them as numbered generations of flat
+binary files under SHARED_INDEX_DIR. Every API worker maps the current
+generation read-only, so the pages are shared through the OS page cache
+instead of being rebuilt and held once per worker. A generation is switched
+in only after it is fully written, and a query keeps using the generation it
+started with.
+
+Generation layout (gen-<N>/):
+    meta.json           generation, counts, anchor version and anchors
+    terms.bin           sorted UTF-8 terms, concatenated
+    term_offsets.bin    uint64[n_terms + 1] offsets into terms.bin
+    idf.bin             float32[n_terms]
+    post_offsets.bin    uint64[n_terms + 1] offsets into the postings
+    post_docs.bin       uint32[n_postings] document index per posting
+    post_weights.bin    float32[n_postings] L2-normalized tf-idf weight
+    doc_ids.bin         event ids, concatenated
+    doc_id_offsets.bin  uint64[n_docs + 1] offsets into doc_ids.bin
+"""
+import os
+import json
+import math
+import mmap
+import shutil
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from app.services import tokenizer
+
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR")
+SHARED_INDEX_REFRESH = float(os.getenv("SHARED_INDEX_REFRESH", "1.0"))
+KEEP_GENERATIONS = 2
+
+
+class Generation:
+    """One published, read-only generation of the index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.generation = self.meta["generation"]
+        self.anchors = self.meta["anchors"]
+        self.anchor_version = self.meta["anchor_version"]
+        self.n_docs = self.meta["n_docs"]
+
+        self._maps = []
+        self.terms = self._map("terms.bin", np.uint8)
+        self.term_offsets = self._map("term_offsets.bin", np.uint64)
+        self.idf = self._map("idf.bin", np.float32)
+        self.post_offsets = self._map("post_offsets.bin", np.uint64)
+        self.post_docs = self._map("post_docs.bin", np.uint32)
+        self.post_weights = self._map("post_weights.bin", np.float32)
+        self.doc_ids = self._map("doc_ids.bin", np.uint8)
+        self.doc_id_offsets = self._map("doc_id_offsets.bin", np.uint64)
+
+    def _map(self, name: str, dtype):
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return np.frombuffer(mapped, dtype=dtype)
+
+    def _term(self, i: int) -> bytes:
+        return self.terms[int(self.term_offsets[i]):int(self.term_offsets[i + 1])].tobytes()
+
+    def term_id(self, term: str) -> int:
+        """Binary search the sorted term table; -1 if the term is unknown."""
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.idf)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.idf) and self._term(lo) == key else -1
+
+    def doc_id(self, i: int) -> str:
+        return self.doc_ids[int(self.doc_id_offsets[i]):int(self.doc_id_offsets[i + 1])].tobytes().decode("utf-8")
+
+    def search(self, text: str, top_k: int = 3) -> list[tuple[str, float]]:
+        """Cosine similarity of `text` against every indexed event: [(event_id, score)]."""
+        weights = {}
+        for term, tf in Counter(tokenizer.tokens(text)).items():
+            tid = self.term_id(term)
+            if tid >= 0:
+                weights[tid] = tf * float(self.idf[tid])
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not weights or norm == 0:
+            return []
+
+        # Only the postings of the query's terms are touched
+        docs, values = [], []
+        for tid, weight in weights.items():
+            start, end = int(self.post_offsets[tid]), int(self.post_offsets[tid + 1])
+            docs.append(self.post_docs[start:end])
+            values.append(self.post_weights[start:end] * (weight / norm))
+        docs = np.concatenate(docs)
+        values = np.concatenate(values)
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=values)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_id(int(unique_docs[i])), round(float(scores[i]), 4)) for i in top]
+
+
+class SharedIndexReader:
+    """
+    Per-worker handle on the published index. `current()` is cheap: it only
+    re-reads the CURRENT pointer every SHARED_INDEX_REFRESH seconds.
+    """
+
+    def __init__(self, directory: str, refresh: float = SHARED_INDEX_REFRESH):
+        self.directory = directory
+        self.refresh = refresh
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Generation:
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh:
+            return self._generation
+        with self._lock:
+            if now - self._checked_at >= self.refresh:
+                self._checked_at = now
+                number = read_current(self.directory)
+                if number is not None and (self._generation is None or self._generation.generation != number):
+                    try:
+                        # Swapping the reference is atomic; in-flight queries keep the old generation
+                        self._generation = Generation(_generation_path(self.directory, number))
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading shared index generation {number}: {e}")
+        return self._generation
+
+
+def _generation_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"gen-{number:08d}")
+
+
+def read_current(directory: str):
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def build_generation(directory: str, documents, anchors: dict, anchor_version: str) -> int:
+    """
+    Build and publish a new generation from an iterable of (event_id, content).
+    Returns the generation number.
+    """
+    os.makedirs(directory, exist_ok=True)
+    number = (read_current(directory) or 0) + 1
+    tmp_path = _generation_path(directory, number) + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    doc_ids = []
+    doc_terms = []
+    df = Counter()
+    for event_id, content in documents:
+        tf = Counter(tokenizer.tokens(content))
+        doc_ids.append(event_id)
+        doc_terms.append(tf)
+        df.update(tf.keys())
+
+    terms = sorted(df)
+    term_index = {term: i for i, term in enumerate(terms)}
+    n_docs = len(doc_ids)
+    # Smoothed IDF keeps weights positive even for terms present in every document
+    idf = np.array([math.log((1 + n_docs) / (1 + df[t])) + 1.0 for t in terms], dtype=np.float32)
+
+    postings = [[] for _ in terms]
+    for doc_index, tf in enumerate(doc_terms):
+        weights = {term_index[t]: count * float(idf[term_index[t]]) for t, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for tid, weight in weights.items():
+            postings[tid].append((doc_index, weight / norm))
+    doc_terms = None
+
+    post_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    post_offsets[1:] = np.cumsum([len(p) for p in postings]) if terms else []
+    post_docs = np.fromiter((d for p in postings for d, _ in p), dtype=np.uint32)
+    post_weights = np.fromiter((w for p in postings for _, w in p), dtype=np.float32)
+
+    def write_strings(blob_name: str, offsets_name: str, values: list[str]):
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded]) if encoded else []
+        with open(os.path.join(tmp_path, blob_name), "wb") as f:
+            f.write(b"".join(encoded))
+        offsets.tofile(os.path.join(tmp_path, offsets_name))
+
+    write_strings("terms.bin", "term_offsets.bin", terms)
+    write_strings("doc_ids.bin", "doc_id_offsets.bin", doc_ids)
+    idf.tofile(os.path.join(tmp_path, "idf.bin"))
+    post_offsets.tofile(os.path.join(tmp_path, "post_offsets.bin"))
+    post_docs.tofile(os.path.join(tmp_path, "post_docs.bin"))
+    post_weights.tofile(os.path.join(tmp_path, "post_weights.bin"))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "generation": number,
+            "created_at": datetime.utcnow().isoformat(),
+            "n_docs": n_docs,
+            "n_terms": len(terms),
+            "n_postings": int(post_offsets[-1]) if terms else 0,
+            "anchor_version": anchor_version,
+            "anchors": anchors,
+        }, f)
+
+    # Publish: the directory rename and the CURRENT swap are both atomic
+    os.rename(tmp_path, _generation_path(directory, number))
+    pointer = os.path.join(directory, "CURRENT.tmp")
+    with open(pointer, "w") as f:
+        f.write(str(number))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+
+    # Workers may still map older generations; unlinking mapped files is safe on POSIX
+    for old in range(number - KEEP_GENERATIONS, 0, -1):
+        path = _generation_path(directory, old)
+        if not os.path.exists(path):
+            break
+        shutil.rmtree(path, ignore_errors=True)
+    return number
+
+
+_reader = None
+
+
+def current() -> Generation:
+    """The current generation for this worker, or None if nothing is published yet."""
+    global _reader
+    if _reader is None:
+        _reader = SharedIndexReader(SHARED_INDEX_DIR)
+    return _reader.current()
@@ -0,0 +1,76 @@
+"""
+The one tokenizer behind similarity search, keyword semantics and alert
+fingerprints.
+
+Text is NFKC-normalized and case-folded, and tokens are runs of word
+characters, so "Outage," and "outage" are the same token and full-width or
+accented variants fold together. `encode()` maps tokens to integer ids from
+an index's vocabulary and returns a compact `array('I')`, so indexes hold and
+compare integers instead of one string object per token occurrence.
+Throwaway text (queries, one-off comparisons) uses `tokens()` or
+`encode(add=False)`, so only indexed documents get ids.
+"""
+import re
+import threading
+import unicodedata
+from array import array
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    if text.isascii():
+        # NFKC leaves ASCII unchanged and casefold() equals lower() on it
+        return text.lower()
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokens(text: str) -> list[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+class Vocabulary:
+    """
+    Token <-> id mapping owned by one index; `ids()` assigns new ids, `get()`
+    never does. Ids are never reused, so an index rebuilds its vocabulary
+    when evictions have left too many ids unused.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def get(self, term: str, default: int = -1) -> int:
+        return self._ids.get(term, default)
+
+    def term(self, token_id: int) -> str:
+        return self._terms[token_id]
+
+    def ids(self, terms: list) -> list:
+        """Ids for `terms`, assigning new ones as needed."""
+        ids = self._ids
+        missing = [t for t in terms if t not in ids]
+        if missing:
+            with self._lock:
+                for term in missing:
+                    if term not in ids:
+                        ids[term] = len(self._terms)
+                        self._terms.append(term)
+        return [ids[t] for t in terms]
+
+
+def encode(text: str, vocabulary: Vocabulary, add: bool = True) -> array:
+    """
+    Token ids of `text` in `vocabulary` as array('I'). With add=False unknown
+    tokens are dropped instead of growing the vocabulary (for queries: a
+    token no document has can't match anything).
+    """
+    terms = tokens(text)
+    if add:
+        return array("I", vocabulary.ids(terms))
+    get = vocabulary.get
+    return array("I", [i for i in map(get, terms) if i >= 0])
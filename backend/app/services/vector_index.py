@@ -0,0 +1,353 @@
+"""
+Compact in-memory index over event embeddings.
+
+Full float32 embeddings from text-embedding-3-small take 6 KB each, so the
+index keeps a compressed code per vector and re-scores only its best
+candidates exactly:
+
+    none    float32 vectors, the exact reference
+    int8    symmetric scalar quantization, one float32 scale per vector
+            (dims + 4 bytes)
+    pq      product quantization: VECTOR_PQ_SUBSPACES uint8 codes per
+            vector against 256 trained centroids per subspace. Until
+            VECTOR_PQ_MIN_TRAIN vectors are there to train on, vectors are
+            kept as float32 and the codebooks are trained once enough arrive
+
+VECTOR_INDEX_DIMS optionally truncates vectors to their leading dimensions
+first (text-embedding-3 vectors stay usable when shortened). A search scores
+every code, keeps k * VECTOR_RESCORE_FACTOR candidates and ranks those by
+exact cosine on the full float vectors, which the caller fetches from
+wherever they live (the embeddings table for events).
+
+Used with RETRIEVAL_CANDIDATES=vectors; numpy is only imported in that mode.
+"""
+import os
+import threading
+
+import numpy as np
+
+VECTOR_INDEX_QUANTIZATION = os.getenv("VECTOR_INDEX_QUANTIZATION", "int8")
+VECTOR_INDEX_DIMS = int(os.getenv("VECTOR_INDEX_DIMS", "0"))
+VECTOR_PQ_SUBSPACES = int(os.getenv("VECTOR_PQ_SUBSPACES", "96"))
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "10"))
+VECTOR_PQ_MIN_TRAIN = int(os.getenv("VECTOR_PQ_MIN_TRAIN", "1024"))
+
+# Codes are scored in blocks so temporaries stay small at millions of vectors
+SCORE_BLOCK = 65536
+# Embeddings read from the table per block when the index is built
+BUILD_BLOCK = 4096
+PQ_CENTROIDS = 256
+PQ_TRAIN_SAMPLE = 20000
+PQ_ITERATIONS = 10
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _kmeans(points, k: int, iterations: int, rng):
+    """Plain Lloyd's k-means; returns float32[k, dim] centroids."""
+    centroids = points[rng.choice(len(points), size=k, replace=len(points) < k)].copy()
+    for _ in range(iterations):
+        # argmin ||p - c||^2 = argmax (p.c - |c|^2 / 2)
+        assign = np.argmax(points @ centroids.T - 0.5 * (centroids * centroids).sum(axis=1), axis=1)
+        # Per-centroid sums as one matrix product with the one-hot assignment
+        onehot = np.zeros((len(points), k), dtype=np.float32)
+        onehot[np.arange(len(points)), assign] = 1.0
+        counts = onehot.sum(axis=0)
+        filled = counts > 0
+        centroids[filled] = (onehot.T @ points)[filled] / counts[filled, None]
+    return centroids
+
+
+class VectorIndex:
+    """
+    Quantized vectors addressed by position. `fetch(positions)` must return
+    the full float vectors at those positions for exact re-scoring.
+    """
+
+    def __init__(self, quantization: str = VECTOR_INDEX_QUANTIZATION, dims: int = VECTOR_INDEX_DIMS,
+                 pq_subspaces: int = VECTOR_PQ_SUBSPACES, rescore_factor: int = VECTOR_RESCORE_FACTOR,
+                 pq_min_train: int = VECTOR_PQ_MIN_TRAIN):
+        if quantization not in ("none", "int8", "pq"):
+            raise ValueError(f"Unknown quantization {quantization!r}")
+        self.quantization = quantization
+        self.dims = dims
+        self.pq_subspaces = pq_subspaces
+        self.rescore_factor = rescore_factor
+        self.pq_min_train = max(pq_min_train, PQ_CENTROIDS)
+        self.codebooks = None
+        self.size = 0
+        self._codes = None
+        self._scales = None
+
+    def _prepare(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dims:
+            vectors = vectors[..., :self.dims]
+        return _normalize(vectors)
+
+    @property
+    def _buffering(self) -> bool:
+        """PQ without codebooks yet: vectors are stored as float32."""
+        return self.quantization == "pq" and self.codebooks is None
+
+    def _encode(self, vectors):
+        if self.quantization == "none" or self._buffering:
+            return vectors, None
+        if self.quantization == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        m, sub = self.codebooks.shape[0], self.codebooks.shape[2]
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            part = vectors[:, j * sub:(j + 1) * sub]
+            centroids = self.codebooks[j]
+            codes[:, j] = np.argmax(part @ centroids.T - 0.5 * (centroids * centroids).sum(axis=1), axis=1)
+        return codes, None
+
+    def _train(self, vectors, seed: int = 0):
+        dim = vectors.shape[1]
+        if dim % self.pq_subspaces:
+            raise ValueError(f"{dim} dimensions do not split into {self.pq_subspaces} subspaces")
+        sub = dim // self.pq_subspaces
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), PQ_TRAIN_SAMPLE), replace=False)]
+        self.codebooks = np.stack([
+            _kmeans(sample[:, j * sub:(j + 1) * sub], PQ_CENTROIDS, PQ_ITERATIONS, rng)
+            for j in range(self.pq_subspaces)
+        ]).astype(np.float32)
+
+    def build(self, vectors):
+        """
+        Replace the contents with `vectors` (float[n, dim]); trains the PQ
+        codebooks once there are at least `pq_min_train` vectors.
+        """
+        self.build_blocks([vectors], len(vectors), sample=vectors)
+
+    def build_blocks(self, blocks, capacity: int, sample=None):
+        """
+        Replace the contents with an iterable of float[n, dim] blocks holding
+        at most `capacity` vectors, encoding each block into pre-sized code
+        arrays so the float vectors are never all in memory at once. PQ trains
+        on `sample` (e.g. PQ_TRAIN_SAMPLE random vectors) when it holds at
+        least `pq_min_train` of them.
+        """
+        self.codebooks = None
+        self._codes = self._scales = None
+        self.size = 0
+        if self.quantization == "pq" and sample is not None and len(sample) >= self.pq_min_train:
+            self._train(self._prepare(sample))
+        for block in blocks:
+            codes, scales = self._encode(self._prepare(block))
+            if self._codes is None:
+                self._codes = np.empty((max(capacity, len(codes)),) + codes.shape[1:], dtype=codes.dtype)
+                if scales is not None:
+                    self._scales = np.empty(len(self._codes), dtype=np.float32)
+            self._codes[self.size:self.size + len(codes)] = codes
+            if scales is not None:
+                self._scales[self.size:self.size + len(codes)] = scales
+            self.size += len(codes)
+
+    def add(self, vectors):
+        """
+        Append vectors after the current last position. PQ reuses the trained
+        codebooks, or trains them when the buffered vectors reach `pq_min_train`.
+        """
+        vectors = self._prepare(np.atleast_2d(vectors))
+        if self._codes is None:
+            return self.build(vectors)
+        codes, scales = self._encode(vectors)
+        # Amortized growth: reallocate to twice the size when full
+        if self.size + len(codes) > len(self._codes):
+            capacity = max(2 * len(self._codes), self.size + len(codes))
+            grown = np.empty((capacity,) + self._codes.shape[1:], dtype=self._codes.dtype)
+            grown[:self.size] = self._codes[:self.size]
+            self._codes = grown
+            if self._scales is not None:
+                grown_scales = np.empty(capacity, dtype=np.float32)
+                grown_scales[:self.size] = self._scales[:self.size]
+                self._scales = grown_scales
+        self._codes[self.size:self.size + len(codes)] = codes
+        if scales is not None:
+            self._scales[self.size:self.size + len(codes)] = scales
+        self.size += len(codes)
+        if self._buffering and self.size >= self.pq_min_train:
+            self.build(self._codes[:self.size])
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held per stored vector times the count, plus codebooks."""
+        if self._codes is None:
+            return 0
+        per_vector = self._codes[:1].nbytes + (4 if self._scales is not None else 0)
+        return per_vector * self.size + (self.codebooks.nbytes if self.codebooks is not None else 0)
+
+    def approximate(self, query):
+        """Approximate cosine similarity of `query` to every stored vector."""
+        query = self._prepare(query)
+        scores = np.empty(self.size, dtype=np.float32)
+        pq = self.quantization == "pq" and not self._buffering
+        if pq:
+            m, sub = self.codebooks.shape[0], self.codebooks.shape[2]
+            table = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(m, sub))
+            rows = np.arange(m)
+        for start in range(0, self.size, SCORE_BLOCK):
+            block = self._codes[start:min(start + SCORE_BLOCK, self.size)]
+            if pq:
+                scores[start:start + len(block)] = table[rows, block].sum(axis=1)
+            else:
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+                if self._scales is not None:
+                    scores[start:start + len(block)] *= self._scales[start:start + len(block)]
+        return scores
+
+    def search(self, query, k: int, fetch=None) -> list[tuple[int, float]]:
+        """
+        Top `k` (position, similarity). With `fetch`, the best
+        k * rescore_factor approximate candidates are re-ranked exactly.
+        """
+        if not self.size:
+            return []
+        if fetch is not None:
+            candidates = self.candidates(query, k * self.rescore_factor)
+            return [(candidates[i], similarity) for i, similarity in rerank(fetch(candidates), query, k)]
+        scores = self.approximate(query)
+        n = min(self.size, k)
+        candidates = np.argpartition(-scores, n - 1)[:n]
+        order = np.argsort(-scores[candidates], kind="stable")[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+    def candidates(self, query, n: int) -> list[int]:
+        """Positions of the `n` best approximate matches, unordered."""
+        if not self.size:
+            return []
+        scores = self.approximate(query)
+        n = min(self.size, n)
+        return np.argpartition(-scores, n - 1)[:n].tolist()
+
+
+def rerank(vectors, query, k: int) -> list[tuple[int, float]]:
+    """Top `k` (index into `vectors`, exact cosine similarity to `query`)."""
+    if not len(vectors):
+        return []
+    exact = _normalize(np.asarray(vectors, dtype=np.float32)) @ _normalize(np.asarray(query, dtype=np.float32))
+    order = np.argsort(-exact, kind="stable")[:k]
+    return [(int(i), float(exact[i])) for i in order]
+
+
+class EventVectors:
+    """
+    The vector index over stored events, one entry per distinct body. Built
+    from the embeddings table on first use and kept current by the write path
+    with vectors the pipeline already embedded.
+    """
+
+    def __init__(self):
+        self.index = VectorIndex()
+        self.hashes = []
+        self.event_ids = []
+        self._positions = {}
+        self._lock = threading.RLock()
+        self._built = False
+        self._building = False
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            # add() waits on the lock from here on instead of dropping events
+            self._building = True
+            from sqlalchemy import text
+            from app.db.bodies import content_hash
+            from app.db.session import engine
+            from app.services.embeddings import embedding_cache
+
+            model = {"model": embedding_cache.model}
+            try:
+                with engine.connect() as conn:
+                    # Latest event per distinct body. Deduplicated bodies carry their
+                    # hash; only short inline bodies are hashed here, none is inflated
+                    latest = {}
+                    for event_id, digest, content in conn.execute(
+                        text("SELECT id, content_hash, content FROM events ORDER BY rowid")
+                    ):
+                        latest[digest or content_hash(content or "")] = event_id
+                    capacity = conn.execute(text("SELECT COUNT(*) FROM embeddings WHERE model = :model"), model).scalar()
+                    sample = None
+                    if self.index.quantization == "pq" and capacity >= self.index.pq_min_train:
+                        sample = np.stack([np.frombuffer(data, dtype=np.float32) for (data,) in conn.execute(
+                            text("SELECT vector FROM embeddings WHERE model = :model ORDER BY random() LIMIT :limit"),
+                            {**model, "limit": PQ_TRAIN_SAMPLE},
+                        )])
+                    rows = conn.execute(text("SELECT hash, vector FROM embeddings WHERE model = :model"), model)
+                    self.index.build_blocks(self._blocks(rows, latest), capacity, sample)
+            except BaseException:
+                # Positions were recorded per block; start over on the next call
+                self.hashes, self.event_ids, self._positions = [], [], {}
+                self._building = False
+                raise
+            self._built = True
+            self._building = False
+
+    def _blocks(self, rows, latest: dict):
+        """float32[n, dim] blocks of the embedded bodies that have an event, recording their positions."""
+        while True:
+            batch = rows.fetchmany(BUILD_BLOCK)
+            if not batch:
+                return
+            vectors = []
+            for digest, data in batch:
+                if digest in latest:
+                    self._positions[digest] = len(self.hashes)
+                    self.hashes.append(digest)
+                    self.event_ids.append(latest[digest])
+                    vectors.append(np.frombuffer(data, dtype=np.float32))
+            if vectors:
+                yield np.stack(vectors)
+
+    def add(self, event_id: str, content: str, vector):
+        from app.db.bodies import content_hash
+        if not self._built and not self._building:
+            return
+        digest = content_hash(content)
+        with self._lock:
+            if not self._built:
+                return
+            position = self._positions.get(digest)
+            if position is not None:
+                self.event_ids[position] = event_id
+                return
+            self._positions[digest] = len(self.hashes)
+            self.hashes.append(digest)
+            self.event_ids.append(event_id)
+            self.index.add(np.asarray(vector, dtype=np.float32))
+
+    @staticmethod
+    def _fetch(hashes: list):
+        from app.services.embeddings import embedding_cache
+        found = embedding_cache.lookup(hashes)
+        dim = len(next(iter(found.values()))) if found else 0
+        return [found[h] if h in found else np.zeros(dim, dtype=np.float32) for h in hashes]
+
+    def search(self, query_vector, k: int) -> list[tuple[str, float]]:
+        """Top `k` (event_id, cosine similarity)."""
+        self.ensure_built()
+        with self._lock:
+            positions = self.index.candidates(query_vector, k * self.index.rescore_factor)
+            candidates = [(self.hashes[p], self.event_ids[p]) for p in positions]
+        # The full vectors come from the database; fetched without holding the lock
+        hits = rerank(self._fetch([digest for digest, _ in candidates]), query_vector, k)
+        return [(candidates[i][1], round(similarity, 4)) for i, similarity in hits]
+
+    def warm_async(self):
+        threading.Thread(target=self.ensure_built, name="vector-index-warmup", daemon=True).start()
+
+
+event_vectors = EventVectors()
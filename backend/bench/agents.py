@@ -0,0 +1,118 @@
+"""
+Benchmark agent analyses: LLM round-trips and latency per analysis.
+
+Runs each analysis mode against the stub OpenAI server and reads the stub's
+request counter to report how many chat completions one analysis costs:
+
+    runtime             agent_runtime.analyze (fixed plan, one LLM call)
+    langchain           warm RiskAnalysisAgent.analyze (fixed plan, one LLM call)
+    langchain_autonomous  warm RiskAnalysisAgent.analyze_autonomous (LLM picks tools)
+    langchain_cold      a new RiskAnalysisAgent per analysis, autonomous (the old usage)
+
+The langchain modes are skipped when LangChain is not installed.
+
+    python -m bench.agents --analyses 50 --openai-latency-ms 100
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from bench.load import DATA_DIR, RESULTS_DIR, summarize, _git_commit
+from bench.seed import seed
+from stub_openai import StubOpenAIServer
+
+EVENT_TEXTS = [
+    "Production outage in the payments cluster, customers report failed transactions.",
+    "Regulator requested documents after a suspected GDPR violation in the EU region.",
+    "Negative press coverage after leaked internal memo about layoffs.",
+    "Quarterly revenue forecast revised down due to currency losses.",
+]
+
+
+def run_mode(analyze, stub: StubOpenAIServer, analyses: int) -> dict:
+    chat_before = stub.requests["/v1/chat/completions"]
+    embed_before = stub.requests["/v1/embeddings"]
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(analyses):
+        t0 = time.perf_counter()
+        try:
+            analyze(EVENT_TEXTS[i % len(EVENT_TEXTS)])
+            latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            print(f"  analysis failed: {e}")
+            errors += 1
+    result = summarize(latencies, errors, time.perf_counter() - started)
+    result["llm_round_trips_per_analysis"] = round((stub.requests["/v1/chat/completions"] - chat_before) / analyses, 2)
+    result["embedding_requests_per_analysis"] = round((stub.requests["/v1/embeddings"] - embed_before) / analyses, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM round-trips per agent analysis")
+    parser.add_argument("--events", type=int, default=10000, help="Seeded DB size used for retrieval")
+    parser.add_argument("--analyses", type=int, default=50, help="Analyses per mode")
+    parser.add_argument("--openai-latency-ms", type=float, default=100.0)
+    parser.add_argument("--label", default="", help="Name for the results file")
+    args = parser.parse_args()
+
+    db_path = os.path.join(DATA_DIR, f"events-{args.events}.db")
+    if not os.path.exists(db_path):
+        seed(db_path, args.events)
+    run_db = os.path.join(DATA_DIR, f"agents-{os.getpid()}.db")
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(run_db)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+    stub = StubOpenAIServer(latency_ms=args.openai_latency_ms).start()
+    # App modules read these at import time
+    os.environ.update(DATABASE_URL=f"sqlite:///{run_db}", OPENAI_BASE_URL=stub.url, OPENAI_API_KEY="stub")
+    from app.agents.runtime import agent_runtime
+
+    modes = {"runtime": agent_runtime.analyze}
+    try:
+        from app.agents.langchain_agent import RiskAnalysisAgent
+        warm = agent_runtime.get("langchain")
+        modes["langchain"] = warm.analyze
+        modes["langchain_autonomous"] = warm.analyze_autonomous
+        modes["langchain_cold"] = lambda text: RiskAnalysisAgent().analyze_autonomous(text)
+    except ImportError as e:
+        print(f"LangChain modes skipped ({e})")
+
+    results = {}
+    try:
+        for name, analyze in modes.items():
+            results[name] = r = run_mode(analyze, stub, args.analyses)
+            print(f"{name:22s} {r['llm_round_trips_per_analysis']:5.2f} LLM calls/analysis  "
+                  f"p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  errors {r['errors']}")
+    finally:
+        stub.stop()
+        os.remove(run_db)
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "events": args.events,
+            "analyses_per_mode": args.analyses,
+            "openai_latency_ms": args.openai_latency_ms,
+            "git_commit": _git_commit(),
+        },
+        "agents": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.label or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"agents-{name}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
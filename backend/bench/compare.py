@@ -0,0 +1,59 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+    python -m bench.compare bench/results/baseline-10000.json bench/results/new-10000.json --threshold 10
+
+Exits with status 1 if any endpoint or stage got slower (p95) or lost
+throughput by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+
+
+def _delta(old: float, new: float) -> float:
+    return (new - old) / old * 100.0 if old else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print a side-by-side table and return the regressions found."""
+    regressions = []
+    for section in ("endpoints", "stages"):
+        print(f"\n{section}:")
+        print(f"  {'name':26s} {'p95 old':>10s} {'p95 new':>10s} {'Δp95':>8s} {'rps old':>10s} {'rps new':>10s} {'Δrps':>8s}")
+        for name, new in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if not old:
+                print(f"  {name:26s} (new)")
+                continue
+            d_p95 = _delta(old["p95_ms"], new["p95_ms"])
+            d_rps = _delta(old["throughput_rps"], new["throughput_rps"])
+            print(f"  {name:26s} {old['p95_ms']:10.2f} {new['p95_ms']:10.2f} {d_p95:+7.1f}% "
+                  f"{old['throughput_rps']:10.1f} {new['throughput_rps']:10.1f} {d_rps:+7.1f}%")
+            if d_p95 > threshold:
+                regressions.append(f"{section}/{name}: p95 +{d_p95:.1f}%")
+            # Stage throughput is derived from summed stage time, so only endpoints are checked
+            if section == "endpoints" and d_rps < -threshold:
+                regressions.append(f"{section}/{name}: throughput {d_rps:.1f}%")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\nNo regressions above threshold.")
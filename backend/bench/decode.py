@@ -0,0 +1,110 @@
+"""
+Per-message decode cost of the ingestion webhooks.
+
+Compares, for each adapter, the work done before the pipeline runs:
+
+    generic   json.loads, Dict[str, Any] validation (what FastAPI does for a
+              `payload: Dict[str, Any]` parameter), adapter.transform() into
+              IngestedEvent, then a validated Event
+    fast      adapter.decode() on the raw body (orjson when installed) into a
+              slotted Message, then Event.model_construct()
+
+    python -m bench.decode --messages 100000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from pydantic import TypeAdapter
+
+from bench.load import RESULTS_DIR, _git_commit
+from app.api.adapters import EmailAdapter, TelegramAdapter, WhatsAppAdapter, _loads, to_event
+from app.models.event import Event, EventStatus
+
+TEXT = "Payment gateway outage reported by 42 merchants, checkout downtime ongoing since 09:12 UTC."
+
+PAYLOADS = {
+    "telegram": (TelegramAdapter(), {
+        "update_id": 901233, "message": {
+            "message_id": 4411, "date": 1700000000, "text": TEXT,
+            "from": {"id": 123456, "is_bot": False, "first_name": "Ops", "username": "ops_oncall", "language_code": "en"},
+            "chat": {"id": -100200300, "title": "Incidents", "type": "supergroup"},
+            "entities": [{"offset": 0, "length": 7, "type": "bold"}],
+        },
+    }),
+    "email": (EmailAdapter(), {
+        "from": "alerts@example.com", "to": ["risk@example.com"], "subject": "Gateway outage", "body": TEXT,
+        "date": "2024-02-08T12:00:00", "headers": {"Message-ID": "<abc@example.com>", "X-Priority": "1"},
+    }),
+    "whatsapp": (WhatsAppAdapter(), {
+        "sender_number": "+15550100", "message_text": TEXT, "message_id": "wamid.HBgL", "profile": {"name": "Ops"},
+    }),
+}
+
+_DICT = TypeAdapter(Dict[str, Any])
+
+
+def generic_path(adapter, body: bytes) -> Event:
+    ingested = adapter.transform(_DICT.validate_python(json.loads(body)))
+    return Event(content=ingested.content, source=ingested.source, timestamp=ingested.timestamp,
+                 status=EventStatus.NEW)
+
+
+def fast_path(adapter, body: bytes) -> Event:
+    return to_event(adapter.decode(body))
+
+
+def measure(fn, adapter, body: bytes, messages: int) -> float:
+    """Microseconds per message."""
+    for _ in range(min(1000, messages)):
+        fn(adapter, body)
+    started = time.perf_counter()
+    for _ in range(messages):
+        fn(adapter, body)
+    return (time.perf_counter() - started) / messages * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion payload decoding")
+    parser.add_argument("--messages", type=int, default=100000, help="Messages decoded per adapter and path")
+    parser.add_argument("--label", default="", help="Name for the results file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (adapter, payload) in PAYLOADS.items():
+        body = json.dumps(payload).encode()
+        generic = measure(generic_path, adapter, body, args.messages)
+        fast = measure(fast_path, adapter, body, args.messages)
+        results[name] = {
+            "body_bytes": len(body),
+            "generic_us": round(generic, 2),
+            "fast_us": round(fast, 2),
+            "speedup": round(generic / fast, 2),
+            "fast_msgs_per_core_s": round(1e6 / fast),
+        }
+        print(f"{name:9s} generic {generic:7.2f}us  fast {fast:7.2f}us  x{generic / fast:4.1f}  "
+              f"{1e6 / fast:,.0f} msgs/s per core")
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "messages": args.messages,
+            "json_decoder": _loads.__module__,
+            "git_commit": _git_commit(),
+        },
+        "decode": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.label or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"decode-{name}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
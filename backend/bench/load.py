@@ -0,0 +1,309 @@
+"""
+Load-test the API against a local server with stubbed OpenAI and Discord.
+
+Starts the stub servers and a uvicorn instance on a seeded database, drives
+each endpoint at the given concurrency, times each pipeline stage in-process,
+and writes a JSON report to bench/results/ for later comparison with
+`python -m bench.compare`.
+
+    python -m bench.load --events 10000 --concurrency 16 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+from bench.seed import seed, TEMPLATES
+from stub_openai import StubOpenAIServer
+from stub_webhook import StubWebhookServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench", "results")
+DATA_DIR = os.path.join(BACKEND_DIR, "bench", "data")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    """Latency summary in milliseconds plus throughput."""
+    ms = [s * 1000.0 for s in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _sample_ids(db_path: str, count: int) -> list[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT id FROM events ORDER BY RANDOM() LIMIT ?", (count,)).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def _requests(rng: random.Random, event_ids: list[str]) -> dict:
+    """Request factories per benchmarked endpoint: name -> () -> (method, path, json)."""
+    now = lambda: datetime.utcnow().isoformat()
+    text = lambda: rng.choice(TEMPLATES).format(n=rng.randint(1, 500))
+    return {
+        "POST /ingest/message": lambda: ("POST", "/ingest/message", {
+            "source": "bench", "sender": "bench", "content": text(), "timestamp": now()}),
+        "POST /ingest/telegram": lambda: ("POST", "/ingest/telegram", {
+            "message": {"from": {"id": 1}, "text": text(), "date": int(time.time())}}),
+        "POST /ingest/email": lambda: ("POST", "/ingest/email", {
+            "from": "bench@example.com", "body": text(), "date": now()}),
+        "POST /ingest/whatsapp": lambda: ("POST", "/ingest/whatsapp", {
+            "sender_number": "123", "message_text": text()}),
+        "POST /events": lambda: ("POST", "/events", {"content": text(), "source": "bench", "timestamp": now()}),
+        "GET /events": lambda: ("GET", "/events?limit=100", None),
+        "GET /events/{id}": lambda: ("GET", f"/events/{rng.choice(event_ids)}", None),
+        "GET /stats": lambda: ("GET", "/stats", None),
+    }
+
+
+async def drive(base_url: str, factory, total: int, concurrency: int) -> dict:
+    """Issue `total` requests from `factory` with at most `concurrency` in flight."""
+    latencies, errors = [], 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                method, path, body = factory()
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, json=body)
+                    if resp.status_code >= 400:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - began
+    return summarize(latencies, errors, duration)
+
+
+def time_stages(iterations: int) -> dict:
+    """
+    Time each pipeline stage in-process against the configured database.
+    Must run with the same environment as the server (DATABASE_URL, OPENAI_*).
+    """
+    from app.agents import pipeline
+    from app.models.event import Event
+    from app.models.explainability import generate_reasoning
+    from app.services import scoring, semantics
+    from app.services import retrieval
+    from app.services.llm_service import generate_risk_summary
+    from app.db.models import EventORM, ScoreORM
+    from app.db.session import SessionLocal
+
+    rng = random.Random(7)
+    samples = {name: [] for name in (
+        "calculate_scores", "calculate_semantics", "generate_reasoning", "find_similar_events", "generate_risk_summary", "db_commit", "process_event",
+    )}
+
+    def timed(name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        samples[name].append(time.perf_counter() - started)
+        return result
+
+    for _ in range(iterations):
+        text = rng.choice(TEMPLATES).format(n=rng.randint(1, 500))
+        score_matrix = timed("calculate_scores", scoring.calculate_scores, text)
+        semantic_result = timed("calculate_semantics", semantics.calculate_semantics, text)
+        timed("generate_reasoning", generate_reasoning, semantic_result["matched_keywords"], semantic_result["category_scores"])
+        timed("find_similar_events", retrieval.find_similar, text)
+        timed("generate_risk_summary", generate_risk_summary, text, score_matrix.model_dump(), semantic_result)
+
+        def commit():
+            db = SessionLocal()
+            try:
+                event_orm = EventORM(id=f"bench-{time.perf_counter_ns()}", content=text, source="bench",
+                                     timestamp=datetime.utcnow(), status="SCORED")
+                event_orm.score = ScoreORM(event_id=event_orm.id, **score_matrix.model_dump())
+                db.add(event_orm)
+                db.commit()
+            finally:
+                db.close()
+        timed("db_commit", commit)
+        timed("process_event", pipeline.process_event, Event(content=text, source="bench"))
+
+    return {name: summarize(values, 0, sum(values)) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion and analysis API")
+    parser.add_argument("--events", type=int, default=10000, help="Seeded DB size (10000, 100000, 1000000)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--endpoints", default="", help="Comma-separated subset, e.g. 'GET /stats,POST /events'")
+    parser.add_argument("--openai-latency-ms", type=float, default=300.0)
+    parser.add_argument("--stage-iterations", type=int, default=50)
+    parser.add_argument("--no-openai", action="store_true", help="Benchmark the deterministic fallbacks only")
+    parser.add_argument("--label", default="", help="Name for the results file")
+    parser.add_argument("--stages-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stages_only:
+        print(json.dumps(time_stages(args.stage_iterations)))
+        return
+
+    # Seed once per size; the seeded file is reused by later runs
+    db_path = os.path.join(DATA_DIR, f"events-{args.events}.db")
+    if not os.path.exists(db_path):
+        seed(db_path, args.events)
+    # Writes during the run would grow the seed file; benchmark against a copy
+    run_db = os.path.join(DATA_DIR, f"run-{os.getpid()}.db")
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(run_db)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+    openai_stub = StubOpenAIServer(latency_ms=args.openai_latency_ms).start()
+    webhook_stub = StubWebhookServer().start()
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{run_db}",
+        DISCORD_WEBHOOK_URL=webhook_stub.url,
+        NOTIFICATION_SPOOL_PATH=os.path.join(DATA_DIR, "spool.jsonl"),
+        OPENAI_BASE_URL=openai_stub.url,
+        METRICS_ENABLED="1",
+    )
+    if args.no_openai:
+        env.pop("OPENAI_API_KEY", None)
+    else:
+        env["OPENAI_API_KEY"] = "stub"
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        for _ in range(300):
+            try:
+                if httpx.get(base_url + "/", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("API server did not start")
+
+        factories = _requests(random.Random(1), _sample_ids(run_db, 1000))
+        selected = [e.strip() for e in args.endpoints.split(",") if e.strip()] or list(factories)
+        for name in selected:
+            results[name] = asyncio.run(drive(base_url, factories[name], args.requests, args.concurrency))
+            r = results[name]
+            print(f"{name:24s} {r['throughput_rps']:9.1f} req/s  p50 {r['p50_ms']:8.2f}ms  "
+                  f"p95 {r['p95_ms']:8.2f}ms  p99 {r['p99_ms']:8.2f}ms  errors {r['errors']}")
+        server_metrics = _scrape_counters(base_url)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    # Per-stage timings run in a fresh process so app modules bind to the run database
+    output = subprocess.check_output(
+        [sys.executable, "-m", "bench.load", "--stages-only", "--stage-iterations", str(args.stage_iterations)],
+        cwd=BACKEND_DIR, env=env, text=True,
+    )
+    stages = json.loads(output.strip().splitlines()[-1])
+    for name, r in stages.items():
+        print(f"stage {name:22s} p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  p99 {r['p99_ms']:8.2f}ms")
+
+    openai_stub.stop()
+    webhook_stub.stop()
+    os.remove(run_db)
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "events": args.events,
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "workers": args.workers,
+            "openai_latency_ms": None if args.no_openai else args.openai_latency_ms,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_commit": _git_commit(),
+        },
+        "endpoints": results,
+        "stages": stages,
+        "server_metrics": server_metrics,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.label or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{name}-{args.events}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def _scrape_counters(base_url: str) -> dict:
+    """Counters and histogram sums/counts from the server's /metrics (one worker's view)."""
+    try:
+        text = httpx.get(base_url + "/metrics", timeout=10.0).text
+    except httpx.HTTPError:
+        return {}
+    scraped = {}
+    for line in text.splitlines():
+        if line.startswith("#") or "_bucket{" in line or not line.strip():
+            continue
+        name, _, value = line.rpartition(" ")
+        scraped[name] = float(value)
+    return scraped
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return ""
+
+
+if __name__ == "__main__":
+    main()
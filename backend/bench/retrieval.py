@@ -0,0 +1,178 @@
+"""
+Recall vs latency of two-stage retrieval (BM25 candidates, embedding re-rank).
+
+Builds a synthetic topical corpus, embeds all of it through the stub OpenAI
+server to get the exact top-k by cosine similarity, then runs
+`retrieval._search_fts` for each candidate count N and reports recall@k
+against the exact answer, latency, and embedding requests per query. Each N
+runs twice: cold, with an empty embedding cache, and then warm.
+
+The stub's embeddings are hashed bag-of-words vectors, so they are lexical
+too; recall here measures how many of the exact neighbours the BM25 stage
+keeps, not the semantic gain of real embeddings.
+
+    python -m bench.retrieval --events 5000 --queries 100 --top-n 5,10,20,50,100
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bench.load import DATA_DIR, RESULTS_DIR, summarize, _git_commit
+from stub_openai import StubOpenAIServer
+
+TOPICS = {
+    "payments": "payment gateway checkout merchant card declined settlement refund processor acquirer payout",
+    "outage": "outage downtime cluster node crash restart failover latency degraded incident pager",
+    "compliance": "regulator audit policy breach gdpr retention consent filing inspection sanction",
+    "fraud": "fraud chargeback suspicious ring account takeover phishing stolen credentials mule",
+    "press": "press article journalist leaked memo backlash social media statement interview",
+    "finance": "revenue forecast margin currency loss quarter guidance budget cost writeoff",
+    "legal": "lawsuit contract violation counsel settlement claim damages court filing partner",
+    "security": "malware intrusion firewall vulnerability patch exploit ransomware endpoint alert",
+}
+FILLER = (
+    "the a report team update today customer region system service weekly team review status "
+    "note ongoing issue ticket follow reported request manager escalated new old data"
+).split()
+
+
+def synthetic_text(rng: random.Random, topic: str) -> str:
+    words = TOPICS[topic].split()
+    tokens = rng.sample(words, rng.randint(3, 6)) + rng.sample(FILLER, rng.randint(3, 8))
+    rng.shuffle(tokens)
+    return " ".join(tokens)
+
+
+def build_corpus(db_path: str, events: int, rng: random.Random) -> list[tuple]:
+    from sqlalchemy import create_engine
+    from app.db.models import Base
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+
+    start = datetime(2024, 1, 1)
+    rows = [
+        (str(uuid.uuid4()), synthetic_text(rng, rng.choice(list(TOPICS))), "bench",
+         (start + timedelta(minutes=i)).isoformat(sep=" "), "SCORED")
+        for i in range(events)
+    ]
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO events (id, content, source, timestamp, status) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def exact_top_k(corpus: list[tuple], queries: list[str], k: int, batch: int = 500) -> list[list[str]]:
+    """Brute-force cosine top-k over every corpus vector."""
+    import numpy as np
+    from app.services.embeddings import EmbeddingCache
+
+    cache = EmbeddingCache(model="bench-exact", max_entries=len(corpus) + len(queries))
+    texts = [content for _, content, *_ in corpus]
+    vectors = []
+    for i in range(0, len(texts), batch):
+        vectors.extend(cache.embed(texts[i:i + batch], "stub"))
+    matrix = np.array(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    ids = [event_id for event_id, *_ in corpus]
+
+    results = []
+    for vector in cache.embed(queries, "stub"):
+        q = np.array(vector, dtype=np.float32)
+        sims = matrix @ (q / (np.linalg.norm(q) + 1e-12))
+        results.append([ids[i] for i in np.argsort(-sims, kind="stable")[:k]])
+    return results
+
+
+def run_two_stage(queries: list[str], exact: list[list[str]], k: int, top_n: int, stub: StubOpenAIServer,
+                  cache) -> dict:
+    from app.services import embeddings, retrieval
+
+    embeddings.embedding_cache = cache
+    before = stub.requests["/v1/embeddings"]
+    latencies, recalls = [], []
+    started = time.perf_counter()
+    for query, expected in zip(queries, exact):
+        t0 = time.perf_counter()
+        hits = retrieval._search_fts(query, k, top_n=top_n)
+        latencies.append(time.perf_counter() - t0)
+        recalls.append(len({h["id"] for h in hits} & set(expected)) / k)
+    result = summarize(latencies, 0, time.perf_counter() - started)
+    result["recall_at_k"] = round(sum(recalls) / len(recalls), 4)
+    result["embedding_requests_per_query"] = round((stub.requests["/v1/embeddings"] - before) / len(queries), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of two-stage retrieval")
+    parser.add_argument("--events", type=int, default=5000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3, help="Results per query (the pipeline uses 3)")
+    parser.add_argument("--top-n", default="5,10,20,50,100", help="Comma-separated candidate counts to compare")
+    parser.add_argument("--openai-latency-ms", type=float, default=50.0)
+    parser.add_argument("--label", default="", help="Name for the results file")
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    run_db = os.path.join(DATA_DIR, f"retrieval-{os.getpid()}.db")
+    stub = StubOpenAIServer(latency_ms=args.openai_latency_ms).start()
+    # App modules read these at import time
+    os.environ.update(DATABASE_URL=f"sqlite:///{run_db}", OPENAI_BASE_URL=stub.url, OPENAI_API_KEY="stub",
+                      RETRIEVAL_CANDIDATES="fts")
+    from app.db import search
+    from app.db.session import engine
+    from app.services.embeddings import EmbeddingCache
+
+    results = {}
+    try:
+        rng = random.Random(42)
+        corpus = build_corpus(run_db, args.events, rng)
+        search.ensure_schema(engine)
+        queries = [synthetic_text(rng, rng.choice(list(TOPICS))) for _ in range(args.queries)]
+
+        latency, stub.latency_ms = stub.latency_ms, 0.0
+        exact = exact_top_k(corpus, queries, args.k)
+        stub.latency_ms = latency
+
+        for top_n in (int(n) for n in args.top_n.split(",") if n.strip()):
+            cache = EmbeddingCache(model=f"bench-n{top_n}")
+            for phase in ("cold", "warm"):
+                results[f"n{top_n}_{phase}"] = r = run_two_stage(queries, exact, args.k, top_n, stub, cache)
+                print(f"N={top_n:<4d} {phase}  recall@{args.k} {r['recall_at_k']:.3f}  "
+                      f"p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  "
+                      f"{r['embedding_requests_per_query']:.2f} embedding requests/query")
+    finally:
+        stub.stop()
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(run_db + suffix):
+                os.remove(run_db + suffix)
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "events": args.events,
+            "queries": args.queries,
+            "k": args.k,
+            "openai_latency_ms": args.openai_latency_ms,
+            # The single-stage embedding path embeds every past event per query
+            "exact_vectors_per_query": args.events,
+            "git_commit": _git_commit(),
+        },
+        "retrieval": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.label or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"retrieval-{name}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports `app.main` in fresh interpreters with `python -X importtime`, reports
+the median import time and the slowest top-level imports, and fails when the
+median exceeds the budget or when an SDK that should load lazily (OpenAI,
+LangChain, YAML, numpy, requests) is imported at startup.
+
+    python -m bench.startup --runs 10 --budget-ms 1200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be imported when the code path that needs them runs
+LAZY_MODULES = ("openai", "langchain", "langchain_core", "langchain_openai", "yaml", "numpy", "requests")
+
+
+def import_profile(module: str = "app.main") -> dict:
+    """
+    Import `module` in a fresh interpreter. Returns {module_name: (self_us, cumulative_us, depth)}
+    for every module imported, parsed from -X importtime output.
+    """
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time against a budget")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1200")))
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    totals = []
+    profile = {}
+    for _ in range(args.runs):
+        profile = import_profile()
+        totals.append(profile["app.main"][1] / 1000.0)
+    median = statistics.median(totals)
+
+    print(f"import app.main: median {median:.1f}ms, min {min(totals):.1f}ms, max {max(totals):.1f}ms over {args.runs} runs")
+    print("slowest imports below app.main (last run):")
+    children = [(name, cumulative) for name, (_, cumulative, depth) in profile.items() if depth == 1]
+    for name, cumulative in sorted(children, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000.0:8.1f}ms  {name}")
+
+    failures = []
+    eager = [m for m in LAZY_MODULES if m in profile]
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.1f}ms exceeds the {args.budget_ms:.0f}ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
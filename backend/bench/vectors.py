@@ -0,0 +1,108 @@
+"""
+Memory and recall of the compact vector index formats.
+
+Generates clustered synthetic embeddings, computes the exact top-k by cosine
+similarity, and for each index configuration reports bytes per vector,
+projected memory per million events, search latency, and recall@k both from
+the compressed codes alone and after exact float re-scoring of the
+k * rescore-factor best candidates.
+
+    python -m bench.vectors --vectors 50000 --queries 200 --k 10
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench.load import RESULTS_DIR, summarize, _git_commit
+from app.services.vector_index import VectorIndex
+
+CONFIGS = {
+    "float32": dict(quantization="none"),
+    "int8": dict(quantization="int8"),
+    "int8_512d": dict(quantization="int8", dims=512),
+    "pq192": dict(quantization="pq", pq_subspaces=192),
+    "pq96": dict(quantization="pq", pq_subspaces=96),
+    "pq64_512d": dict(quantization="pq", pq_subspaces=64, dims=512),
+}
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    """Unit vectors around random topic centres, with energy skewed towards the leading dimensions."""
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    # text-embedding-3 concentrates information in its leading dimensions
+    decay = np.exp(-np.arange(dim) / (dim / 3)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors *= decay
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory and recall of quantized vector indexes")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=10)
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="Comma-separated subset of " + ", ".join(CONFIGS))
+    parser.add_argument("--label", default="", help="Name for the results file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = synthetic_embeddings(args.vectors + args.queries, args.dim, args.clusters, rng)
+    corpus, queries = data[:args.vectors], data[args.vectors:]
+    exact = [set(np.argsort(-(corpus @ q))[:args.k].tolist()) for q in queries]
+    fetch = lambda positions: corpus[positions]
+
+    results = {}
+    for name in args.configs.split(","):
+        index = VectorIndex(rescore_factor=args.rescore_factor, **CONFIGS[name])
+        t0 = time.perf_counter()
+        index.build(corpus)
+        build_s = time.perf_counter() - t0
+
+        entry = {"build_s": round(build_s, 2), "bytes_per_vector": round(index.nbytes / index.size, 1)}
+        entry["mb_per_million"] = round(entry["bytes_per_vector"] * 1e6 / 2**20, 1)
+        for mode, fetcher in (("approximate", None), ("rescored", fetch)):
+            latencies, recalls = [], []
+            started = time.perf_counter()
+            for q, expected in zip(queries, exact):
+                t0 = time.perf_counter()
+                hits = index.search(q, args.k, fetch=fetcher)
+                latencies.append(time.perf_counter() - t0)
+                recalls.append(len({p for p, _ in hits} & expected) / args.k)
+            stats = summarize(latencies, 0, time.perf_counter() - started)
+            entry[mode] = {"recall_at_k": round(sum(recalls) / len(recalls), 4),
+                           "p50_ms": stats["p50_ms"], "p95_ms": stats["p95_ms"]}
+        results[name] = entry
+        print(f"{name:10s} {entry['bytes_per_vector']:8.1f} B/vector  {entry['mb_per_million']:8.1f} MB/1M  "
+              f"recall@{args.k} {entry['approximate']['recall_at_k']:.3f} -> {entry['rescored']['recall_at_k']:.3f} "
+              f"rescored  p50 {entry['rescored']['p50_ms']:7.2f}ms  build {build_s:6.1f}s")
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "vectors": args.vectors,
+            "queries": args.queries,
+            "dim": args.dim,
+            "k": args.k,
+            "rescore_factor": args.rescore_factor,
+            "git_commit": _git_commit(),
+        },
+        "vectors": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.label or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"vectors-{name}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
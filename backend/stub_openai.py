@@ -0,0 +1,194 @@
+"""
+Local stub of the OpenAI API for tests and benchmarks.
+Serves /v1/embeddings and /v1/chat/completions with deterministic output.
+When a chat request offers tools (or legacy functions), the stub calls each
+offered tool once, in order, before answering, like a tool-using agent would.
+
+Latency and errors can be injected to exercise timeouts and the circuit
+breaker: `latency_ms` delays every response, and a fraction `error_rate` of
+requests (spread evenly) get an `error_status` reply instead.
+
+Run standalone and point the backend at it:
+    python stub_openai.py --port 9100 --latency-ms 200 --error-rate 0.1
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:9100/v1 python -m uvicorn app.main:app
+"""
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """Hashed bag-of-words vector, so similar texts get similar embeddings."""
+    vector = [0.0] * dim
+    for token in text.lower().split():
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _stub_arguments(schema: dict) -> dict:
+    """Placeholder arguments that satisfy a tool's JSON schema."""
+    defaults = {"string": "stub event", "number": 0.0, "integer": 0, "boolean": False, "object": {}, "array": []}
+    return {
+        name: defaults.get(prop.get("type"), "stub event")
+        for name, prop in schema.get("properties", {}).items()
+    }
+
+
+class StubOpenAIServer:
+    """
+    Records request counts per path and can add latency to every response or
+    fail a share of requests.
+    """
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, dim: int = 1536,
+                 error_rate: float = 0.0, error_status: int = 500):
+        self.latency_ms = latency_ms
+        self.dim = dim
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._served = 0
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _should_fail(self) -> bool:
+        """Fail `error_rate` of the requests, evenly spaced. Caller holds the lock."""
+        self._served += 1
+        return int(self._served * self.error_rate) > int((self._served - 1) * self.error_rate)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                path = self.path.split("?")[0]
+                with stub._lock:
+                    stub.requests[path] += 1
+                    fail = stub._should_fail()
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000.0)
+
+                if fail:
+                    self._reply(stub.error_status, {"error": {"message": "Injected failure", "type": "server_error"}})
+                elif path.endswith("/embeddings"):
+                    self._reply(200, self._embeddings(body))
+                elif path.endswith("/chat/completions"):
+                    self._reply(200, self._chat(body))
+                else:
+                    self._reply(404, {"error": {"message": f"Unknown path {path}"}})
+
+            def _embeddings(self, body: dict) -> dict:
+                inputs = body.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                tokens = sum(len(text.split()) for text in inputs)
+                return {
+                    "object": "list",
+                    "model": body.get("model", "text-embedding-3-small"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": fake_embedding(text, stub.dim)}
+                        for i, text in enumerate(inputs)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                }
+
+            def _chat(self, body: dict) -> dict:
+                messages = body.get("messages", [])
+                prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+                message = self._next_tool_call(body, messages) or {
+                    "role": "assistant",
+                    "content": (
+                        "SUMMARY: Stubbed risk summary for benchmarking.\n"
+                        "RECOMMENDATION: Review the event details and take appropriate action."
+                    ),
+                }
+                return {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "gpt-4o-mini"),
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": "stop"}
+                    ],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+                }
+
+            def _next_tool_call(self, body: dict, messages: list):
+                """Assistant message calling the first offered tool not called yet, or None."""
+                if body.get("tools"):
+                    offered = [t["function"] for t in body["tools"]]
+                else:
+                    offered = body.get("functions") or []
+                called = set()
+                for m in messages:
+                    for call in m.get("tool_calls") or []:
+                        called.add(call["function"]["name"])
+                    if m.get("function_call"):
+                        called.add(m["function_call"]["name"])
+                for function in offered:
+                    if function["name"] in called:
+                        continue
+                    arguments = json.dumps(_stub_arguments(function.get("parameters", {})))
+                    call = {"name": function["name"], "arguments": arguments}
+                    if body.get("tools"):
+                        return {"role": "assistant", "content": None, "tool_calls": [
+                            {"id": f"call_{len(called)}", "type": "function", "function": call},
+                        ]}
+                    return {"role": "assistant", "content": None, "function_call": call}
+                return None
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI API server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(port=args.port, latency_ms=args.latency_ms, dim=args.dim,
+                              error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Stub OpenAI API listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
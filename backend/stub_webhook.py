@@ -0,0 +1,90 @@
+"""
+Local stub of a Discord webhook for testing the notification dispatcher.
+
+Run standalone and point DISCORD_WEBHOOK_URL at it:
+    python stub_webhook.py --port 9000 --rate-limit-every 5
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubWebhookServer:
+    """
+    Records every webhook message it receives. Can simulate rate limiting
+    (a 429 with Retry-After every N requests) and outages (HTTP 503).
+    """
+    def __init__(self, port: int = 0, rate_limit_every: int = 0, retry_after: float = 0.05):
+        self.messages = []
+        self.requests = 0
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.failing = False
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/webhook"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    limited = stub.rate_limit_every and stub.requests % stub.rate_limit_every == 0
+                    if not stub.failing and not limited:
+                        stub.messages.append(json.loads(body))
+
+                if stub.failing:
+                    self._reply(503, {"message": "Service Unavailable"})
+                elif limited:
+                    self._reply(429, {"message": "You are being rate limited.", "retry_after": stub.retry_after},
+                                {"Retry-After": str(stub.retry_after)})
+                else:
+                    self._reply(204)
+
+            def _reply(self, status: int, body: dict = None, headers: dict = None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                if data:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Discord webhook server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubWebhookServer(port=args.port, rate_limit_every=args.rate_limit_every)
+    print(f"Stub webhook listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
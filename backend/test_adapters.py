@@ -26,6 +26,19 @@ def test_adapters():
     assert wa_out.source == "whatsapp"
     assert wa_out.content == "wa text"
 
+def test_adapters_decode_raw_bodies():
+    message = TelegramAdapter().decode(b'{"message": {"from": {"id": 7}, "text": "tg text", "date": 1700000000}}')
+    assert (message.source, message.sender, message.content) == ("telegram", "7", "tg text")
+    assert message.timestamp == datetime.fromtimestamp(1700000000)
+    assert EmailAdapter().decode(b'{"body": "email body"}').sender == "unknown"
+    for body in (b"[]", b'{"message_text": 5}', b"not json"):
+        try:
+            WhatsAppAdapter().decode(body)
+        except ValueError:
+            continue
+        raise AssertionError(f"{body!r} was accepted")
+
 if __name__ == "__main__":
     test_adapters()
+    test_adapters_decode_raw_bodies()
     print("All adapter tests passed!")
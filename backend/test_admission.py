@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.admission import HIGH, LOW, NORMAL, AdmissionController
+
+def test_priority_order_rate_limits_and_shedding():
+    controller = AdmissionController(concurrency=1, target_ms=200, rates={"noisy": 1}, burst_seconds=1, enabled=True)
+    assert controller._acquire("email", NORMAL)[0]
+
+    # Waiters are granted highest priority first, whatever their arrival order
+    order = []
+    def waiter(name, level):
+        granted, outcome, _ = controller._acquire("email", level)
+        order.append((name, outcome))
+        if granted:
+            controller._release()
+    threads = [threading.Thread(target=waiter, args=args) for args in (("normal", NORMAL), ("high", HIGH))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    assert controller.queued() == 2
+    controller._release()
+    for thread in threads:
+        thread.join()
+    assert order == [("high", "admitted"), ("normal", "admitted")]
+
+    # A low-priority event waits at most the latency target, then is shed
+    assert controller._acquire("email", NORMAL)[0]
+    started = time.monotonic()
+    assert controller._acquire("email", LOW)[:2] == (False, "overload")
+    assert 0.15 < time.monotonic() - started < 1.0
+    controller._release()
+    assert controller.active == 0 and controller.queued() == 0
+
+    # Over its rate a source is shed, except for high-risk events
+    assert controller._acquire("noisy", NORMAL)[:2] == (True, "admitted")
+    controller._release()
+    assert controller._acquire("noisy", NORMAL)[:2] == (False, "rate_limited")
+    assert controller._acquire("noisy", HIGH)[:2] == (True, "admitted")
+    controller._release()
+
+def test_normal_waiters_leave_room_for_high_priority():
+    controller = AdmissionController(concurrency=1, target_ms=50, normal_deadline_ms=300, max_waiting=2, enabled=True)
+    assert controller._acquire("email", NORMAL)[0]
+
+    # A small pool like the server's: only max_waiting normal events queue, the rest are shed at once
+    def admit(level):
+        granted, outcome, _ = controller._acquire("email", level)
+        if granted:
+            controller._release()
+        return outcome
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        normals = [pool.submit(admit, NORMAL) for _ in range(10)]
+        time.sleep(0.05)
+        assert controller.queued() == 2
+        started = time.monotonic()
+        high = pool.submit(admit, HIGH)
+        time.sleep(0.05)
+        assert controller.queued() == 3
+        controller._release()
+        assert high.result(timeout=1) == "admitted" and time.monotonic() - started < 0.5
+        outcomes = [future.result(timeout=1) for future in normals]
+    assert outcomes.count("overload") == 8 and outcomes.count("admitted") == 2
+    assert controller.active == 0 and controller.queued() == 0
+
+    # A queued normal event is shed once it has waited past its deadline
+    assert controller._acquire("email", NORMAL)[0]
+    started = time.monotonic()
+    assert controller._acquire("email", NORMAL)[:2] == (False, "overload")
+    assert 0.25 < time.monotonic() - started < 1.0
+    controller._release()
+    assert controller.active == 0
+
+if __name__ == "__main__":
+    test_priority_order_rate_limits_and_shedding()
+    test_normal_waiters_leave_room_for_high_priority()
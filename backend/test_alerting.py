@@ -0,0 +1,50 @@
+from app.services.alerting import AlertSuppressor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+SCORES = {"operational_risk": 0.75, "compliance_risk": 0.0, "reputational_risk": 0.0, "financial_risk": 0.0}
+KEYWORDS = {"operational_risk": ["outage", "downtime", "crash"], "compliance_risk": [], "reputational_risk": [], "financial_risk": []}
+
+
+def _evaluate(suppressor, content="Payments outage: downtime after crash", source="telegram"):
+    return suppressor.evaluate(source, SCORES, KEYWORDS, content, event_id="evt", risk_score=0.75)
+
+
+def test_repeats_are_suppressed_within_window():
+    clock = FakeClock()
+    suppressor = AlertSuppressor(window=60, escalation_thresholds=[], digest_interval=0, clock=clock)
+
+    assert _evaluate(suppressor).send
+    assert not _evaluate(suppressor).send
+    assert _evaluate(suppressor, source="email").send
+
+    clock.now = 61
+    assert _evaluate(suppressor).send
+
+
+def test_escalation_and_digest():
+    clock = FakeClock()
+    suppressor = AlertSuppressor(window=600, escalation_thresholds=[5], digest_interval=0, clock=clock)
+
+    decisions = [_evaluate(suppressor) for _ in range(6)]
+    assert [d.send for d in decisions] == [True, False, False, False, True, False]
+    assert decisions[4].escalated and decisions[4].occurrences == 5
+
+    digest = suppressor.collect_digest()
+    assert len(digest) == 1
+    assert digest[0].suppressed == 4
+    assert digest[0].category == "operational_risk"
+    assert suppressor.collect_digest() == []
+
+
+if __name__ == "__main__":
+    test_repeats_are_suppressed_within_window()
+    test_escalation_and_digest()
+    print("All alerting tests passed!")
@@ -0,0 +1,23 @@
+from app.services import semantics
+from app.services.analysis_cache import AnalysisCache
+
+def test_analysis_cache_hits_and_evicts():
+    cache = AnalysisCache()
+    text = "Regulator opened an investigation after the data breach and outage"
+    first = cache.get(text)
+    assert cache.get(text) is first
+    assert first.semantics() == semantics.calculate_semantics(text)
+    assert first.score_matrix().signal_strength == len(text) / 1000.0
+
+    # A different anchor version is a different entry
+    anchors = {"operational_risk": ["outage"]}
+    other = cache.get(text, anchors, "custom")
+    assert other is not first and other.category_scores()["operational_risk"] == 1.0
+
+    small = AnalysisCache(max_bytes=first.size * 2)
+    for i in range(5):
+        small.get(f"{text} #{i}")
+    assert len(small) < 5 and small.bytes <= small.max_bytes
+
+if __name__ == "__main__":
+    test_analysis_cache_hits_and_evicts()
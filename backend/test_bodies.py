@@ -0,0 +1,18 @@
+from sqlalchemy import create_engine, text
+from app.db import bodies
+
+def test_bodies_roundtrip_and_sql_inflate():
+    body = "Automated alert: disk usage on db-1 exceeded 95 percent. " * 5
+    assert bodies.content_hash(body) == bodies.content_hash(body)
+    assert len(bodies.content_hash(body)) == 32
+    assert len(bodies.compress(body)) < len(body)
+    assert bodies.inflate(bodies.compress(body)) == body
+    assert bodies.should_dedup(body) and not bodies.should_dedup("ok")
+
+    engine = create_engine("sqlite://")
+    bodies.register(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT inflate(:data)"), {"data": bodies.compress(body)}).scalar() == body
+
+if __name__ == "__main__":
+    test_bodies_roundtrip_and_sql_inflate()
@@ -0,0 +1,83 @@
+import os
+import time
+from app.services.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from stub_openai import StubOpenAIServer
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, failure_rate=0.5, open_seconds=0.2)
+    for ok in (True, False, True):
+        breaker.record(ok)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    try:
+        breaker.before_call()
+        assert False, "open circuit admitted a call"
+    except CircuitOpenError:
+        pass
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+    # One probe at a time once the open period is over; a failed probe reopens
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
+    try:
+        breaker.before_call()
+        assert False, "second probe admitted"
+    except CircuitOpenError:
+        pass
+    breaker.record(False, probe=True)
+    assert breaker.state == OPEN
+    time.sleep(0.25)
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED and breaker.snapshot()["recent_calls"] == 0
+
+def test_slow_and_failing_api_falls_back_fast():
+    from app.services import circuit, llm_service
+
+    stub = StubOpenAIServer(latency_ms=300, dim=8).start()
+    saved = {name: os.environ.get(name) for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL")}
+    # A key of its own, so the cached client picks up the stub's URL
+    os.environ.update(OPENAI_API_KEY=f"stub-circuit-{time.time()}", OPENAI_BASE_URL=stub.url)
+    chat_timeout, circuit.openai_breaker.open_seconds = llm_service.OPENAI_CHAT_TIMEOUT, 0.5
+    llm_service.OPENAI_CHAT_TIMEOUT = 0.1
+    circuit.openai_breaker.reset()
+    try:
+        scores, semantics = {}, {"category_scores": {}, "matched_keywords": {}}
+        # Calls over the deadline fail and open the circuit...
+        for _ in range(circuit.openai_breaker.min_calls):
+            llm_service.generate_risk_summary("outage", scores, semantics)
+        assert circuit.openai_breaker.state == OPEN
+        # ...after which the fallback comes back without calling the API
+        calls = sum(stub.requests.values())
+        started = time.monotonic()
+        summary = llm_service.generate_risk_summary("outage", scores, semantics)
+        assert time.monotonic() - started < 0.05 and summary["summary"]
+        assert sum(stub.requests.values()) == calls
+
+        # Injected errors make the half-open probe fail...
+        stub.latency_ms, stub.error_rate = 0, 1.0
+        time.sleep(0.6)
+        llm_service.generate_risk_summary("outage", scores, semantics)
+        assert circuit.openai_breaker.state == OPEN
+        # ...and once the API recovers, the probe closes the circuit
+        stub.error_rate = 0.0
+        time.sleep(0.6)
+        summary = llm_service.generate_risk_summary("outage", scores, semantics)
+        assert summary["summary"].startswith("Stubbed")
+        assert circuit.openai_breaker.state == CLOSED
+    finally:
+        llm_service.OPENAI_CHAT_TIMEOUT = chat_timeout
+        circuit.openai_breaker.open_seconds = circuit.OPENAI_BREAKER_OPEN_SECONDS
+        circuit.openai_breaker.reset()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        stub.stop()
+
+if __name__ == "__main__":
+    test_breaker_opens_probes_and_closes()
+    test_slow_and_failing_api_falls_back_fast()
@@ -0,0 +1,69 @@
+import os
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import bodies, search, session
+from app.db.models import Base
+from app.services import retrieval
+from app.services.circuit import openai_breaker
+from app.services.embeddings import EmbeddingCache
+from stub_openai import StubOpenAIServer
+
+def test_embedding_cache_layers_and_fts_rerank():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for i, content in enumerate(["payment gateway outage in eu", "gateway outage resolved",
+                                     "new privacy regulation", "quarterly revenue report"]):
+            conn.execute(text("INSERT INTO events (id, content, source, timestamp, status) VALUES (:id, :c, 'email', '2024-01-01', 'SCORED')"),
+                         {"id": f"e{i}", "c": content})
+    search.ensure_schema(engine)
+
+    stub = StubOpenAIServer(dim=8).start()
+    saved = {name: os.environ.get(name) for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL")}
+    # A key of its own, so the cached client picks up the stub's URL
+    os.environ.update(OPENAI_API_KEY=f"stub-embeddings-{time.time()}", OPENAI_BASE_URL=stub.url)
+    original_engine, original_sessions = session.engine, session.SessionLocal
+    session.engine, session.SessionLocal = engine, sessionmaker(bind=engine)
+    openai_breaker.reset()
+    calls = lambda: stub.requests["/v1/embeddings"]
+    try:
+        api_key = os.environ["OPENAI_API_KEY"]
+        cache = EmbeddingCache(model="stub-embedding")
+        # Cold: the distinct texts go to the API in one batch
+        first = cache.embed(["alpha", "beta", "alpha"], api_key)
+        assert calls() == 1 and first[0] == first[2] and len(first[0]) == 8
+        # Warm in memory
+        cache.embed(["beta", "alpha"], api_key)
+        assert calls() == 1
+        # A fresh process: the table answers, only the new text is requested
+        assert EmbeddingCache(model="stub-embedding").embed(["alpha", "gamma"], api_key)[0] == first[0]
+        assert calls() == 2
+        EmbeddingCache(model="stub-embedding").embed(["alpha", "beta", "gamma"], api_key)
+        assert calls() == 2
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM embeddings WHERE model = 'stub-embedding'")).scalar() == 3
+
+        # fts mode: full-text candidates re-ranked with one embedding request per cold query
+        before = calls()
+        hits = retrieval._search_fts("gateway outage", 2, top_n=3)
+        assert calls() == before + 1
+        assert {hit["id"] for hit in hits} == {"e0", "e1"}
+        assert retrieval._search_fts("gateway outage", 2, top_n=3) == hits
+        assert calls() == before + 1
+        # Another query shares the candidates' vectors; only the query text is new
+        retrieval._search_fts("outage gateway eu", 2, top_n=3)
+        assert calls() == before + 2
+    finally:
+        session.engine, session.SessionLocal = original_engine, original_sessions
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        stub.stop()
+
+if __name__ == "__main__":
+    test_embedding_cache_layers_and_fts_rerank()
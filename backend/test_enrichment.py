@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from app.db import bodies
+from app.db.models import Base
+from app.agents import pipeline
+from app.models.event import Event
+from app.services import enrichment
+from app.services.enrichment import EnrichmentWorker
+
+def test_worker_retries_then_stores_summary():
+    engine = create_engine("sqlite://")
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO events (id, content, source, timestamp, status) VALUES ('e1', 'gateway outage', 'email', :t, 'SCORED')"), {"t": now})
+        conn.execute(text("INSERT INTO analyses (event_id, operational_risk, compliance_risk, reputational_risk, financial_risk, "
+                          "anchor_version, summary, analyzed_at) VALUES ('e1', 0.5, 0, 0, 0, 'v', 'deterministic', :t)"), {"t": now})
+        conn.execute(text("INSERT INTO enrichment_queue (event_id, enqueued_at, not_before, attempts) VALUES ('e1', :t, :t, 0)"), {"t": now})
+    worker = EnrichmentWorker(max_attempts=3, engine=engine)
+
+    def failing(content, scores, semantics):
+        raise TimeoutError("upstream timed out")
+    assert worker._claim() == ["e1"]
+    # A claimed row is leased and can't be claimed again meanwhile
+    assert worker._claim() == []
+    assert worker.enrich("e1", failing) is False
+    with engine.connect() as conn:
+        attempts, not_before, error = conn.execute(text("SELECT attempts, not_before, last_error FROM enrichment_queue")).one()
+    assert attempts == 1 and error == "upstream timed out" and str(not_before) > str(now)
+    assert worker.pending() == 1
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE enrichment_queue SET not_before = :t"), {"t": now - timedelta(seconds=1)})
+    assert worker._claim() == ["e1"]
+    assert worker.enrich("e1", lambda content, scores, semantics: {"summary": f"LLM: {content}", "recommendation": "Page on-call."})
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT status FROM events")).scalar() == "PROCESSED"
+        assert conn.execute(text("SELECT summary FROM analyses")).scalar() == "LLM: gateway outage"
+    assert worker.pending() == 0
+
+def test_enrichment_changes_the_read_etag():
+    from app.api.events import _data_etag, _not_modified
+    engine = create_engine("sqlite://")
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for event_id in ("e1", "e2"):
+            conn.execute(text("INSERT INTO events (id, content, source, timestamp, status) VALUES (:id, 'outage', 'email', :t, 'SCORED')"),
+                         {"id": event_id, "t": now})
+            conn.execute(text("INSERT INTO analyses (event_id, operational_risk, compliance_risk, reputational_risk, financial_risk, "
+                              "anchor_version, summary, analyzed_at) VALUES (:id, 0.5, 0, 0, 0, 'v', 'deterministic', :t)"),
+                         {"id": event_id, "t": now})
+        # The event enriched is not the one with the highest analysis id
+        conn.execute(text("INSERT INTO enrichment_queue (event_id, enqueued_at, not_before, attempts) VALUES ('e1', :t, :t, 0)"), {"t": now})
+
+    def conditional(etag):
+        return Request({"type": "http", "method": "GET", "path": "/events",
+                        "headers": [(b"if-none-match", etag.encode())]})
+    with Session(engine) as db:
+        etag = _data_etag(db, "events")
+    assert _not_modified(conditional(etag), etag).status_code == 304
+
+    worker = EnrichmentWorker(engine=engine)
+    assert worker._claim() == ["e1"]
+    assert worker.enrich("e1", lambda content, scores, semantics: {"summary": "LLM", "recommendation": "Act."})
+    with Session(engine) as db:
+        fresh = _data_etag(db, "events")
+    assert fresh != etag
+    assert _not_modified(conditional(etag), fresh) is None
+
+def test_deferred_mode_summarizes_alerting_events_inline():
+    saved = enrichment.LLM_ENRICHMENT, pipeline.generate_risk_summary, pipeline.retrieval.find_similar
+    enrichment.LLM_ENRICHMENT = "deferred"
+    pipeline.generate_risk_summary = lambda content, scores, semantics: {"summary": "LLM", "recommendation": "Act."}
+    pipeline.retrieval.find_similar = lambda content, generation=None: []
+    try:
+        # Below the alert threshold the LLM is left to the worker
+        *_, llm_output = pipeline.process_event(Event(content="scheduled downtime tonight", source="email"))
+        assert llm_output.get("deferred") and llm_output["summary"] != "LLM"
+        # An event that alerts gets its LLM summary before the alert is sent
+        *_, llm_output = pipeline.process_event(Event(content="outage, system failure and downtime", source="email"))
+        assert llm_output == {"summary": "LLM", "recommendation": "Act."}
+    finally:
+        enrichment.LLM_ENRICHMENT, pipeline.generate_risk_summary, pipeline.retrieval.find_similar = saved
+
+if __name__ == "__main__":
+    test_worker_retries_then_stores_summary()
+    test_enrichment_changes_the_read_etag()
+    test_deferred_mode_summarizes_alerting_events_inline()
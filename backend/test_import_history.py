@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from sqlalchemy import create_engine, text
+from app.db import bodies
+from app.jobs import import_history
+
+def _write(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+    return path
+
+def _resumes(read, path):
+    """Reading from any checkpointed offset yields exactly the remaining records."""
+    records = list(read(path))
+    for i, (offset, _) in enumerate(records):
+        assert [r for _, r in read(path, offset)] == [r for _, r in records[i + 1:]]
+    return [r for _, r in records]
+
+def test_readers_parse_and_resume():
+    directory = tempfile.mkdtemp()
+    # Small reads so records straddle buffer boundaries
+    read_chunk, import_history.READ_CHUNK = import_history.READ_CHUNK, 64
+    try:
+        _check_readers(directory)
+    finally:
+        import_history.READ_CHUNK = read_chunk
+
+def _check_readers(directory):
+    export = {"name": "Ops", "chats": {"list": [
+        {"name": "a", "messages": [
+            {"id": 1, "type": "service", "date": "2024-01-01T00:00:00", "action": "create_group"},
+            {"id": 2, "type": "message", "date": "2024-01-01T00:00:01", "date_unixtime": "1704067201",
+             "from_id": "user7", "text": ["Gateway ", {"type": "bold", "text": "outage"}, " — «β»"]},
+        ]},
+        {"name": "b", "messages": [
+            {"id": 3, "type": "message", "date": "2024-01-02T00:00:00", "from_id": "user8", "text": "fraud"},
+        ]},
+    ]}}
+    path = _write(directory, "result.json", json.dumps(export, indent=1, ensure_ascii=False))
+    messages = [import_history.telegram_message(r) for r in _resumes(import_history.read_telegram, path)]
+    assert messages[0] is None
+    assert (messages[1].content, messages[1].sender) == ("Gateway outage — «β»", "user7")
+    assert messages[2].content == "fraud"
+
+    path = _write(directory, "a.mbox",
+                  "From a@example.com Mon Jan  1 00:00:00 2024\nFrom: a@example.com\n"
+                  "Date: Mon, 1 Jan 2024 12:00:00 +0000\n\nOutage\n>From the gateway\n\n"
+                  "From b@example.com Mon Jan  1 00:00:00 2024\nFrom: b@example.com\n"
+                  "Content-Type: text/html\n\n<p>Breach</p>\n")
+    messages = [import_history.email_message(r) for r in _resumes(import_history.read_mbox, path)]
+    assert messages[0].content == "Outage\nFrom the gateway" and messages[0].sender == "a@example.com"
+    assert messages[1].content == "Breach"
+
+    path = _write(directory, "chat.txt",
+                  "﻿12/31/23, 9:15 PM - Messages are end-to-end encrypted.\n"
+                  "12/31/23, 9:16 PM - Mary: outage\nstill down\n"
+                  "[1/2/24, 08:00:05] Bob: recovered\n")
+    records = _resumes(import_history.read_whatsapp, path)
+    messages = [import_history.whatsapp_message(r, day_first=False) for r in records]
+    assert messages[0] is None
+    assert (messages[1].sender, messages[1].content) == ("Mary", "outage\nstill down")
+    assert messages[1].timestamp.isoformat() == "2023-12-31T21:16:00"
+    assert messages[2].timestamp.isoformat() == "2024-01-02T08:00:05"
+
+def test_run_resumes_and_is_idempotent():
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'events.db')}")
+    bodies.register(engine)
+    path = _write(directory, "chat.txt",
+                  "31/12/2023, 21:16 - Mary: ok\n"
+                  "31/12/2023, 21:16 - Mary: ok\n"
+                  "31/12/2023, 21:17 - Bob: gateway outage\n"
+                  "31/12/2023, 21:18 - Bob: recovered\n")
+    checkpoint = os.path.join(directory, "import.checkpoint.json")
+    run = lambda reset=False: import_history.run("whatsapp", path, 1, 1, checkpoint, reset)
+
+    original_engine, original_write = import_history.engine, import_history.write_chunk
+    calls = []
+    def write_then_fail(*args):
+        # Interrupted between the two identical messages
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return original_write(*args)
+    import_history.engine, import_history.write_chunk = engine, write_then_fail
+    try:
+        try:
+            run()
+            assert False, "import was not interrupted"
+        except RuntimeError:
+            pass
+        assert json.load(open(checkpoint))["imported"] == 1
+        import_history.write_chunk = original_write
+        # The total includes the events imported before the interruption
+        assert run() == 4
+        assert not os.path.exists(checkpoint)
+        # Importing the same file again adds nothing and leaves the stored analysis alone
+        def stored():
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT * FROM scores JOIN analyses USING (event_id) ORDER BY event_id")).all()
+        before = stored()
+        assert run(reset=True) == 0
+        assert stored() == before
+    finally:
+        import_history.engine, import_history.write_chunk = original_engine, original_write
+
+    with engine.connect() as conn:
+        contents = [row[0] for row in conn.execute(text(
+            f"SELECT {bodies.EVENT_TEXT} FROM events {bodies.BODY_JOIN} ORDER BY events.timestamp, events.rowid"))]
+        assert contents == ["ok", "ok", "gateway outage", "recovered"]
+        assert conn.execute(text("SELECT COUNT(*) FROM scores")).scalar() == 4
+        assert conn.execute(text("SELECT rowid FROM events_fts WHERE events_fts MATCH 'recovered'")).all()
+
+if __name__ == "__main__":
+    test_readers_parse_and_resume()
+    test_run_resumes_and_is_idempotent()
@@ -0,0 +1,58 @@
+from fastapi import HTTPException
+from app.api.metrics import get_metrics
+from app.services import metrics
+from app.services.metrics import Counter, Gauge, Histogram, Registry
+
+def test_labels_and_histogram_lines():
+    saved = metrics.METRICS_ENABLED
+    metrics.METRICS_ENABLED = True
+    try:
+        registry = Registry()
+        calls = registry.register(Counter("calls_total", "Calls.", ("kind", "outcome")))
+        depth = registry.register(Gauge("depth", "Queue depth."))
+        latency = registry.register(Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0)))
+        calls.inc(kind="chat", outcome="ok")
+        calls.inc(2, outcome="ok", kind="chat")
+        depth.set_function(lambda: 3)
+        for value in (0.05, 0.5, 0.7, 4.0):
+            latency.observe(value, stage="llm")
+        lines = registry.render().splitlines()
+    finally:
+        metrics.METRICS_ENABLED = saved
+
+    assert "# TYPE calls_total counter" in lines
+    # Labels render in declaration order, whatever order they were passed in
+    assert 'calls_total{kind="chat",outcome="ok"} 3.0' in lines
+    # No labels, no braces
+    assert "depth 3" in lines
+    # Buckets are cumulative and end with +Inf, then sum and count
+    assert [line for line in lines if line.startswith("latency_seconds")] == [
+        'latency_seconds_bucket{stage="llm",le="0.1"} 1',
+        'latency_seconds_bucket{stage="llm",le="1.0"} 3',
+        'latency_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'latency_seconds_sum{stage="llm"} 5.25',
+        'latency_seconds_count{stage="llm"} 4',
+    ]
+
+def test_disabled_metrics_record_nothing_and_return_404():
+    saved = metrics.METRICS_ENABLED
+    metrics.METRICS_ENABLED = False
+    try:
+        counter = Counter("disabled_total", "Never incremented.")
+        counter.inc()
+        assert counter.value() == 0.0
+        try:
+            get_metrics()
+            assert False, "expected a 404"
+        except HTTPException as e:
+            assert e.status_code == 404
+
+        metrics.METRICS_ENABLED = True
+        response = get_metrics()
+        assert response.status_code == 200 and b"# TYPE risk_stage_duration_seconds histogram" in response.body
+    finally:
+        metrics.METRICS_ENABLED = saved
+
+if __name__ == "__main__":
+    test_labels_and_histogram_lines()
+    test_disabled_metrics_record_nothing_and_return_404()
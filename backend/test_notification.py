@@ -0,0 +1,91 @@
+import os
+import tempfile
+from app.services.notification import NotificationService
+from stub_webhook import StubWebhookServer
+
+
+def _alert(service, i):
+    service.send_risk_alert(
+        event_id=f"evt-{i}",
+        content="system outage",
+        source="telegram",
+        risk_summary="summary",
+        recommendation="recommendation",
+        risk_score=0.9,
+    )
+
+
+def test_alerts_are_coalesced_into_multi_embed_messages():
+    stub = StubWebhookServer().start()
+    spool = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    service = NotificationService(webhook_url=stub.url, spool_path=spool, batch_window=0.2)
+    try:
+        for i in range(25):
+            _alert(service, i)
+        assert service.flush(5)
+    finally:
+        service.close()
+        stub.stop()
+
+    embeds = [e for m in stub.messages for e in m["embeds"]]
+    assert len(embeds) == 25
+    assert all(len(m["embeds"]) <= 10 for m in stub.messages)
+    assert len(stub.messages) < 25
+
+
+def test_rate_limited_messages_are_retried():
+    stub = StubWebhookServer(rate_limit_every=2).start()
+    spool = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    service = NotificationService(webhook_url=stub.url, spool_path=spool, batch_window=0)
+    try:
+        for i in range(4):
+            _alert(service, i)
+            service.flush(5)
+    finally:
+        service.close()
+        stub.stop()
+
+    assert len([e for m in stub.messages for e in m["embeds"]]) == 4
+    assert not os.path.exists(spool)
+
+
+def test_unreachable_webhook_spools_to_disk():
+    stub = StubWebhookServer().start()
+    stub.failing = True
+    spool = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    service = NotificationService(webhook_url=stub.url, spool_path=spool, batch_window=0, max_retries=0)
+    try:
+        _alert(service, 1)
+        assert service.flush(5)
+    finally:
+        service.close()
+        stub.stop()
+
+    assert os.path.exists(spool)
+    assert stub.messages == []
+
+
+def test_torn_spool_lines_are_skipped_on_replay():
+    stub = StubWebhookServer().start()
+    spool = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+    with open(spool, "w", encoding="utf-8") as f:
+        # A crash while spooling leaves a truncated line between good ones
+        f.write('{"embeds": [{"title": "first"}]}\n{"embeds": [{"ti\n{"embeds": [{"title": "last"}]}\n')
+    service = NotificationService(webhook_url=stub.url, spool_path=spool, batch_window=0)
+    try:
+        service._next_spool_replay = 0
+        service._replay_spool()
+    finally:
+        service.close()
+        stub.stop()
+
+    assert [e["title"] for m in stub.messages for e in m["embeds"]] == ["first", "last"]
+    assert not os.path.exists(spool) and not os.path.exists(spool + ".replay")
+
+
+if __name__ == "__main__":
+    test_alerts_are_coalesced_into_multi_embed_messages()
+    test_rate_limited_messages_are_retried()
+    test_unreachable_webhook_spools_to_disk()
+    test_torn_spool_lines_are_skipped_on_replay()
+    print("All notification tests passed!")
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from app.db import bodies
+from app.db.models import Base
+from app.jobs import rescore
+from app.services import semantics
+
+def test_rescore_resumes_upserts_and_restarts_on_new_anchors():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for i in range(5):
+            conn.execute(text("INSERT INTO events (id, content, source, timestamp, status) VALUES (:id, :content, 'email', :t, 'SCORED')"),
+                         {"id": f"e{i}", "content": f"gateway outage number {i}", "t": now})
+        conn.execute(text("INSERT INTO scores (event_id, signal_strength, historical_rarity, trend_acceleration, "
+                          "cross_source_presence, uncertainty) VALUES ('e0', 9, 9, 9, 9, 9)"))
+        conn.execute(text("INSERT INTO analyses (event_id, operational_risk, compliance_risk, reputational_risk, financial_risk, "
+                          "anchor_version, summary, analyzed_at) VALUES ('e0', 0, 0, 0, 0, 'old', 'LLM summary', :t)"), {"t": now})
+    checkpoint = os.path.join(tempfile.mkdtemp(), "rescore.checkpoint.json")
+    run = lambda: rescore.run(1, 2, False, checkpoint, False)
+
+    original_engine, original_write = rescore.engine, rescore.write_results
+    writes = []
+    def write_then_fail(results):
+        writes.append(len(results))
+        if len(writes) == 2:
+            raise RuntimeError("interrupted")
+        original_write(results)
+    rescore.engine, rescore.write_results = engine, write_then_fail
+    try:
+        try:
+            run()
+            assert False, "rescore was not interrupted"
+        except RuntimeError:
+            pass
+        state = json.load(open(checkpoint))
+        assert (state["last_rowid"], state["processed"], state["anchor_version"]) == (2, 2, semantics.ANCHOR_VERSION)
+
+        # Resumes after the last committed chunk
+        rescore.write_results = original_write
+        assert run() == 3
+        assert not os.path.exists(checkpoint)
+
+        # A checkpoint written under other anchors is discarded
+        with open(checkpoint, "w") as f:
+            json.dump({"last_rowid": 4, "processed": 4, "anchor_version": "stale"}, f)
+        assert run() == 5
+    finally:
+        rescore.engine, rescore.write_results = original_engine, original_write
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*), COUNT(DISTINCT event_id) FROM scores")).one() == (5, 5)
+        assert conn.execute(text("SELECT COUNT(*) FROM analyses WHERE anchor_version = :v"),
+                            {"v": semantics.ANCHOR_VERSION}).scalar() == 5
+        signal, summary = conn.execute(text(
+            "SELECT scores.signal_strength, analyses.summary FROM scores JOIN analyses USING (event_id) WHERE event_id = 'e0'"
+        )).one()
+    # Scores are replaced; without --llm the stored summary is kept
+    assert signal != 9 and summary == "LLM summary"
+
+if __name__ == "__main__":
+    test_rescore_resumes_upserts_and_restarts_on_new_anchors()
@@ -0,0 +1,48 @@
+from app.services import rag_service, retrieval
+from app.services.retrieval import RetrievalIndex
+
+def test_retrieval_index():
+    index = RetrievalIndex(max_docs=2)
+    index.build([("a", "payment server outage"), ("b", "new privacy regulation published")])
+    top = index.search("server outage", 1)
+    assert top[0]["id"] == "a"
+    assert top[0]["content"] == "payment server outage"
+    assert 0 < top[0]["similarity"] <= 1
+
+    # New events are searchable right away; the oldest is evicted past max_docs
+    index.add("c", "database outage in the eu region")
+    assert len(index) == 2
+    assert [hit["id"] for hit in index.search("outage", 3)] == ["c"]
+    assert index.search("unknown words only") == []
+
+def test_events_added_during_build_are_indexed():
+    index = RetrievalIndex()
+    # Not being built yet: nothing to keep
+    index.add("early", "ignored outage")
+    # As ensure_built() does before querying the database
+    index._pending = []
+    index.add("late", "gateway outage committed after the snapshot")
+    index.add("a", "payment server outage")
+    index.build([("a", "payment server outage")])
+    assert sorted(hit["id"] for hit in index.search("outage", 5)) == ["a", "late"]
+    assert index._pending is None
+
+def test_vocabulary_stays_bounded():
+    index = RetrievalIndex(max_docs=2)
+    index.build([])
+    slack, retrieval.VOCABULARY_SLACK = retrieval.VOCABULARY_SLACK, 10
+    try:
+        for i in range(200):
+            index.add(f"e{i}", f"outage token{i} other{i}")
+            # Queries and the TF-IDF fallback never assign ids
+            index.search(f"unseen{i} outage")
+            rag_service._find_similar_with_tfidf(f"query{i}", [{"id": "x", "content": f"doc{i}"}], 1)
+        assert len(index._vocabulary) <= 2 * len(index._postings) + 10
+        assert [hit["id"] for hit in index.search("token199")] == ["e199"]
+    finally:
+        retrieval.VOCABULARY_SLACK = slack
+
+if __name__ == "__main__":
+    test_retrieval_index()
+    test_events_added_during_build_are_indexed()
+    test_vocabulary_stays_bounded()
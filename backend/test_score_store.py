@@ -0,0 +1,65 @@
+import os
+import struct
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from app.services import score_store
+
+def test_append_and_aggregate():
+    with tempfile.TemporaryDirectory() as directory:
+        store = score_store.ScoreStore(directory)
+        for i, source in enumerate(["email", "email", "telegram", "email"]):
+            store.append(datetime(2024, 3, 5, 10, i), source, {"uncertainty": i / 10}, {"financial_risk": 0.5})
+        store.append_many([(datetime(2024, 3, 6, 9), "email", {"uncertainty": 1.0})])
+        store.close()
+
+        days = score_store.aggregate(date(2024, 3, 5), date(2024, 3, 6), directory=directory)
+        assert [(d["day"], d["source"], d["count"]) for d in days] == [
+            ("2024-03-05", "email", 3), ("2024-03-05", "telegram", 1), ("2024-03-06", "email", 1),
+        ]
+        email = days[0]
+        assert abs(email["mean"]["uncertainty"] - 0.1333) < 1e-4
+        assert email["p50"]["uncertainty"] == 0.1
+        assert email["mean"]["financial_risk"] == 0.5
+
+        only_telegram = score_store.aggregate(date(2024, 3, 5), date(2024, 3, 5), sources=["telegram"], directory=directory)
+        assert [d["source"] for d in only_telegram] == ["telegram"]
+
+def test_aware_timestamps_are_stored_as_utc():
+    with tempfile.TemporaryDirectory() as directory:
+        store = score_store.ScoreStore(directory, segment="w")
+        # 01:00 at +02:00 is still the previous day in UTC
+        aware = datetime(2024, 3, 7, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+        store.append(aware, "discord", {}, {})
+        store.append_many([(aware, "discord", {}), (datetime(2024, 3, 6, 23, 0, tzinfo=timezone.utc), "discord", {})])
+        store.close()
+
+        days = score_store.aggregate(date(2024, 3, 6), date(2024, 3, 7), directory=directory)
+        assert [(d["day"], d["count"]) for d in days] == [("2024-03-06", 3)]
+        with open(os.path.join(directory, "2024-03-06", "w", "timestamp.f64"), "rb") as f:
+            stored = struct.unpack("<3d", f.read())
+        assert set(stored) == {datetime(2024, 3, 6, 23, 0, tzinfo=timezone.utc).timestamp()}
+
+def test_reopened_segment_drops_a_torn_row():
+    with tempfile.TemporaryDirectory() as directory:
+        store = score_store.ScoreStore(directory, segment="w1")
+        store.append(datetime(2024, 3, 5, 10), "email", {"uncertainty": 0.1}, {})
+        store.close()
+        # A crash after the first columns of a row were written
+        path = os.path.join(directory, "2024-03-05", "w1")
+        for name in ("timestamp.f64", "source.u16"):
+            with open(os.path.join(path, name), "ab") as f:
+                f.write(b"\0" * score_store._WIDTHS[name])
+
+        # Restarted under the same segment name, e.g. the same pid
+        store = score_store.ScoreStore(directory, segment="w1")
+        store.append(datetime(2024, 3, 5, 11), "telegram", {"uncertainty": 0.9}, {})
+        store.close()
+        days = score_store.aggregate(date(2024, 3, 5), date(2024, 3, 5), directory=directory)
+        assert [(d["source"], d["count"], round(d["mean"]["uncertainty"], 3)) for d in days] == [
+            ("email", 1, 0.1), ("telegram", 1, 0.9),
+        ]
+
+if __name__ == "__main__":
+    test_append_and_aggregate()
+    test_aware_timestamps_are_stored_as_utc()
+    test_reopened_segment_drops_a_torn_row()
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.db import bodies, search
+from app.db.models import Base
+
+def test_search_ranks_pages_and_filters():
+    engine = create_engine("sqlite://")
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for i in range(25):
+            conn.execute(text("INSERT INTO events (id, content, source, timestamp, status) VALUES (:id, :c, :s, :t, 'SCORED')"),
+                         {"id": f"e{i}", "c": f"gateway outage number {i}" + (" outage" if i == 7 else ""),
+                          "s": "email" if i % 2 else "telegram", "t": f"2024-01-{i + 1:02d} 00:00:00"})
+    search.ensure_schema(engine)
+
+    with Session(engine) as db:
+        first = search.search(db, "outage", limit=10)
+        assert first["results"][0]["id"] == "e7" and "<mark>outage</mark>" in first["results"][0]["snippet"]
+        ids, cursor = [r["id"] for r in first["results"]], first["next_cursor"]
+        while cursor:
+            page = search.search(db, "outage", limit=10, cursor=cursor)
+            ids += [r["id"] for r in page["results"]]
+            cursor = page["next_cursor"]
+        assert sorted(ids) == sorted(f"e{i}" for i in range(25))
+
+        # Quotes and operators in user input are matched literally
+        assert search.search(db, 'outage "AND')["results"] == []
+        email = search.search(db, "gateway", sources=["email"], limit=100)["results"]
+        assert len(email) == 12 and all(r["source"] == "email" for r in email)
+        assert search.candidates(db, "unrelated outage", limit=3)[0]["id"] == "e7"
+
+if __name__ == "__main__":
+    test_search_ranks_pages_and_filters()
@@ -0,0 +1,25 @@
+import tempfile
+from app.services import shared_index
+
+def test_generation_swap():
+    anchors = {"operational_risk": ["outage"]}
+    with tempfile.TemporaryDirectory() as directory:
+        shared_index.build_generation(directory, [
+            ("a", "server outage in the eu region"),
+            ("b", "quarterly revenue report published"),
+        ], anchors, "v1")
+        reader = shared_index.SharedIndexReader(directory, refresh=0)
+        first = reader.current()
+        assert first.generation == 1
+        assert first.anchors == anchors
+        assert first.search("major outage", 1)[0][0] == "a"
+
+        shared_index.build_generation(directory, [("c", "revenue dropped after the outage")], anchors, "v2")
+        second = reader.current()
+        assert second.generation == 2
+        assert second.search("revenue", 3) == [("c", second.search("revenue", 1)[0][1])]
+        # The old generation stays usable by queries that already hold it
+        assert first.search("revenue report", 1)[0][0] == "b"
+
+if __name__ == "__main__":
+    test_generation_swap()
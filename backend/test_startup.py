@@ -0,0 +1,9 @@
+from bench.startup import LAZY_MODULES, import_profile
+
+def test_heavy_sdks_load_lazily():
+    profile = import_profile("app.main")
+    eager = [m for m in LAZY_MODULES if m in profile]
+    assert eager == [], f"imported at startup: {eager}"
+
+if __name__ == "__main__":
+    test_heavy_sdks_load_lazily()
@@ -0,0 +1,44 @@
+import asyncio
+from app.api import stream
+
+def record(content, source="email"):
+    return b'{"source": "%s", "sender": "ops", "content": "%s", "timestamp": "2024-01-01T00:00:00"}' % (
+        source.encode(), content.encode())
+
+def test_stream_acks_in_order_across_chunks_and_batches():
+    batches = []
+    def fake_batch(items):
+        batches.append(len(items))
+        return [{"event_id": f"id-{item.content}", "source": item.source, "status": "processed", "risk_level": "normal"}
+                for item in items]
+
+    async def run():
+        s = stream.IngestStream()
+        async def produce():
+            # Records split across chunks, a blank line, an invalid record, and no final newline
+            b = record("b")
+            await s.feed(record("a") + b"\n" + b[:20])
+            await s.feed(b[20:] + b'\n\n{"source": "email"}\n')
+            for i in range(40):
+                await s.feed(record(str(i), "telegram") + b"\n")
+            await s.feed(record("last"))
+            await s.close()
+        producer = asyncio.create_task(produce())
+        acks = [ack async for ack in s.acks()]
+        await producer
+        return acks
+
+    original, stream.process_ingested_batch = stream.process_ingested_batch, fake_batch
+    try:
+        acks = asyncio.run(run())
+    finally:
+        stream.process_ingested_batch = original
+
+    assert [ack["seq"] for ack in acks] == list(range(44))
+    assert acks[0]["event_id"] == "id-a" and acks[1]["event_id"] == "id-b"
+    assert acks[2]["status"] == "error" and "content" in acks[2]["detail"]
+    assert acks[-1]["event_id"] == "id-last"
+    assert sum(batches) == 43 and max(batches) <= stream.STREAM_BATCH_SIZE
+
+if __name__ == "__main__":
+    test_stream_acks_in_order_across_chunks_and_batches()
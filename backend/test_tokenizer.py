@@ -0,0 +1,27 @@
+from app.services import semantics, tokenizer
+
+def test_tokenizer_normalizes_and_encodes():
+    assert tokenizer.tokens("Outage, ＯＵＴＡＧＥ! outage") == ["outage", "outage", "outage"]
+    vocabulary = tokenizer.Vocabulary()
+    ids = tokenizer.encode("Payment outage; payment down", vocabulary)
+    assert ids.typecode == "I" and ids[0] == ids[2] and len(set(ids)) == 3
+    # Queries don't grow the vocabulary
+    assert list(tokenizer.encode("zzqx payment", vocabulary, add=False)) == [ids[0]]
+    assert len(vocabulary) == 3 and vocabulary.term(ids[1]) == "outage"
+
+    matched = semantics.calculate_semantics("Outages, then a glossary update")["matched_keywords"]
+    assert matched["operational_risk"] == ["outage"] and matched["financial_risk"] == []
+
+def test_anchor_version_covers_the_matcher():
+    anchors, version = semantics.load_anchors()
+    matcher = semantics.MATCHER_VERSION
+    try:
+        semantics.MATCHER_VERSION = matcher + 1
+        bumped_anchors, bumped = semantics.load_anchors()
+        assert bumped_anchors == anchors and bumped != version
+    finally:
+        semantics.MATCHER_VERSION = matcher
+
+if __name__ == "__main__":
+    test_tokenizer_normalizes_and_encodes()
+    test_anchor_version_covers_the_matcher()
@@ -0,0 +1,115 @@
+import threading
+from array import array
+from datetime import datetime
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from app.db import bodies, session
+from app.db.models import Base
+from app.services import embeddings, vector_index
+from app.services.vector_index import EventVectors, VectorIndex
+
+def test_quantized_search_rescores_exactly():
+    rng = np.random.default_rng(0)
+    corpus = rng.standard_normal((600, 64)).astype(np.float32)
+    query = corpus[17] + 0.05 * rng.standard_normal(64).astype(np.float32)
+    fetch = lambda positions: corpus[positions]
+
+    for config in (dict(quantization="int8"), dict(quantization="pq", pq_subspaces=8, pq_min_train=256), dict(quantization="int8", dims=32)):
+        index = VectorIndex(rescore_factor=5, **config)
+        index.build(corpus[:500])
+        index.add(corpus[500:])
+        assert index.size == 600 and index.nbytes < corpus.nbytes
+        top = index.search(query, 3, fetch=fetch)
+        assert top[0][0] == 17 and 0.99 < top[0][1] <= 1.0001
+
+def test_pq_trains_once_enough_vectors_are_added():
+    rng = np.random.default_rng(1)
+    corpus = rng.standard_normal((600, 64)).astype(np.float32)
+    fetch = lambda positions: corpus[positions]
+
+    # Grown from empty one vector at a time, like EventVectors on a fresh database
+    index = VectorIndex(quantization="pq", pq_subspaces=8, rescore_factor=5, pq_min_train=300)
+    for i, vector in enumerate(corpus):
+        index.add(vector)
+        if i == 100:
+            # Buffered as float32 until there is enough to train on, and searched exactly
+            assert index.codebooks is None and index.search(corpus[42], 1)[0][0] == 42
+    assert index.codebooks is not None and index._codes.dtype == np.uint8 and index.size == 600
+
+    queries = range(0, 600, 7)
+    hits = sum(index.search(corpus[q] + 0.05 * rng.standard_normal(64).astype(np.float32), 1, fetch=fetch)[0][0] == q
+               for q in queries)
+    assert hits == len(queries)
+
+def test_build_in_blocks_matches_bulk_build():
+    rng = np.random.default_rng(2)
+    corpus = rng.standard_normal((700, 64)).astype(np.float32)
+    fetch = lambda positions: corpus[positions]
+
+    for config in (dict(quantization="int8"), dict(quantization="pq", pq_subspaces=8, pq_min_train=256)):
+        bulk = VectorIndex(rescore_factor=5, **config)
+        bulk.build(corpus)
+        streamed = VectorIndex(rescore_factor=5, **config)
+        # Blocks of uneven size into a larger pre-sized array, PQ trained on a sample
+        streamed.build_blocks((corpus[i:i + 150] for i in range(0, 700, 150)), 800, sample=corpus[::2])
+        assert streamed.size == 700 and len(streamed._codes) == 800
+        for q in range(0, 700, 50):
+            query = corpus[q] + 0.05 * rng.standard_normal(64).astype(np.float32)
+            assert streamed.search(query, 1, fetch=fetch)[0][0] == bulk.search(query, 1, fetch=fetch)[0][0] == q
+
+def test_event_vectors_build_from_tables_and_fetch_outside_the_lock():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    bodies.register(engine)
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(3)
+    corpus = rng.standard_normal((40, 16)).astype(np.float32)
+    contents = [f"event body {i}" + (" padding" * 400 if i % 4 == 0 else "") for i in range(40)]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for i, content in enumerate(contents):
+            if bodies.should_dedup(content):
+                conn.execute(bodies.INSERT_BODY, bodies.insert_params(content, now))
+                row = {"content": None, "hash": bodies.content_hash(content)}
+            else:
+                row = {"content": content, "hash": None}
+            conn.execute(text("INSERT INTO events (id, content, content_hash, source, timestamp, status) "
+                              "VALUES (:id, :content, :hash, 'email', '2024-01-01', 'SCORED')"), {"id": f"e{i}", **row})
+            conn.execute(embeddings.INSERT_VECTOR, {
+                "hash": bodies.content_hash(content), "model": embeddings.embedding_cache.model, "dims": 16,
+                "vector": embeddings.to_bytes(array("f", corpus[i].tolist())), "created_at": now,
+            })
+
+    original_engine, original_block = session.engine, vector_index.BUILD_BLOCK
+    session.engine, vector_index.BUILD_BLOCK = engine, 7
+    try:
+        events = EventVectors()
+        events.index = VectorIndex(quantization="int8", rescore_factor=3)
+        events.ensure_built()
+        assert len(events) == events.index.size == 40 and events.hashes[0] == bodies.content_hash(contents[0])
+        assert events.search(corpus[12], 1)[0][0] == "e12"
+        assert events.search(corpus[8], 1)[0][0] == "e8"
+
+        # The full vectors are fetched without holding the index lock
+        fetch = events._fetch
+        def fetch_from_another_thread(hashes):
+            acquired = []
+            def probe():
+                acquired.append(events._lock.acquire(timeout=1))
+                if acquired[0]:
+                    events._lock.release()
+            worker = threading.Thread(target=probe)
+            worker.start()
+            worker.join()
+            assert acquired == [True]
+            return fetch(hashes)
+        events._fetch = fetch_from_another_thread
+        assert events.search(corpus[30], 1)[0][0] == "e30"
+    finally:
+        session.engine, vector_index.BUILD_BLOCK = original_engine, original_block
+
+if __name__ == "__main__":
+    test_quantized_search_rescores_exactly()
+    test_pq_trains_once_enough_vectors_are_added()
+    test_build_in_blocks_matches_bulk_build()
+    test_event_vectors_build_from_tables_and_fetch_outside_the_lock()
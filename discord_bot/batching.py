@@ -0,0 +1,101 @@
+import asyncio
+import discord
+import aiohttp
+
+# Queued by stop(): the worker flushes its current batch and exits
+_STOP = object()
+
+
+class IngestBatcher:
+    """
+    Collects messages from the ingestion channel and forwards them to the
+    backend's bulk ingestion endpoint, flushing every `max_batch` messages or
+    `max_delay_ms` milliseconds, whichever comes first. Reactions are applied
+    from the per-item results.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, api_url: str, max_batch: int = 20, max_delay_ms: int = 250):
+        self.session = session
+        self.api_url = api_url
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_batch * 50)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush whatever is queued, then stop the background task."""
+        if self._task is None:
+            return
+        # Queued behind every pending message, so the worker flushes them all,
+        # including a batch it is still collecting, before it exits
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+        # Messages submitted while stopping
+        remaining = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.max_batch):
+            await self._flush(remaining[start:start + self.max_batch])
+
+    async def submit(self, message: discord.Message):
+        payload = {
+            "source": "discord",
+            "sender": str(message.author.id),
+            "content": message.content,
+            "timestamp": message.created_at.isoformat()
+        }
+        await self.queue.put((payload, message))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: list):
+        payloads = [payload for payload, _ in batch]
+        try:
+            async with self.session.post(f"{self.api_url}/ingest/batch", json=payloads) as resp:
+                if resp.status != 200:
+                    print(f"Batch ingestion failed: {resp.status}")
+                    return
+                results = await resp.json()
+        except Exception as e:
+            print(f"Batch ingestion error: {e}")
+            return
+
+        reactions = []
+        for (_, message), result in zip(batch, results):
+            if result.get("status") == "error":
+                continue
+            emoji = "🚨" if result.get("risk_level") == "high" else "✅"
+            reactions.append(message.add_reaction(emoji))
+        # Failed reactions (deleted messages, missing permissions) must not break the batch
+        await asyncio.gather(*reactions, return_exceptions=True)
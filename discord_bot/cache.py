@@ -0,0 +1,79 @@
+import asyncio
+import time
+import aiohttp
+
+
+class BackendError(Exception):
+    """Raised when the backend answers with an unexpected status code."""
+
+    def __init__(self, status: int):
+        super().__init__(f"API Error: {status}")
+        self.status = status
+
+
+class CachedResponse:
+    __slots__ = ("data", "etag", "last_modified", "expires_at", "embed")
+
+    def __init__(self, data, etag: str, last_modified: str, expires_at: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        # Rendered embed for this payload, built once and reused until the data changes
+        self.embed = None
+
+
+class ResponseCache:
+    """
+    TTL cache for read-only backend endpoints.
+    Fresh entries are served without a request. Stale entries are revalidated
+    with If-None-Match / If-Modified-Since; a 304 keeps the cached payload and
+    its rendered embed.
+    """
+
+    def __init__(self, ttl: float = 15.0, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[str, CachedResponse] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> CachedResponse:
+        entry = self._entries.get(url)
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+
+        # Concurrent commands for the same URL share one backend round-trip
+        lock = self._locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(url)
+            if entry and entry.expires_at > time.monotonic():
+                return entry
+            return await self._revalidate(session, url, entry)
+
+    async def _revalidate(self, session: aiohttp.ClientSession, url: str, entry: CachedResponse) -> CachedResponse:
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304 and entry:
+                entry.expires_at = time.monotonic() + self.ttl
+                return entry
+            if resp.status != 200:
+                raise BackendError(resp.status)
+            data = await resp.json()
+            fresh = CachedResponse(
+                data,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+                time.monotonic() + self.ttl,
+            )
+
+        if url not in self._entries and len(self._entries) >= self.max_entries:
+            oldest = min(self._entries, key=lambda key: self._entries[key].expires_at)
+            del self._entries[oldest]
+            self._locks.pop(oldest, None)
+        self._entries[url] = fresh
+        return fresh